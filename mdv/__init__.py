@@ -1,3 +1,36 @@
 # coding: utf-8
+import sys
 
-from .markdownviewer import run, main
+
+def run():
+    """
+    The cli. With --client we first try the render server - w/o importing
+    markdown and pygments, which is most of our startup time.
+    """
+    if '--client' in sys.argv[1:]:
+        from .client import run_client
+
+        if run_client():
+            return
+        sys.argv.remove('--client')
+    from .markdownviewer import run
+
+    run()
+
+
+if sys.version_info[:2] >= (3, 7):
+
+    def __getattr__(name):
+        # lazy, for the thin client (see run)
+        from importlib import import_module
+
+        if name == 'render_async':
+            return import_module('.aio', __name__).render_async
+        if name not in ('main', 'markdownviewer'):
+            raise AttributeError(name)
+        mv = import_module('.markdownviewer', __name__)
+        return mv if name == 'markdownviewer' else mv.main
+
+
+else:
+    from .markdownviewer import main
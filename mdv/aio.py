@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+asyncio API (python 3.5+):
+
+    ansi = await render_async(md, cols=80)
+    ansi = await render_async(filename='README.md', key='readme')
+
+Renders run in an executor - the loop's default (thread pool) if not
+configured otherwise - so the event loop is not blocked. Since mdv keeps its
+state in module globals, renders in threads are serialized (render_lock).
+For parallel renders configure a process pool:
+
+    configure(executor=ProcessPoolExecutor(4), limit=4)
+
+- limit: max renders in flight, more wait for a slot.
+- key (default: the filename): a newer request for the same key cancels the
+  pending one - its awaiter gets CancelledError. A render already running in
+  the executor can't be interrupted, its result is dropped.
+"""
+from __future__ import absolute_import
+
+import asyncio
+
+try:
+    from mdv import markdownviewer as mv
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+
+
+def render(kw):
+    """the executor job"""
+    with mv.render_lock:
+        return mv.main(**kw)
+
+
+class Renderer(object):
+    func = staticmethod(render)
+
+    def __init__(self, executor=None, limit=4):
+        self.executor, self.limit = executor, limit
+        self.latest = {}  # key -> pending job
+        self._sem = (None, None)
+
+    def semaphore(self, loop):
+        # bound to a loop, we may be used from several (one after another):
+        if self._sem[0] is not loop:
+            self._sem = (loop, asyncio.Semaphore(self.limit))
+        return self._sem[1]
+
+    async def render(self, md=None, key=None, **kw):
+        loop = asyncio.get_event_loop()
+        kw['md'] = md
+        key = kw.get('filename') if key is None else key
+        job = loop.create_task(self._run(loop, kw))
+        if key is not None:
+            stale = self.latest.get(key)
+            if stale is not None:
+                stale.cancel()
+            self.latest[key] = job
+        try:
+            return await job
+        finally:
+            if key is not None and self.latest.get(key) is job:
+                del self.latest[key]
+
+    async def _run(self, loop, kw):
+        async with self.semaphore(loop):
+            return await loop.run_in_executor(self.executor, self.func, kw)
+
+
+renderer = Renderer()
+
+
+def configure(executor=None, limit=None):
+    """executor and concurrency limit of render_async"""
+    renderer.executor = executor
+    if limit:
+        renderer.limit, renderer._sem = limit, (None, None)
+
+
+async def render_async(md=None, key=None, **kw):
+    """mdv.main(md, **kw), off the event loop. See the module doc."""
+    return await renderer.render(md, key, **kw)
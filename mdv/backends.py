@@ -0,0 +1,331 @@
+# coding: utf-8
+"""
+Markdown parsers. Python-Markdown is the default and always there - when
+installed, these parse instead (`--parser NAME`, `$MDV_PARSER`):
+
+- cmark: the C reference implementation of CommonMark (paka.cmark)
+- mistletoe: CommonMark, plus tables
+- commonmark: commonmark.py, CommonMark in pure python
+- auto: the fastest of them installed
+
+Their syntax trees are converted into the element tree Python-Markdown
+would build - same tags, code text escaped alike, fenced code and raw html
+into the html stash - which AnsiPrinter renders as always.
+
+The output differs where the dialects do (CommonMark: no tables except
+mistletoe's, lists need no blank line before, no `[TOC]` or admonitions
+..) - tests/test_backends.py has the fixtures rendering identically.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import importlib
+import sys
+
+from markdown.util import AtomicString, code_escape, etree
+
+modules = {
+    'cmark': 'paka.cmark',
+    'mistletoe': 'mistletoe',
+    'commonmark': 'commonmark',
+}
+fastest = ('cmark', 'mistletoe', 'commonmark')  # see misc/perf_backends.py
+names = ('markdown',) + fastest
+warned = set()
+
+
+def installed(name):
+    if name == 'markdown':
+        return True
+    try:
+        importlib.import_module(modules[name])
+        return True
+    except ImportError:
+        return False
+
+
+def get(name=None):
+    """The backend for name ('auto', ..), Python-Markdown if n.a."""
+    name = (name or 'markdown').lower()
+    if name == 'auto':
+        return ([n for n in fastest if installed(n)] + ['markdown'])[0]
+    if name in names and installed(name):
+        return name
+    if name not in warned:
+        warned.add(name)
+        sys.stderr.write(
+            'parser %s %s - using markdown\n'
+            % (name, 'not installed' if name in names else 'unknown')
+        )
+    return 'markdown'
+
+
+def convert(MD, md, name='markdown'):
+    """MD.convert(md), for the ansi: md parsed by backend name"""
+    if name == 'markdown':
+        return MD.convert(md)
+    MD.treeprocessors['ansi_print_ext'].run(parse(MD, md, name))
+
+
+def parse(MD, md, name):
+    """md -> Python-Markdown's element tree, parsed by backend name"""
+    return builders[name](MD).build(md.replace('\r\n', '\n'))
+
+
+def fence_escape(s):
+    # as fenced_code's
+    s = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return s.replace('"', '&quot;')
+
+
+class Tree(object):
+    """Builds the tree, as Python-Markdown does, into root"""
+
+    def __init__(self, MD):
+        self.stash = MD.htmlStash
+        self.root = etree.Element('div')
+
+    def el(self, parent, tag, **attrs):
+        e = etree.SubElement(parent, tag)
+        for k, v in attrs.items():
+            if v:
+                e.set(k, v)
+        return e
+
+    def text(self, parent, s):
+        if len(parent):
+            last = parent[-1]
+            last.tail = (last.tail or '') + s
+        else:
+            parent.text = (parent.text or '') + s
+
+    def raw(self, parent, html):
+        self.text(parent, self.stash.store(html))
+
+    def raw_block(self, parent, html):
+        self.raw(self.el(parent, 'p'), html.strip('\n'))
+
+    def code(self, parent, code, lang=None, fenced=True):
+        if fenced:  # stashed, as by fenced_code
+            self.raw_block(parent, '<pre><code%s>%s</code></pre>' % (
+                ' class="%s"' % lang if lang else '', fence_escape(code)))
+        else:
+            c = self.el(self.el(parent, 'pre'), 'code')
+            c.text = AtomicString(code_escape(code.rstrip()) + '\n')
+
+    def code_span(self, parent, s):
+        self.el(parent, 'code').text = AtomicString(code_escape(s.strip()))
+
+
+class CommonMark(Tree):
+    """commonmark.py's nodes -> tree"""
+
+    def build(self, md):
+        self.blocks(self.ast(md), self.root)
+        return self.root
+
+    def ast(self, md):
+        import commonmark
+
+        return commonmark.Parser().parse(md)
+
+    def kind(self, n):
+        return n.t
+
+    def kids(self, n):
+        n = n.first_child
+        while n is not None:
+            yield n
+            n = n.nxt
+
+    def lit(self, n):
+        return n.literal
+
+    def attr(self, n, k):
+        if k in ('type', 'tight'):
+            return n.list_data.get(k)
+        return getattr(n, k)
+
+    def fenced(self, n):
+        return n.is_fenced
+
+    def blocks(self, n, parent, tight=False):
+        for c in self.kids(n):
+            k = self.kind(c)
+            if k == 'paragraph':
+                self.inlines(c, parent if tight else self.el(parent, 'p'))
+            elif k == 'heading':
+                h = self.el(parent, 'h%s' % self.attr(c, 'level'))
+                self.inlines(c, h)
+            elif k == 'list':
+                t = self.attr(c, 'tight') in (True, 'true')
+                l = self.el(
+                    parent, 'ol' if self.attr(c, 'type') == 'ordered' else 'ul'
+                )
+                for i in self.kids(c):
+                    self.blocks(i, self.el(l, 'li'), t)
+            elif k == 'code_block':
+                info = (self.attr(c, 'info') or '').split(' ', 1)[0]
+                self.code(parent, self.lit(c), info, self.fenced(c))
+            elif k == 'block_quote':
+                self.blocks(c, self.el(parent, 'blockquote'))
+            elif k == 'html_block':
+                self.raw_block(parent, self.lit(c))
+            elif k == 'thematic_break':
+                self.el(parent, 'hr')
+
+    def inlines(self, n, parent):
+        for c in self.kids(n):
+            k = self.kind(c)
+            if k == 'text':
+                self.text(parent, self.lit(c))
+            elif k == 'softbreak':
+                self.text(parent, '\n')
+            elif k == 'emph' or k == 'strong':
+                self.inlines(c, self.el(parent, 'em' if k == 'emph' else k))
+            elif k == 'code':
+                self.code_span(parent, self.lit(c))
+            elif k == 'link':
+                a = self.el(parent, 'a', href=self.attr(c, 'destination'),
+                            title=self.attr(c, 'title'))
+                self.inlines(c, a)
+            elif k == 'linebreak':
+                self.el(parent, 'br')
+            elif k == 'html_inline':
+                self.raw(parent, self.lit(c))
+            elif k == 'image':
+                self.el(parent, 'img', src=self.attr(c, 'destination'),
+                        title=self.attr(c, 'title'), alt=self.plain(c))
+
+    def plain(self, n):
+        k = self.kind(n)
+        if k == 'text' or k == 'code':
+            return self.lit(n)
+        return ''.join([self.plain(c) for c in self.kids(n)])
+
+
+class Cmark(CommonMark):
+    """cmark's xml of the same nodes -> tree"""
+
+    ns = len('{http://commonmark.org/xml/1.0}')
+
+    def ast(self, md):
+        from paka import cmark
+
+        self.md = md
+        self.lines = None
+        # sourcepos: fenced or indented code, see fenced:
+        x = cmark.to_xml(md, sourcepos=True)
+        return etree.fromstring(x.encode('utf-8'))
+
+    def kind(self, n):
+        return n.tag[self.ns:]
+
+    def kids(self, n):
+        return iter(n)
+
+    def lit(self, n):
+        return n.text or ''
+
+    def attr(self, n, k):
+        return n.get(k)
+
+    def fenced(self, n):
+        if n.get('info'):
+            return True
+        if self.lines is None:
+            self.lines = self.md.split('\n')
+        l, c = n.get('sourcepos').split('-', 1)[0].split(':')
+        return self.lines[int(l) - 1][int(c) - 1:][:1] in ('`', '~')
+
+
+class Mistletoe(Tree):
+    """mistletoe's tokens -> tree"""
+
+    aligns = {None: None, 0: 'center', 1: 'right'}
+
+    def build(self, md):
+        from mistletoe import Document
+        from mistletoe.html_renderer import HTMLRenderer
+
+        with HTMLRenderer():  # which adds the html tokens
+            doc = Document(md)
+        self.blocks(doc.children, self.root)
+        return self.root
+
+    def blocks(self, toks, parent, tight=False):
+        for t in toks:
+            k = type(t).__name__
+            if k == 'Paragraph':
+                self.inlines(t, parent if tight else self.el(parent, 'p'))
+            elif k == 'Heading' or k == 'SetextHeading':
+                self.inlines(t, self.el(parent, 'h%s' % t.level))
+            elif k == 'List':
+                l = self.el(parent, 'ul' if t.start is None else 'ol')
+                for i in t.children:
+                    self.blocks(i.children, self.el(l, 'li'), not t.loose)
+            elif k == 'CodeFence' or k == 'BlockCode':
+                lang = t.language.split(' ', 1)[0] if t.language else ''
+                self.code(parent, t.children[0].content, lang,
+                          k == 'CodeFence')
+            elif k == 'Quote':
+                self.blocks(t.children, self.el(parent, 'blockquote'))
+            elif k == 'Table':
+                self.table(t, self.el(parent, 'table'))
+            elif k in ('HtmlBlock', 'HTMLBlock'):
+                self.raw_block(parent, t.content)
+            elif k == 'ThematicBreak':
+                self.el(parent, 'hr')
+
+    def table(self, t, table):
+        aligns = [self.aligns.get(a) for a in t.column_align]
+        rows = [(getattr(t, 'header', None), 'thead', 'th'),
+                (t.children, 'tbody', 'td')]
+        for r, sect, tag in rows:
+            if r is None:
+                continue
+            s = self.el(table, sect)
+            for row in [r] if sect == 'thead' else r:
+                tr = self.el(s, 'tr')
+                for i, c in enumerate(row.children):
+                    a = aligns[i] if i < len(aligns) else None
+                    self.inlines(c, self.el(tr, tag, align=a))
+
+    def inlines(self, t, parent):
+        for t in t.children:
+            k = type(t).__name__
+            if k == 'RawText':
+                self.text(parent, t.content)
+            elif k == 'LineBreak':
+                if t.soft:
+                    self.text(parent, '\n')
+                else:
+                    self.el(parent, 'br')
+            elif k == 'Emphasis':
+                self.inlines(t, self.el(parent, 'em'))
+            elif k == 'Strong':
+                self.inlines(t, self.el(parent, 'strong'))
+            elif k == 'InlineCode':
+                self.code_span(parent, t.children[0].content)
+            elif k == 'Link' or k == 'AutoLink':
+                a = self.el(parent, 'a', href=t.target,
+                            title=getattr(t, 'title', None))
+                self.inlines(t, a)
+            elif k in ('HtmlSpan', 'HTMLSpan'):
+                self.raw(parent, t.content)
+            elif k == 'Image':
+                self.el(parent, 'img', src=t.src, title=t.title,
+                        alt=self.plain(t))
+            elif k == 'Strikethrough':  # not in Python-Markdown
+                self.text(parent, '~~')
+                self.inlines(t, parent)
+                self.text(parent, '~~')
+            elif t.children:  # escapes, ..
+                self.inlines(t, parent)
+
+    def plain(self, t):
+        if t.children is None:
+            return getattr(t, 'content', '')
+        return ''.join([self.plain(c) for c in t.children])
+
+
+builders = {'cmark': Cmark, 'mistletoe': Mistletoe, 'commonmark': CommonMark}
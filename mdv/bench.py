@@ -0,0 +1,282 @@
+# coding: utf-8
+"""
+Benchmark suite of mdv's own rendering:
+
+    python -m mdv.bench [--corpus prose,tables] [--cols 40,80] [--json FILE]
+                        [--baseline FILE] [--save] [--scale F] [--repeat N]
+
+Generated corpora (see `corpora`), each rendered at 20/40/80/200 columns,
+best of `--repeat`, with the wall time per stage (parse, inline, tree,
+highlight, tables, serialize, post, other - see timings.py) and block type.
+
+Results are compared with the baseline - by default `bench.json` in mdv's
+cache dir, written by `--save` - regressions beyond `--tolerance` make the
+exit status 1.
+"""
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import markdown
+
+try:
+    from mdv import markdownviewer as mv
+    from mdv.filecache import cache_dir
+    from mdv.timings import Timings, stages
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+    from filecache import cache_dir
+    from timings import Timings, stages
+
+widths = (20, 40, 80, 200)
+theme, c_theme = '671.1616', '526.9416'  # not random
+words = (
+    'the quick brown fox jumps over lazy dogs while rendering markdown into '
+    'ansi escape sequences for terminals of any width'
+).split()
+
+
+# ------------------------------------------------------------------ corpora
+def text(i, n=40):
+    w = [words[(i * 7 + j) % len(words)] for j in range(n)]
+    a, b, c = 1, n // 2, n - 2  # emphasis, strong, code
+    w[a], w[b], w[c] = '*%s*' % w[a], '**%s**' % w[b], '`%s`' % w[c]
+    return ' '.join(w) + '.'
+
+
+def prose(scale):
+    r = []
+    for i in range(int(200 * scale)):
+        if not i % 5:
+            r.append('%s Chapter %s' % ('#' * (1 + i // 5 % 3), i // 5))
+        r.append(text(i, 60))
+    return '\n\n'.join(r)
+
+
+def nested_lists(scale, depth=8):
+    r = []
+    for i in range(int(30 * scale)):
+        for d in range(depth):
+            for j in range(2):
+                r.append('%s- %s' % ('    ' * d, text(i + d + j, 8)))
+        r.append('')
+        r.append(text(i, 10))
+        r.append('')
+    return '\n'.join(r)
+
+
+code = {
+    'python': 'def f(a, b=1):\n    """doc"""\n    return [a * b for b in x]',
+    'js': 'function f(a) {\n  return a.map(x => x * 2); // twice\n}',
+    '': 'SELECT a, b FROM t WHERE a > 1 ORDER BY b;\nUPDATE t SET a = 2;',
+}
+
+
+def fenced(scale):
+    r, langs = [], sorted(code)
+    for i in range(int(60 * scale)):
+        lang = langs[i % len(langs)]  # '': the lexer is guessed
+        r.append(text(i, 12))
+        r.append('```%s\n%s\n```' % (lang, code[lang]))
+    return '\n\n'.join(r)
+
+
+def tables(scale, cols=12, rows=20):
+    r = []
+    for i in range(int(10 * scale)):
+        r.extend([text(i, 10), ''])
+        r.append('|'.join(['col %s' % c for c in range(cols)]))
+        r.append('|'.join([':--' if c % 3 else '--:' for c in range(cols)]))
+        for j in range(rows):
+            r.append(
+                '|'.join(
+                    [' '.join(words[(i + j + c) % len(words):][:1 + c % 4])
+                     for c in range(cols)]
+                )
+            )
+        r.append('')
+    return '\n'.join(r)
+
+
+def links(scale):
+    r, refs = [], []
+    for i in range(int(100 * scale)):
+        r.append(
+            '%s [inline %s](http://example.com/%s) and [ref %s][r%s], %s'
+            % (text(i, 6), i, i, i, i, text(i + 1, 6))
+        )
+        refs.append('[r%s]: http://example.org/ref/%s' % (i, i))
+    return '\n\n'.join(r + refs)
+
+
+def huge(scale):
+    parts = [prose, nested_lists, fenced, tables, links]
+    return '\n\n'.join([f(scale * 2) for f in parts] * 3)
+
+
+corpora = {
+    'prose': prose,
+    'nested_lists': nested_lists,
+    'fenced': fenced,
+    'tables': tables,
+    'links': links,
+    'huge': huge,
+}
+
+
+def render(md, cols, repeat=3):
+    """{'total': secs, 'stages': {stage: secs}, 'calls': .., 'blocks': ..}
+    of the best run"""
+    best = None
+    for i in range(repeat):
+        t = Timings()
+        mv.main(md=md, cols=cols, theme=theme, c_theme=c_theme, timings=t)
+        if best is None or t.total < best['total']:
+            best = {
+                'total': t.total,
+                'stages': dict([(k, v[0]) for k, v in t.stages.items()]),
+                'calls': dict([(k, v[1]) for k, v in t.stages.items()]),
+                'blocks': t.blocks,
+            }
+    return best
+
+
+def run(names=None, cols=widths, scale=1, repeat=3, out=sys.stdout):
+    res = {}
+    for name in names or sorted(corpora):
+        md = corpora[name](scale)
+        res[name] = r = {'bytes': len(md.encode('utf-8')), 'cols': {}}
+        for c in cols:
+            # the huge one once - it is huge:
+            r['cols'][str(c)] = x = render(
+                md, c, 1 if name == 'huge' else repeat
+            )
+            if out:
+                report_line(name, r['bytes'], c, x, out)
+    return res
+
+
+# ------------------------------------------------------------------- output
+def report_head(out=sys.stdout):
+    out.write(
+        '%-13s %8s %4s %9s  %s\n'
+        % ('corpus', 'bytes', 'cols', 'total ms',
+           ' '.join(['%9s' % s for s in stages]))
+    )
+
+
+def report_line(name, size, cols, r, out=sys.stdout):
+    out.write(
+        '%-13s %8s %4s %9.1f  %s\n'
+        % (name, size, cols, r['total'] * 1000,
+           ' '.join(['%9.1f' % (r['stages'].get(s, 0) * 1000)
+                     for s in stages]))
+    )
+    out.flush()
+
+
+def meta(scale, repeat):
+    return {
+        'python': platform.python_version(),
+        'markdown': markdown.__version__
+        if hasattr(markdown, '__version__')
+        else markdown.version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'scale': scale,
+        'repeat': repeat,
+    }
+
+
+def compare(res, base, tolerance=0.1, out=sys.stdout):
+    """print the ratios to the baseline, return the regressions"""
+    bad = []
+    out.write('\nvs. baseline (%s):\n' % base.get('meta', {}).get('time'))
+    for name in sorted(res):
+        b = base.get('results', {}).get(name)
+        if not b:
+            continue
+        for c, r in sorted(res[name]['cols'].items(), key=lambda i: int(i[0])):
+            x = b['cols'].get(c)
+            if not x or not x['total']:
+                continue
+            ratio = r['total'] / x['total']
+            worst = [
+                s for s in stages
+                if x['stages'].get(s, 0) > 0.001
+                and r['stages'].get(s, 0) / x['stages'][s] > 1 + tolerance
+            ]
+            flag = ratio > 1 + tolerance
+            if flag:
+                bad.append((name, c, ratio))
+            out.write(
+                '%-13s %4s %6.2fx%s%s\n'
+                % (name, c, ratio, ' !' if flag else '',
+                   (' (slower: %s)' % ', '.join(worst)) if worst else '')
+            )
+    return bad
+
+
+def baseline_fn():
+    return os.path.join(cache_dir(), 'bench.json')
+
+
+def load(fn):
+    with io.open(fn, encoding='utf-8') as fd:
+        return json.load(fd)
+
+
+def dump(data, fn):
+    d = os.path.dirname(os.path.abspath(fn))
+    if not os.path.exists(d):
+        os.makedirs(d)
+    with io.open(fn, 'w', encoding='utf-8') as fd:
+        fd.write('%s' % json.dumps(data, indent=1, sort_keys=True))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(
+        prog='python -m mdv.bench', description='Benchmarks of mdv'
+    )
+    p.add_argument('--corpus', help='comma separated, of: %s' % ', '.join(
+        sorted(corpora)))
+    p.add_argument('--cols', default=','.join(map(str, widths)))
+    p.add_argument('--scale', type=float, default=1)
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--json', help='write the results there')
+    p.add_argument('--baseline', help='default: %s' % baseline_fn())
+    p.add_argument('--save', action='store_true', help='as baseline')
+    p.add_argument('--tolerance', type=float, default=0.1)
+    a = p.parse_args(argv)
+    names = a.corpus.split(',') if a.corpus else None
+    for n in names or ():
+        if n not in corpora:
+            p.error('unknown corpus %s' % n)
+    cols = [int(c) for c in a.cols.split(',')]
+
+    mv.main(md='# warm up\n\n```python\nx = 1\n```', cols=80)
+    report_head()
+    data = {
+        'meta': meta(a.scale, a.repeat),
+        'results': run(names, cols, a.scale, a.repeat),
+    }
+    if a.json:
+        dump(data, a.json)
+    bad, base_fn = [], a.baseline or baseline_fn()
+    if os.path.exists(base_fn) and not a.save:
+        bad = compare(data['results'], load(base_fn), a.tolerance)
+    if a.save:
+        dump(data, base_fn)
+        print('baseline saved: %s' % base_fn)
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# coding: utf-8
+"""
+Thin client of the render server (`mdv --serve`, see server.py).
+
+We send the cli args, cwd, environ and terminal size, the server renders as
+if it were started like us. Only stdlib imports here - no markdown, no
+pygments - so a client run costs little more than the interpreter start.
+
+Messages are json, preceded by their length (4 bytes, network order).
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+
+PY3 = sys.version_info.major > 2
+timeout = 60
+
+
+def socket_path():
+    d = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.environ.get('MDV_SOCKET') or os.path.join(
+        d, 'mdv-%s.sock' % os.getuid()
+    )
+
+
+def send_msg(sock, obj):
+    data = json.dumps(obj).encode('utf-8')
+    sock.sendall(struct.pack('!I', len(data)) + data)
+
+
+def recv_exactly(sock, n):
+    r = []
+    while n:
+        b = sock.recv(min(n, 1 << 20))
+        if not b:
+            raise EOFError('connection closed')
+        r.append(b)
+        n -= len(b)
+    return b''.join(r)
+
+
+def recv_msg(sock):
+    n = struct.unpack('!I', recv_exactly(sock, 4))[0]
+    return json.loads(recv_exactly(sock, n).decode('utf-8'))
+
+
+def request(req, path=None):
+    """One request to the server. Raises socket.error if there is none"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        send_msg(sock, req)
+        return recv_msg(sock)
+    finally:
+        sock.close()
+
+
+def term_size():
+    """(cols, rows) like markdownviewer derives them"""
+    env = os.environ.get
+    cols, rows = env('width', env('COLUMNS')), env('LINES')
+    if not cols:
+        try:
+            rows, cols = os.popen('stty size 2>/dev/null', 'r').read().split()
+        except ValueError:
+            pass
+    return int(cols or 80), int(rows or 200)
+
+
+def run_client(argv=None, path=None):
+    """
+    Renders argv (cli args) via the server and prints the result.
+    False if there is no server or it can't serve this (e.g. monitor modes),
+    then the caller renders in-process.
+    """
+    argv = [a for a in (sys.argv[1:] if argv is None else argv)
+            if a != '--client']
+    cols, rows = term_size()
+    req = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+        'cols': cols,
+        'rows': rows,
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        # connected, now we may consume stdin:
+        if argv and argv[-1] == '-':
+            req['md'] = sys.stdin.read()
+        send_msg(sock, req)
+        res = recv_msg(sock)
+    except (socket.error, OSError, EOFError, ValueError):
+        return False
+    finally:
+        sock.close()
+    if res.get('error'):
+        print(res['error'], file=sys.stderr)
+        sys.exit(1)
+    if 'ansi' not in res:
+        return False
+    out = res['ansi'] + '\n'
+    sys.stdout.write(out if PY3 else out.encode('utf-8'))
+    return True
@@ -0,0 +1,172 @@
+# coding: utf-8
+"""
+Terminal display width of strings.
+
+`len()` is only right for ASCII. East asian wide and fullwidth characters
+(CJK, most emoji) take two columns, combining marks and zero width
+characters none.
+
+ASCII strings, by far the most frequent, take the fast path via `len()`.
+Every other code point is classified once with `unicodedata` and the result
+kept in a lookup table, so a document costs one `unicodedata` call per
+*distinct* character, not per character.
+
+ASCII control characters (our inline markers) count one column, like `len()`
+did - wrapping results for ASCII text are unchanged by this module.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+import textwrap
+import unicodedata
+from itertools import groupby
+
+# the one escape pattern for clean_ansi, tabulate and us:
+ansi_escape = re.compile(r'\x1b[^m]*m')
+
+_text_type = type('')
+
+if hasattr(_text_type, 'isascii'):
+    is_ascii = _text_type.isascii
+else:  # pragma: no cover
+
+    def is_ascii(s):
+        try:
+            s.encode('ascii')
+            return True
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            return False
+
+
+def _char_width(c):
+    """Columns for one non ASCII character. Only called on table misses."""
+    o = ord(c)
+    if o < 0x80:
+        return 1
+    if o < 0xA0 or o in (0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF):
+        # C1 controls, zero width space, joiners, BOM:
+        return 0
+    if unicodedata.combining(c) or unicodedata.category(c) in ('Mn', 'Me'):
+        return 0
+    if unicodedata.east_asian_width(c) in ('W', 'F'):
+        return 2
+    return 1
+
+
+class _WidthTable(dict):
+    """code point -> columns, filled on first lookup"""
+
+    def __missing__(self, c):
+        w = self[c] = _char_width(c)
+        return w
+
+
+char_widths = _WidthTable()
+char_width = char_widths.__getitem__
+
+
+def width(s):
+    """Display width of a string w/o escape sequences"""
+    if is_ascii(s):
+        return len(s)
+    return sum(map(char_width, s))
+
+
+def has_wide(s):
+    """Any character taking two columns?"""
+    return not is_ascii(s) and any(char_width(c) > 1 for c in s)
+
+
+def is_narrow(s):
+    """Every character exactly one column? (then len is the width)"""
+    return is_ascii(s) or all(char_width(c) == 1 for c in s)
+
+
+def visible_width(s):
+    """Display width of a string which may contain ANSI color codes"""
+    if '\x1b' in s:
+        s = ansi_escape.sub('', s)
+    return width(s)
+
+
+def ljust(s, w, fill=' '):
+    """str.ljust, by display width"""
+    return s + fill * (w - width(s))
+
+
+def cut(s, start, end=None):
+    """
+    The part of s displayed in columns [start, end).
+    A wide character which would be split at a border is replaced by a space.
+    Zero width characters (combining marks) at a border stay with the char
+    they belong to, i.e. the left part.
+    """
+    if is_ascii(s):
+        return s[start:end]
+    r, pos = [], 0
+    for c in s:
+        w = char_width(c)
+        nxt = pos + w
+        if end is not None and nxt > end:
+            if pos < end and w > 1:
+                r.append(' ' * (end - pos))
+            break
+        if pos > start or (pos == start and (w or not start)):
+            r.append(c)
+        elif nxt > start:
+            # wide char crossing our left border:
+            r.append(' ' * (nxt - start))
+        pos = nxt
+    return ''.join(r)
+
+
+def break_points(word, cols=None):
+    """Parts of a word between which we may break: each wide char alone,
+    runs of narrow ones together - unless longer than a line (cols)."""
+    for is_wide, part in groupby(word, lambda c: char_width(c) > 1):
+        part = ''.join(part)
+        if is_wide:
+            for c in part:
+                yield c
+        elif cols is not None and width(part) > cols:
+            for c in part:
+                yield c
+        else:
+            yield part
+
+
+def fill(text, cols):
+    """textwrap.fill, by display width.
+
+    Words with wide characters (CJK text has no spaces) may be broken at any
+    character, others only when they are longer than a line, as textwrap does.
+    """
+    if is_narrow(text):
+        # one column per char, textwrap gets that right:
+        return textwrap.fill(text, width=cols)
+    lines, cur, cur_w = [], [], 0
+    for word in text.split():
+        w = width(word)
+        if cur and cur_w + 1 + w <= cols:
+            cur.append(' ' + word)
+            cur_w += 1 + w
+            continue
+        if w <= cols and (not cur or not has_wide(word)):
+            if cur:
+                lines.append(''.join(cur))
+            cur, cur_w = [word], w
+            continue
+        # break the word, first filling the current line:
+        if cur:
+            cur.append(' ')
+            cur_w += 1
+        for part in break_points(word, cols):
+            pw = width(part)
+            if cur_w + pw > cols and cur:
+                lines.append(''.join(cur).rstrip())
+                cur, cur_w = [], 0
+            cur.append(part)
+            cur_w += pw
+    if cur:
+        lines.append(''.join(cur))
+    return '\n'.join(lines)
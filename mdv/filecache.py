@@ -0,0 +1,64 @@
+# coding: utf-8
+"""
+Persisted results of (expensive) work on files, e.g. parsed config files or
+extracted docstrings, valid as long as the file's mtime and size are
+unchanged.
+
+One json file per cache, within `$MDV_CACHE_DIR`, else `$XDG_CACHE_HOME/mdv`
+or `~/.cache/mdv`. Values must be json serializable.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import io
+import json
+import os
+import sys
+
+
+def cache_dir():
+    return os.environ.get('MDV_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+        'mdv',
+    )
+
+
+class FileCache(object):
+    """path -> [mtime, size, value]"""
+
+    def __init__(self, fn):
+        """fn: cache file, relative ones are within cache_dir()"""
+        self.fn = os.path.join(cache_dir(), fn)
+        self.dirty = False
+        try:
+            with io.open(self.fn, encoding='utf-8') as fd:
+                self.entries = json.load(fd)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def get(self, fn, st):
+        """the value for file fn with os.stat result st - None if stale"""
+        e = self.entries.get(fn)
+        if e and e[0] == st.st_mtime and e[1] == st.st_size:
+            return e[2]
+
+    def put(self, fn, st, value):
+        # dict item assignment is atomic, fine for our thread pools:
+        self.entries[fn] = [st.st_mtime, st.st_size, value]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            d = os.path.dirname(self.fn)
+            if not os.path.exists(d):
+                os.makedirs(d)
+            tmp = self.fn + '.%s' % os.getpid()
+            with io.open(tmp, 'w', encoding='utf-8') as fd:
+                # '%s': unicode on py2, too
+                fd.write('%s' % json.dumps(self.entries))
+            os.rename(tmp, self.fn)
+            self.dirty = False
+        except (IOError, OSError) as ex:
+            print('Could not write cache %s: %s' % (self.fn, ex),
+                  file=sys.stderr)
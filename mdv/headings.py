@@ -0,0 +1,235 @@
+# coding: utf-8
+"""
+Heading index of markdown files: [(byte offset, level, title)].
+
+Built by one regex scan over the memory mapped file (headings in fenced code
+skipped) and cached by the file's mtime and size (see filecache), so for a
+large spec we scan once.
+
+Used by `mdv --toc FILE` and by `-f FROM`: if a heading contains FROM we
+render from there on only - a slice of the mapped file - instead of
+rendering the whole document to search the output.
+
+Also the block boundaries for the pager (`blocks`), so that it decodes only
+the slices it renders. Mapped files are scanned in windows, releasing the
+pages behind us (py3.8+), so the resident memory stays at about one window
+even for huge files.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import mmap
+import os
+import re
+import sys
+from array import array
+
+try:
+    from mdv.filecache import FileCache
+except ImportError:  # started as script from a checkout
+    from filecache import FileCache
+
+_int64 = str('q' if sys.version_info.major > 2 else 'l')  # py2: no 'q'
+window = 1 << 24  # bytes scanned before releasing the pages
+max_block_bytes = 1 << 14  # w/o headings we cut at paragraphs after that
+
+# fence | atx heading | link reference definition | setext underline:
+_line = (
+    br'(?: {0,3}(```|~~~)'
+    br'|(#{1,6})[ \t]+([^\r\n]*?)[ \t#]*\r?$'
+    br'|( {0,3}\[[^\]\r\n]+\]:[ \t]*\S[^\r\n]*)'
+    br'| {0,3}(=+|-+)[ \t]*\r?$)'
+)
+# after a newline - not '^', a literal start is 10 times faster to find:
+_toc = re.compile(br'\n' + _line, re.M)
+_first = re.compile(_line, re.M)  # the first line of the document
+# the text line of a setext heading (not a list item, quote, ..):
+_setext = re.compile(br' {0,3}[^\s\-*+>|#]')
+# blank line, then no list item, quote, table or indented line:
+_par = re.compile(br'\n[ \t]*\n(?![\s>|*+\-]|\d+[.)])')
+
+
+def mapped(fn):
+    """the file as mmap - None if empty (can't map that)"""
+    with open(fn, 'rb') as fd:
+        if not os.fstat(fd.fileno()).st_size:
+            return None
+        return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release(buf, start, end):
+    """drop pages of a mmap from our RSS - they stay in the page cache"""
+    if hasattr(buf, 'madvise'):  # mmap, py3.8+
+        start -= start % mmap.PAGESIZE
+        buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def windows(buf):
+    """(start, end) slices of buf, ending after a blank line"""
+    pos, n = 0, len(buf)
+    while pos < n:
+        end = buf.find(b'\n\n', pos + window)
+        end = n if end < 0 else end + 1
+        yield pos, end
+        pos = end
+
+
+def lines(buf, start, end):
+    """(line start, match) of the fence, heading, ref def lines"""
+    if not start:
+        m = _first.match(buf, 0, end)
+        if m:
+            yield 0, m
+    for m in _toc.finditer(buf, max(start - 1, 0), end):
+        yield m.start() + 1, m
+
+
+def events(buf):
+    """
+    (kind, offset, value) for 'open' and 'close' of fenced code, and - not
+    in fenced code - 'head' (level, title) and 'ref' (the definition line)
+    """
+    fence, prev = None, -1
+    for start, end in windows(buf):
+        for o, m in lines(buf, start, end):
+            f, last, prev = m.group(1), prev, o
+            if f:
+                if fence is None:
+                    fence = f
+                    yield 'open', o, None
+                elif f == fence:
+                    fence = None
+                    yield 'close', m.end(), None
+            elif fence is not None:
+                continue
+            elif m.group(4):
+                yield 'ref', o, m.group(4).strip()
+            else:
+                if m.group(2):
+                    level, title = len(m.group(2)), m.group(3)
+                else:
+                    # underline - the heading is the line before, if text:
+                    p = buf.rfind(b'\n', 0, o - 1) + 1
+                    if not o or p == last or not _setext.match(buf, p, o):
+                        continue
+                    level = 1 if m.group(5)[:1] == b'=' else 2
+                    title, o = buf[p:o], p
+                title = title.strip().decode('utf-8', 'replace')
+                yield 'head', o, (level, title)
+        release(buf, start, end)
+
+
+def scan(buf):
+    """[(offset, level, title)] of the headings in buf (bytes or mmap)"""
+    return [(o, v[0], v[1]) for k, o, v in events(buf) if k == 'head']
+
+
+def blocks(buf, max_bytes=None):
+    """
+    (starts, heads, refs) of the top level blocks of buf: start offsets,
+    heading flags and the link reference definitions. Cut at headings and,
+    for long stretches w/o any, at paragraph borders - not in fenced code.
+    Compact arrays, a large spec has millions of blocks.
+    """
+    max_bytes = max_bytes or max_block_bytes
+    starts, heads, refs, free = array(_int64, [0]), bytearray(1), [], 0
+
+    def cut(end):
+        pos = max(free, starts[-1] + max_bytes)
+        while pos < end:
+            m = _par.search(buf, pos, end)
+            if not m:
+                break
+            starts.append(m.end())
+            heads.append(0)
+            pos = m.end() + max_bytes
+
+    fenced = False
+    for kind, o, v in events(buf):
+        if kind == 'close':
+            free, fenced = o, False
+        elif kind == 'ref':
+            refs.append(v.decode('utf-8', 'replace'))
+        else:
+            cut(o)
+            if kind == 'open':
+                fenced = True
+            elif o > starts[-1]:
+                starts.append(o)
+                heads.append(1)
+            else:
+                heads[-1] = 1
+    if not fenced:
+        cut(len(buf))
+    return starts, heads, refs
+
+
+def find(buf, sub, start=0, end=None):
+    """buf.find, windowed as the scan, releasing the pages"""
+    end = len(buf) if end is None else end
+    while start < end:
+        stop = min(start + window + len(sub), end)
+        i = buf.find(sub, start, stop)
+        release(buf, start, stop)
+        if i > -1 or stop == end:
+            return i
+        start = stop - len(sub) + 1
+    return -1
+
+
+def index(fn):
+    """the heading index of file fn, cached"""
+    fn = os.path.abspath(fn)
+    st = os.stat(fn)
+    # one cache file per document, indexes can be large:
+    key = hashlib.sha1(fn.encode('utf-8')).hexdigest()[:16]
+    cache = FileCache('toc-%s.json' % key)
+    idx = cache.get(fn, st)
+    if idx is None:
+        mm = mapped(fn)
+        idx = scan(mm) if mm is not None else []
+        if mm is not None:
+            mm.close()
+        cache.put(fn, st, idx)
+        cache.save()
+    return idx
+
+
+def toc_md(fn):
+    """The table of contents as markdown (nested list)"""
+    idx = index(fn)
+    if not idx:
+        return 'No headings in %s' % fn
+    top = min([l for _, l, _ in idx])
+    return '\n'.join(
+        ['%s- %s' % ('    ' * (l - top), t or '-') for _, l, t in idx]
+    )
+
+
+def section(fn, txt, min_lines=50):
+    """
+    The source from the first heading containing txt on - at least
+    min_lines source lines, ending at a heading. None if no heading has it.
+    """
+    idx = index(fn)
+    for i, (start, _, title) in enumerate(idx):
+        if txt in title:
+            break
+    else:
+        return None
+    mm = mapped(fn)
+    try:
+        # the end of the min_lines-th line, then the next heading:
+        pos = start
+        for _ in range(min_lines):
+            pos = mm.find(b'\n', pos) + 1
+            if not pos:
+                return mm[start:].decode('utf-8', 'replace')
+        j = i + 1
+        while j < len(idx) and idx[j][0] < pos:
+            j += 1
+        end = idx[j][0] if j < len(idx) else None
+        return mm[start:end].decode('utf-8', 'replace')
+    finally:
+        mm.close()
+
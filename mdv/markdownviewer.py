@@ -23,8 +23,16 @@
     -m         : monitor_file  : Monitor file for changes and redisplay FROM given substring
     -n NRS     : header_nrs    : Header numbering (default off. Say e.g. -3 or 1- or 1-5)
     -t THEME   : theme         : Key within the color ansi_table.json. 'random' accepted.
-    -u STYL    : link_style    : Link Style (it=inline table=default, h=hide, i=inline)
+    -u STYL    : link_style    : Link Style (it=inline table=default, h=hide, i=inline, dt=document table, f=footnotes, fs=per section)
     -x         : c_no_guess    : Do not try guess code lexer (guessing is a bit slow)
+    --tree DIR : tree_dir      : Docs of all python modules below DIR (see -C)
+    --serve    : serve         : Run as render server on a unix socket
+    --client   : client        : Render via the server (in-process if none runs)
+    --page     : page          : Page through the output, rendering it lazily
+    --toc      : toc           : Table of contents (headings) of MDFILE
+    --timings  : timings       : Wall times per render stage and block type to stderr
+    --profile FILE : profile   : Dump a cProfile (pstats) file of the render
+    --parser NAME : parser     : Markdown parser: markdown (default), cmark, mistletoe, commonmark, auto
 
 # Details
 
@@ -43,9 +51,9 @@ Happens like:
 
 #### File Formats
 
-We try yaml.  
-If not installed we try json.  
+We try json, then yaml (if installed).  
 If it is the custom config file we fail if not parsable.  
+Parsed configs are cached (in `~/.cache/mdv`) until the file changes.  
 If you prefer shell style config then source and export so you have it as environ.
 
 ### **-c COLS**: Columns
@@ -71,6 +79,10 @@ If the substring is not found we set it to the *first* character of the file -
 resulting in output from the top (if your terminal height can be derived
 correctly through the stty cmd).
 
+If a heading contains FROM, only the document from that heading on is read
+and rendered. The heading index (see `--toc`) is cached per file, keyed by
+its mtime and size.
+
 
 ## Themes
 
@@ -111,6 +123,45 @@ Mark inline markdown with a '_' following the docstring beginnings.
 - doc: Only docstrings with markdown
 - mod: Only the module level docstring
 
+With `--tree PKGDIR` we render the markdown docstrings of all python modules
+of a package into one document, with a table of contents. `-C mod` (the
+default then) shows only the module level docstrings, any other mode all of
+them. Extracted docs are cached by file mtime (in `~/.cache/mdv`), so
+re-runs over an unchanged tree are fast.
+
+
+## Pager:
+
+`mdv --page` is a built-in pager, rendering only what comes into view: the
+document is cut into top level blocks (at headings), rendered when scrolled
+to. `-f` and the search key `/` jump to a text w/o rendering anything in
+between. Files are memory mapped, only the blocks rendered are decoded.
+
+Keys: space/f/PgDn, b/PgUp, j/k/arrows, n/p (next/previous heading), g/G
+(top/end), / (search), q (quit).
+
+Files of 1MB and more are not read at once: they are rendered and written
+out piece by piece, cut at top level blocks. Header numbering continues over
+the pieces; hr widths are per piece.
+
+
+## Parsers:
+
+Python-Markdown parses by default. `--parser` picks cmark (paka.cmark),
+mistletoe or commonmark(.py) when installed, `auto` the fastest of them.
+These parse CommonMark: no tables (mistletoe: with), no admonitions, lists
+need no blank line before them. `-H` is always Python-Markdown's html.
+
+
+## Render Server:
+
+`mdv --serve` keeps imports, markdown pipelines, lexers and caches warm and
+renders for `mdv --client` invocations (same args otherwise) on the unix
+socket `$MDV_SOCKET` (default `$XDG_RUNTIME_DIR/mdv-<uid>.sock`, else in
+the temp dir). The client sends args, cwd, environ and terminal size and
+imports neither markdown nor pygments. If no server runs it renders
+in-process.
+
 
 ## File Monitor:
 
@@ -149,10 +200,12 @@ import sys
 PY3 = sys.version_info.major > 2
 
 
+import errno
 import io
 import os
 import textwrap
 import shutil
+import threading
 import time
 import markdown
 import re, imp
@@ -160,11 +213,20 @@ import markdown.util
 from markdown.util import etree
 from markdown.extensions.tables import TableExtension
 from random import randint
-from tabulate import tabulate
 from json import loads
 from markdown.treeprocessors import Treeprocessor
 from markdown.extensions import Extension, fenced_code
 from functools import partial
+from itertools import chain
+
+try:
+    from mdv import displaywidth, mdtable, headings, backends
+    from mdv.filecache import FileCache
+    from mdv.client import run_client
+except ImportError:  # started as script from a checkout
+    import displaywidth, mdtable, headings, backends
+    from filecache import FileCache
+    from client import run_client
 
 errout, envget = partial(print, file=sys.stderr), os.environ.get
 
@@ -236,7 +298,9 @@ left_indent = '  '
 # normal text color:
 color = T
 
-# it: inline table, h: hide, i: inline
+# it: inline table, h: hide, i: inline, dt: document table (one number per
+# url, listed where first used), f: footnotes (all urls listed at the end),
+# fs: footnotes per section (before h1 and h2 headings)
 show_links = 'it'
 
 
@@ -249,6 +313,17 @@ md_sample = ''
 
 # dir monitor recursion max:
 mon_max_files = 1000
+
+# tables with more rows are rendered in two passes, line by line, w/o
+# holding the formatted table in memory:
+table_stream_rows = 2000
+
+# tables wider than the terminal: 'wrap' cells within their columns,
+# 'cut': display the table in vertical strips, one after the other
+table_layout = 'wrap'
+
+# the parser, see backends.py (set per render, by --parser):
+md_parser = 'markdown'
 # ------------------------------------------------------------------ End Config
 
 # columns(!) - may be set to smaller width:
@@ -291,18 +366,29 @@ def die(msg):
     sys.exit(1)
 
 
-def parse_env_and_cli():
+_option_table = {}
+
+
+def option_table():
+    """cli flag -> (arg names, option name, help), parsed from __doc__ once"""
+    if not _option_table:
+        opts = __doc__.split('# Options', 1)[1].split('# Details', 1)[0]
+        opts = [_.lstrip().split(':', 2) for _ in opts.strip().splitlines()]
+        _option_table.update(
+            [
+                (l[0].split()[0], (l[0].split()[1:], l[1].strip(), l[2].strip()))
+                for l in opts
+                if len(l) > 2
+            ]
+        )
+    return _option_table
+
+
+def parse_env_and_cli(argv=None):
     """replacing docopt"""
-    kw, argv = {}, list(sys.argv[1:])
-    opts = __doc__.split('# Options', 1)[1].split('# Details', 1)[0].strip()
-    opts = [_.lstrip().split(':', 2) for _ in opts.splitlines()]
-    opts = dict(
-        [
-            (l[0].split()[0], (l[0].split()[1:], l[1].strip(), l[2].strip()))
-            for l in opts
-            if len(l) > 2
-        ]
-    )
+    kw = {}
+    argv = list(sys.argv[1:] if argv is None else argv)
+    opts = option_table()
 
     # check environ:
     aliases = {
@@ -335,7 +421,7 @@ def parse_env_and_cli():
 # code analysis for hilite:
 try:
     from pygments import lex, token
-    from pygments.lexers import get_lexer_by_name
+    from pygments.lexers import get_lexer_by_name, get_lexer_for_filename
     from pygments.lexers import guess_lexer as pyg_guess_lexer
 
     have_pygments = True
@@ -345,12 +431,13 @@ except ImportError:  # pragma: no cover
 
 if PY3:
     unichr = chr
-    from html.parser import HTMLParser
+    from html import unescape as html_unescape
 
     string_type = str
 else:
     from HTMLParser import HTMLParser
 
+    html_unescape = HTMLParser().unescape
     string_type = basestring
 
     def breakpoint():
@@ -397,8 +484,31 @@ def read_themes():
     return themes
 
 
-# can unescape:
-html_parser = HTMLParser()
+unescape_memo = {}
+unescape_memo_max = 4096  # entries, then we start over
+unescape_memo_len = 256  # longer strings are not memoized
+
+
+def unescape(s):
+    """
+    html entities -> chars. Most text has none, then it's s, at once.
+    Short strings (link texts, cells, ..) repeat, they are memoized.
+    Long ones are mostly escaped code, w/o other entities than these:
+    """
+    if '&' not in s:
+        return s
+    if len(s) > unescape_memo_len:
+        t = s.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"')
+        if t.count('&') == t.count('&amp;'):
+            return t.replace('&amp;', '&')
+        return html_unescape(s)
+    r = unescape_memo.get(s)
+    if r is None:
+        if len(unescape_memo) >= unescape_memo_max:
+            unescape_memo.clear()
+        r = unescape_memo[s] = html_unescape(s)
+    return r
+
 you_like = 'You like this theme?'
 
 
@@ -442,8 +552,7 @@ def build_hl_by_token():
 
 def clean_ansi(s):
     # if someone does not want the color foo:
-    ansi_escape = re.compile(r'\x1b[^m]*m')
-    return ansi_escape.sub('', s)
+    return displaywidth.ansi_escape.sub('', s)
 
 
 # markers: tab is 09, omit that
@@ -525,21 +634,39 @@ def set_theme(theme=None, for_code=None, theme_info=None):
             build_hl_by_token()
 
 
-def style_ansi(raw_code, lang=None):
-    """ actual code hilite """
+def lexer_alias(n):
+    # not found:
+    if n == 'markdown':
+        return 'md'
+    return n
+
+
+lexers = {}
+
+
+def lexer_by_name(name):
+    """lexers are reusable, creating them is not free - cache them"""
+    try:
+        return lexers[name]
+    except KeyError:
+        lexer = lexers[name] = get_lexer_by_name(name)
+        return lexer
 
-    def lexer_alias(n):
-        # not found:
-        if n == 'markdown':
-            return 'md'
-        return n
 
+def get_lexer(raw_code, lang=None, filename=None):
+    """lexer by lang, by filename (if guessing), guessed or our default"""
     lexer = 0
     if lang:
         try:
-            lexer = get_lexer_by_name(lexer_alias(lang))
+            lexer = lexer_by_name(lexer_alias(lang))
+        except ValueError:
+            print(col('Lexer for %s not found' % lang, R))
+
+    if not lexer and filename and guess_lexer:
+        try:
+            lexer = get_lexer_for_filename(filename)
         except ValueError:
-            print(col(R, 'Lexer for %s not found' % lang))
+            pass
 
     if not lexer:
         try:
@@ -552,14 +679,22 @@ def style_ansi(raw_code, lang=None):
     if not lexer:
         for l in def_lexer, 'yaml', 'python', 'c':
             try:
-                lexer = get_lexer_by_name(lexer_alias(l))
+                lexer = lexer_by_name(lexer_alias(l))
                 break
             except:
                 # OUR def_lexer (python) was overridden,but not found.
                 # still we should not fail. lets use yaml. or python:
                 continue
+    return lexer
+
+
+def style_ansi(raw_code, lang=None):
+    """ actual code hilite """
+    return ansi_tokens(lex(raw_code, get_lexer(raw_code, lang)))
 
-    tokens = lex(raw_code, lexer)
+
+def ansi_tokens(tokens):
+    """(type, value) tokens -> colored code"""
     cod = []
     for t, v in tokens:
         if not v:
@@ -725,22 +860,33 @@ class Tags:
             s = style_ansi(raw_code, lang=lang)
 
         # outest hir is 2, use it for fenced:
-        ind = ' ' * kw.get('hir', 2)
         # if from_fenced_block: ... WE treat equal.
-
-        # shift to the far left, no matter the indent (screenspace matters):
-        firstl = s.split('\n')[0]
-        del_spaces = ' ' * (len(firstl) - len(firstl.lstrip()))
-        s = ('\n' + s).replace('\n%s' % del_spaces, '\n')[1:]
-
-        # we want an indent of one and low vis prefix. this does it:
-        code_lines = ('\n' + s).splitlines()
-        prefix = '\n%s%s %s' % (ind, low(code_pref), col('', C, no_reset=1))
-        code_lines.pop() if code_lines[-1] == '\x1b[0m' else None
-        code = prefix.join(code_lines)
-        code = code.replace('\x01--', ':-')
-        return code + '\n' + reset_col
-
+        code = code_block(s, kw.get('hir', 2))
+        return code.replace('\x01--', ':-')
+
+
+def code_block(s, hir=2):
+    """colored code -> shifted left, lines with low vis prefix"""
+    ind = ' ' * hir
+    # shift to the far left, no matter the indent (screenspace matters):
+    firstl = s.split('\n')[0]
+    del_spaces = ' ' * (len(firstl) - len(firstl.lstrip()))
+    s = ('\n' + s).replace('\n%s' % del_spaces, '\n')[1:]
+
+    # we want an indent of one and low vis prefix. this does it:
+    code_lines = ('\n' + s).splitlines()
+    prefix = '\n%s%s %s' % (ind, low(code_pref), col('', C, no_reset=1))
+    code_lines.pop() if code_lines[-1] == '\x1b[0m' else None
+    return prefix.join(code_lines) + '\n' + reset_col
+
+
+inline_tags = ('a', 'em', 'code', 'strong')
+# our marks for inline markup, colored by col:
+inline_marks = {
+    'code': (code_start, code_end),
+    'strong': (stng_start, stng_end),
+    'em': (emph_start, emph_end),
+}
 
 if PY3:
     elstr = lambda el: etree.tostring(el).decode('utf-8')
@@ -749,24 +895,15 @@ else:
 
 
 def is_text_node(el):
-    """ """
-    s = elstr(el)
-    # strip our tag:
-    html = s.split('<%s' % el.tag, 1)[1].split('>', 1)[1].rsplit('>', 1)[0]
-    # do we start with another tagged child which is NOT in inlines:?
-    if not html.startswith('<'):
-        return 1, html
-    for inline in ('<a', '<em>', '<code>', '<strong>'):
-        if html.startswith(inline):
-            return 1, html
-    return 0, 0
+    """Text with inline markup, formatted as one? Else blocks within."""
+    return 1 if el.text or not len(el) or el[0].tag in inline_tags else 0
 
 
 # ----------------------------------------------------- Text Termcols Adaptions
 def rewrap(el, t, ind, pref):
     """ Reasonably smart rewrapping checking punctuations """
-    cols = max(term_columns - len(ind + pref), 5)
-    if el.tag == 'code' or len(t) <= cols:
+    cols = max(term_columns - displaywidth.width(ind + pref), 5)
+    if el.tag == 'code' or displaywidth.visible_width(t) <= cols:
         return t
 
     # this is a code replacement marker of markdown.py. Don't split the
@@ -775,7 +912,7 @@ def rewrap(el, t, ind, pref):
         return t
 
     dedented = textwrap.dedent(t).strip()
-    ret = textwrap.fill(dedented, width=cols)
+    ret = displaywidth.fill(dedented, cols)
     return ret
 
     # forgot why I didn't use textwrap from the beginning. In case there is a
@@ -815,344 +952,528 @@ def rewrap(el, t, ind, pref):
 
 def split_blocks(text_block, w, cols, part_fmter=None):
     """ splits while multiline blocks vertically (for large tables) """
-    ts = []
-    for line in text_block.splitlines():
-        parts = []
-        # make equal len:
-        line = line.ljust(w, ' ')
-        # first part full width, others a bit indented:
-        parts.append(line[:cols])
-        scols = cols - 2
-        # the txt_block_cut in low makes the whole secondary tables
-        # low. which i find a feature:
-        # if you don't want it remove the col(.., L)
-        parts.extend(
-            [
-                ' ' + col(txt_block_cut, L, no_reset=1) + line[i : i + scols]
-                for i in range(cols, len(line), scols)
-            ]
-        )
-        ts.append(parts)
-
-    blocks = []
-    for block_part_nr in range(len(ts[0])):
-        tpart = []
-        for lines_block in ts:
-            tpart.append(lines_block[block_part_nr])
-        if part_fmter:
-            part_fmter(tpart)
-        tpart[1] = col(tpart[1], H3)
-        blocks.append('\n'.join(tpart))
-    t = '\n'.join(blocks)
+    lines = text_block.splitlines()
+    w = max([w] + [displaywidth.width(l) for l in lines])
+    edge_fmt = None
+    if part_fmter:
+
+        def edge_fmt(l):
+            t = [l]
+            part_fmter(t)
+            return t[0]
+
+    t = '\n'.join(iter_split_blocks(lambda: iter(lines), w, cols, edge_fmt))
     return '\n%s\n' % t
 
 
+def iter_split_blocks(lines, w, cols, edge_fmt=None):
+    """
+    Vertical parts of a block of w columns, one part after the other.
+    lines: callable delivering the (plain) lines, once per part - so that
+    the block need not be in memory (streamed tables).
+    edge_fmt: formatter for first and last line of every part.
+    """
+    dw = displaywidth
+    # first part full width, others a bit indented:
+    scols = cols - 2
+    # the txt_block_cut in low makes the whole secondary tables
+    # low. which i find a feature:
+    # if you don't want it remove the col(.., L)
+    cut_pref = ' ' + col(txt_block_cut, L, no_reset=1)
+    for i in [0] + list(range(cols, w, scols)):
+        last, nr = None, 0
+        for line in lines():
+            # make equal len (display columns, not chars):
+            line = dw.ljust(line, w)
+            if i:
+                line = cut_pref + dw.cut(line, i, i + scols)
+            else:
+                line = dw.cut(line, 0, cols)
+            if last is not None:
+                yield edge_fmt(last) if edge_fmt and nr == 1 else last
+            if nr == 1:
+                line = col(line, H3)
+            last, nr = line, nr + 1
+        if last is not None:
+            yield edge_fmt(last) if edge_fmt else last
+
+
 # ---------------------------------------------------- Create the treeprocessor
-def replace_links(el, html):
-    """digging through inline "<a href=..."
+class NestedLink(Exception):
+    pass
+
+
+def inline_text(el):
     """
-    parts = html.split('<a ')
-    if len(parts) == 1:
-        return None, html
-    links_list, cur_link = [], 0
-    links = [l for l in el.getchildren() if 'href' in l.keys()]
-    if not len(parts) == len(links) + 1:
-        # there is an html element within which we don't support,
-        # e.g. blockquote
-        return None, html
-    cur = ''
-    while parts:
-        cur += parts.pop(0).rsplit('</a>')[-1]
-        if not parts:
-            break
+    el's text and inline children -> (links_list, text with our marks for
+    code, strong, em and links), walking the tree once.
+    Links are marked and numbered only when all are direct children, else
+    they stay html, as other tags we don't style (img, ..).
+    links_list: (nr, href) of the links to list after the text.
+    """
+    out, refs = [el.text or ''], []
+    try:
+        inline_walk(el, out, refs)
+    except NestedLink:
+        out, refs = [el.text or ''], None
+        inline_walk(el, out, refs)
+    links_list = []
+    # numbered now, the walk might have been given up:
+    for i, href in refs or ():
+        out[i] = link_ref(href, links_list)
+    return links_list, ''.join(out)
+
+
+def inline_walk(el, out, refs, top=True):
+    for c in el:
+        tag = c.tag
+        if tag in inline_marks:
+            start, end = inline_marks[tag]
+            out.append(start)
+            out.append(c.text or '')
+            inline_walk(c, out, refs, False)
+            out.append(end)
+        elif tag == 'br':
+            out.append('\n')
+        elif tag == 'a' and refs is not None:
+            if not top:
+                raise NestedLink
+            out.append(link_start)
+            out.append(c.text or '')
+            inline_walk(c, out, refs, False)
+            out.append(link_end)
+            refs.append((len(out), c.get('href', '')))
+            out.append('')  # the link_ref
+        elif tag == 'a':
+            out.append('<a %s>' % ' '.join(['%s="%s"' % i for i in c.items()]))
+            out.append(c.text or '')
+            inline_walk(c, out, refs, False)
+            out.append('</a>')
+        elif tag == 'ul' or tag == 'ol':
+            # nested list of an li, formatted on its own
+            return
+        else:
+            out.append(raw_inline(c))
+        out.append(c.tail or '')
+
+
+class LinkTable(object):
+    """Document wide link numbers (-u dt, f, fs): each url numbered once"""
+
+    def __init__(self):
+        self.nrs = {}
+        self.hrefs = []
+        self.listed = 0  # footnotes given, see link_notes
+
+    def number(self, href):
+        """-> (nr, new)"""
+        nr = self.nrs.get(href)
+        if nr is not None:
+            return nr, False
+        self.hrefs.append(href)
+        nr = self.nrs[href] = len(self.hrefs)
+        return nr, True
+
+
+link_table = LinkTable()
+doc_link_styles = ('dt', 'f', 'fs')
+
+
+def link_notes_text():
+    """the footnotes after the document"""
+    if show_links not in ('f', 'fs'):
+        return ''
+    return ''.join([l + '\n' for l in link_notes()])
+
+
+def link_notes():
+    """footnote lines of the urls numbered since the last call (-u f, fs)"""
+    t = link_table
+    nr = t.listed
+    t.listed = len(t.hrefs)
+    return [low('%s[%s] %s' % (left_indent, i + 1, t.hrefs[i]))
+            for i in range(nr, t.listed)]
+
+
+def link_mark(nr):
+    """1 -> ①, .. 50 -> ㊿, then [51], .."""
+    if nr <= 20:
+        return unichr(link_start_ord + nr - 1)
+    if nr <= 35:
+        return unichr(0x3251 + nr - 21)
+    if nr <= 50:
+        return unichr(0x32B1 + nr - 36)
+    return '[%s]' % nr
+
+
+def link_ref(href, links_list):
+    """what follows the link text: (href), or the number into the list"""
+    if show_links == 'h':
+        return ''
+    if show_links == 'i':
+        if '&' in href:
+            href = unescape(href)
+        return low('(%s)' % href)
+    if show_links in doc_link_styles:
+        nr, new = link_table.number(href)
+        if new and show_links == 'dt':
+            links_list.append((nr, href))
+    else:  # inline table (it), numbered per text block
+        nr = len(links_list) + 1
+        links_list.append((nr, href))
+    return '%s ' % link_mark(nr)
+
+
+def raw_inline(el):
+    """an inline element we don't style (img, ..): as html"""
+    tail, el.tail = el.tail, None
+    try:
+        s = elstr(el)
+    finally:
+        el.tail = tail
+    s = s.replace('<br />', '\n')
+    for tag, (start, end) in inline_marks.items():
+        s = s.replace('<%s>' % tag, start).replace('</%s>' % tag, end)
+    return unescape(s)
+
 
-        # indicating link formatting start:
-        cur += link_start
-
-        # the 'a' xml element:
-        link = links[cur_link]
-
-        # bug in the markdown api? link el is not providing inlines!!
-        # -> get them from the html:
-        # cur += link.text or ''
-        cur += parts[0].split('>', 1)[1].split('</a', 1)[0] or ''
-        cur += link_end
-        if show_links != 'h':
-            if show_links == 'i':
-                cur += low('(%s)' % link.get('href', ''))
-            else:  # inline table (it)
-                # we build a link list, add the number like ① :
-                try:
-                    cur += '%s ' % unichr(link_start_ord + cur_link)
-                except NameError:
-                    # fix for py3
-                    # http://stackoverflow.com/a/2352047
-                    cur += '%s ' % chr(link_start_ord + cur_link)
-                links_list.append(link.get('href', ''))
-        cur_link += 1
-    return links_list, cur
+section_tags = ('h1', 'h2')  # -u fs
+# of a quoted line, after its colors:
+leading_spaces = re.compile(r'(?:\x1b\[[\d;]*m)*( *)')
 
 
 class AnsiPrinter(Treeprocessor):
     header_tags = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'h7', 'h8')
 
     def run(self, doc):
-        tags = Tags()
+        self.tags = tags = Tags()
         for h in cur_header_state:
             setattr(tags, 'h%s' % h, partial(tags.h, level=h))
+        out = []
+        timings = getattr(self.markdown, 'timings', None)
+        if timings is None:
+            self.format(doc, out)
+        else:
+            # the same, timed per top level block (see timings.py):
+            for c in doc:
+                timings.block(c.tag, self.format, c, out, 1, parent=doc)
+        self.markdown.ansi = '\n'.join(flat_out(out))
+
+    def format(self, el, out, hir=0, parent=None):
+        """
+        Main loop: el formatted into out.
 
-        def get_attr(el, attr):
-            for c in list(el.items()):
-                if c[0] == attr:
-                    return c[1]
-            return ''
+        No recursion, deep nestings (quotes of mail threads) would hit the
+        recursion limit. We work off a stack of todos, (method, args), the
+        methods push the children. Last pushed is done first.
+        """
+        todo = [(self.element, (el, out, hir, parent))]
+        while todo:
+            f, args = todo.pop()
+            f(todo, *args)
+
+    def element(self, todo, el, out, hir, parent):
+        """
+        One element, the children pushed as todos.
 
-        def formatter(el, out, hir=0, pref='', parent=None):
-            """
-            Main recursion.
+        debugging:
+        if el.tag == 'code':
+            import pdb
 
-            debugging:
+            pdb.set_trace()
+            # for c in el.getchildren()[0].getchildren(): print c.text, c
+        print('---------')
+        print(el, el.text)
+        print('---------')
+        """
+        if el.tag in section_tags and show_links == 'fs':
+            # the footnotes of the section before:
+            out.extend(link_notes())
+        if el.tag == 'br':
+            out.append('\n')
+            return
+        # for c in el.getchildren(): print c.text, c
+        links_list, is_txt_and_inline_markup = None, 0
+        if el.tag == 'blockquote':
+            return self.blockquote(todo, el, out, hir)
+
+        if el.tag == 'hr':
+            return out.append(self.tags.hr('', hir=hir))
+
+        if (
+            el.text
+            or el.tag == 'p'
+            or el.tag == 'li'
+            or el.tag.startswith('h')
+        ):
+            el.text = el.text or ''
+            # <a attributes>foo... -> we want "foo....". Is it a sub
+            # tag or inline text?
             if el.tag == 'code':
-                import pdb
-
-                pdb.set_trace()
-                # for c in el.getchildren()[0].getchildren(): print c.text, c
-            print('---------')
-            print(el, el.text)
-            print('---------')
-            """
-            if el.tag == 'br':
-                out.append('\n')
-                return
-            # for c in el.getchildren(): print c.text, c
-            links_list, is_txt_and_inline_markup = None, 0
-            if el.tag == 'blockquote':
-                for el1 in el.getchildren():
-                    iout = []
-                    formatter(el1, iout, hir + 2, parent=el)
-                    pr = col(bquote_pref, H1)
-                    sp = ' ' * (hir + 2)
-                    for l in iout:
-                        for l1 in l.splitlines():
-                            if sp in l1:
-                                l1 = ''.join(l1.split(sp, 1))
-                            out.append(pr + l1)
-                return
-
-            if el.tag == 'hr':
-                return out.append(tags.hr('', hir=hir))
-
-            if (
-                el.text
-                or el.tag == 'p'
-                or el.tag == 'li'
-                or el.tag.startswith('h')
-            ):
-                el.text = el.text or ''
-                # <a attributes>foo... -> we want "foo....". Is it a sub
-                # tag or inline text?
-                if el.tag == 'code':
-                    t = html_parser.unescape(el.text)
-                else:
-                    is_txt_and_inline_markup, html = is_text_node(el)
-
-                    if is_txt_and_inline_markup:
-                        # foo:  \nbar -> will be seing a foo:<br>bar with
-                        # mardkown.py. Code blocks are already quoted -> no prob.
-                        html = html.replace('<br />', '\n')
-                        # strip our own closing tag:
-                        t = html.rsplit('<', 1)[0]
-                        links_list, t = replace_links(el, html=t)
-                        for tg, start, end in (
-                            ('<code>', code_start, code_end),
-                            ('<strong>', stng_start, stng_end),
-                            ('<em>', emph_start, emph_end),
-                        ):
-                            t = t.replace('%s' % tg, start)
-                            close_tag = '</%s' % tg[1:]
-                            t = t.replace(close_tag, end)
-                        t = html_parser.unescape(t)
-                    else:
-                        t = el.text
-                t = t.strip()
-                admon = ''
-                pref = body_pref = ''
-                if t.startswith('!!! '):
-                    # we allow admons with spaces. so check for startswith:
-                    _ad = None
-                    for k in admons:
-                        if t[4:].startswith(k):
-                            _ad = k
-                            break
-                    # not found - markup using hte first one's color:
-                    if not _ad:
-                        k = t[4:].split(' ', 1)[0]
-                        admons[k] = admons.values()[0]
-
-                    pref = body_pref = '┃ '
-                    pref += k.capitalize()
-                    admon = k
-                    t = t.split(k, 1)[1]
-
-                # set the parent, e.g. nrs in ols:
-                if el.get('pref'):
-                    # first line pref, like '-':
-                    pref = el.get('pref')
-                    # next line prefs:
-                    body_pref = ' ' * len(pref)
-                    el.set('pref', '')
-
-                ind = left_indent * hir
-                if el.tag in self.header_tags:
-                    # header level:
-                    hl = int(el.tag[1:])
-                    ind = ' ' * (hl - 1)
-                    hir += hl
-
-                t = rewrap(el, t, ind, pref)
-
-                # indent. can color the prefixes now, no more len checks:
-                if admon:
-                    out.append('\n')
-                    pref = col(pref, globals()[admons[admon]])
-                    body_pref = col(body_pref, globals()[admons[admon]])
-
-                if pref:
-                    # different color per indent:
-                    h = globals()['H%s' % (((hir - 2) % 5) + 1)]
-                    if pref == list_pref:
-                        pref = col(pref, h)
-                    elif pref.split('.', 1)[0].isdigit():
-                        pref = col(pref, h)
-
-                t = ('\n' + ind + body_pref).join((t).splitlines())
-                t = ind + pref + t
-
-                # headers outer left: go sure.
-                # actually... NO. commented out.
-                # if el.tag in self.header_tags:
-                #    pref = ''
-
-                # calling the class Tags  functions
-                # IF the parent is li and we have a linebreak then the renderer
-                # delivers <li><p>foo</p> instead of <li>foo, i.e. we have to
-                # omit the linebreak and append the text of p to the previous
-                # result, (i.e. the list separator):
-                tag_fmt_func = getattr(tags, el.tag, plain)
-                if (
-                    type(parent) == type(el)
-                    and parent.tag == 'li'
-                    and not parent.text
-                    and el.tag == 'p'
-                ):
-                    _out = tag_fmt_func(t.lstrip(), hir=hir)
-                    out[-1] += _out
-                else:
-                    out.append(tag_fmt_func(t, hir=hir))
-
-                if admon:
-                    out.append('\n')
-
-                if links_list:
-                    i = 1
-                    for l in links_list:
-                        out.append(low('%s[%s] %s' % (ind, i, l)))
-                        i += 1
-
-            # have children?
-            #    nr for ols:
-            if is_txt_and_inline_markup:
-                if el.tag == 'li':
-                    childs = el.getchildren()
-                    for nested in 'ul', 'ol':
-                        if childs and childs[-1].tag == nested:
-                            ul = childs[-1]
-                            # do we have a nested sublist? the li was inline
-                            # formattet,
-                            # split all from <ul> off and format it as own tag:
-                            # (ul always at the end of an li)
-                            out[-1] = out[-1].split('<%s>' % nested, 1)[0]
-                            formatter(ul, out, hir + 1, parent=el)
-                return
-
-            if el.tag == 'table':
-                # processed all here, in one sweep:
-                # markdown ext gave us a xml tree from the ascii,
-                # our part here is the cell formatting and into a
-                # python nested list, then tabulate spits
-                # out ascii again:
-                def borders(t):
-                    t[0] = t[-1] = low(t[0].replace('-', '─'))
-
-                def fmt(cell, parent):
-                    """ we just run the whole formatter - just with a fresh new
-                    result list so that our 'out' is untouched """
-                    _cell = []
-                    formatter(cell, out=_cell, hir=0, parent=parent)
-                    return '\n'.join(_cell)
-
-                t = []
-                for he_bo in 0, 1:
-                    for Row in el[he_bo].getchildren():
-                        row = []
-                        t.append(row)
-                        for cell in Row.getchildren():
-                            row.append(fmt(cell, row))
-                cols = term_columns
-                # good ansi handling:
-                tbl = tabulate(t)
-
-                # do we have right room to indent it?
-                # first line is seps, so no ansi esacapes foo:
-                w = len(tbl.split('\n', 1)[0])
-                if w <= cols:
-                    t = tbl.splitlines()
-                    borders(t)
-                    # center:
-                    ind = (cols - w) / 2
-                    # too much:
-                    ind = hir
-                    tt = []
-                    for line in t:
-                        tt.append('%s%s' % (ind * left_indent, line))
-                    out.extend(tt)
+                t = unescape(el.text)
+            else:
+                is_txt_and_inline_markup = is_text_node(el)
+                if is_txt_and_inline_markup:
+                    links_list, t = inline_text(el)
                 else:
-                    # TABLE CUTTING WHEN NOT WIDTH FIT
-                    # oh snap, the table bigger than our screen. hmm.
-                    # hey lets split into vertical parts:
-                    # but len calcs are hart, since we are crammed with esc.
-                    # seqs.
-                    # -> get rid of them:
-                    tc = []
-                    for row in t:
-                        tc.append([])
-                        l = tc[-1]
-                        for cell in row:
-                            l.append(clean_ansi(cell))
-                    # again sam:
-                    # note: we had to patch it, it inserted '\n' within cells!
-                    table = tabulate(tc)
-                    out.append(
-                        split_blocks(table, w, cols, part_fmter=borders)
-                    )
-                return
-
-            nr = 0
-            for c in el:
-                if el.tag == 'ul':  # or el.tag == 'li':
-                    c.set('pref', list_pref)
-                elif el.tag == 'ol':
-                    nr += 1
-                    c.set('pref', str(nr) + '. ')
-
-                # handle the ``` style unindented code blocks -> parsed as p:
-                formatter(c, out, hir + 1, parent=el)
-            # if el.tag == 'ul' or el.tag == 'ol' and not out[-1] == '\n':
-            #    out.append('\n')
+                    t = el.text
+            self.text(el, t, links_list, out, hir, parent)
+
+        # have children?
+        #    nr for ols:
+        if is_txt_and_inline_markup:
+            if el.tag == 'li':
+                childs = el.getchildren()
+                for nested in 'ul', 'ol':
+                    if childs and childs[-1].tag == nested:
+                        ul = childs[-1]
+                        # do we have a nested sublist? the li was inline
+                        # formatted up to it (inline_walk), the list is
+                        # formatted as own tag - its lines set their
+                        # colors, no reset before (as always):
+                        # (ul always at the end of an li)
+                        if not links_list and out[-1].endswith(reset_col):
+                            out[-1] = out[-1][:-len(reset_col)]
+                        todo.append((self.element, (ul, out, hir + 1, el)))
+            return
+
+        if el.tag == 'table':
+            return self.table(el, out, hir)
+
+        nr = 0
+        for c in el:
+            if el.tag == 'ul':  # or el.tag == 'li':
+                c.set('pref', list_pref)
+            elif el.tag == 'ol':
+                nr += 1
+                c.set('pref', str(nr) + '. ')
+        # handle the ``` style unindented code blocks -> parsed as p:
+        todo.extend([(self.element, (c, out, hir + 1, el))
+                     for c in reversed(el)])
+        # if el.tag == 'ul' or el.tag == 'ol' and not out[-1] == '\n':
+        #    out.append('\n')
+
+    def blockquote(self, todo, el, out, hir, quotes=()):
+        # every child into its own list, then quoted. Nested quotes are not
+        # quoted per level but carry the levels down, their children's
+        # lines are prefixed once, for all levels. quotes: the indents to
+        # strip, of the outermost first:
+        quotes += (hir + 2,)
+        for el1 in reversed(el):
+            if el1.tag == 'blockquote':
+                todo.append((self.blockquote, (el1, out, hir + 2, quotes)))
+                continue
+            iout = []
+            todo.append((self.quoted, (iout, out, quotes)))
+            todo.append((self.element, (el1, iout, hir + 2, el)))
+
+    def quoted(self, todo, iout, out, quotes):
+        pr = col(bquote_pref, H1) * len(quotes)
+        left = {}  # leading spaces -> left of them, unindented
+        for l in flat_out(iout):
+            for l1 in l.splitlines():
+                a, b = leading_spaces.match(l1).span(1)
+                n = b - a
+                if n not in left:
+                    k = n
+                    for sp in reversed(quotes):
+                        if k >= sp:
+                            k -= sp
+                    left[n] = k
+                out.append(pr + l1[:a] + l1[b - left[n]:])
+
+    def text(self, el, t, links_list, out, hir, parent):
+        """a text block: wrapped, indented, prefixed, colored"""
+        tags = self.tags
+        t = t.strip()
+        admon = ''
+        pref = body_pref = ''
+        if t.startswith('!!! '):
+            # we allow admons with spaces. so check for startswith:
+            _ad = None
+            for k in admons:
+                if t[4:].startswith(k):
+                    _ad = k
+                    break
+            # not found - markup using hte first one's color:
+            if not _ad:
+                k = t[4:].split(' ', 1)[0]
+                admons[k] = admons.values()[0]
+
+            pref = body_pref = '┃ '
+            pref += k.capitalize()
+            admon = k
+            t = t.split(k, 1)[1]
+
+        # set the parent, e.g. nrs in ols:
+        if el.get('pref'):
+            # first line pref, like '-':
+            pref = el.get('pref')
+            # next line prefs:
+            body_pref = ' ' * len(pref)
+            el.set('pref', '')
+
+        ind = left_indent * hir
+        if el.tag in self.header_tags:
+            # header level:
+            hl = int(el.tag[1:])
+            ind = ' ' * (hl - 1)
+            hir += hl
+
+        t = rewrap(el, t, ind, pref)
+
+        # indent. can color the prefixes now, no more len checks:
+        if admon:
+            out.append('\n')
+            pref = col(pref, globals()[admons[admon]])
+            body_pref = col(body_pref, globals()[admons[admon]])
+
+        if pref:
+            # different color per indent:
+            h = globals()['H%s' % (((hir - 2) % 5) + 1)]
+            if pref == list_pref:
+                pref = col(pref, h)
+            elif pref.split('.', 1)[0].isdigit():
+                pref = col(pref, h)
+
+        t = ('\n' + ind + body_pref).join((t).splitlines())
+        t = ind + pref + t
+
+        # headers outer left: go sure.
+        # actually... NO. commented out.
+        # if el.tag in self.header_tags:
+        #    pref = ''
+
+        # calling the class Tags  functions
+        # IF the parent is li and we have a linebreak then the renderer
+        # delivers <li><p>foo</p> instead of <li>foo, i.e. we have to
+        # omit the linebreak and append the text of p to the previous
+        # result, (i.e. the list separator):
+        tag_fmt_func = getattr(tags, el.tag, plain)
+        if (
+            type(parent) == type(el)
+            and parent.tag == 'li'
+            and not parent.text
+            and el.tag == 'p'
+        ):
+            _out = tag_fmt_func(t.lstrip(), hir=hir)
+            out[-1] += _out
+        else:
+            out.append(tag_fmt_func(t, hir=hir))
+
+        if admon:
+            out.append('\n')
+
+        for nr, l in links_list or ():
+            out.append(low('%s[%s] %s' % (ind, nr, l)))
+
+    def table(self, el, out, hir):
+        # processed all here, in one sweep:
+        # markdown ext gave us a xml tree from the ascii,
+        # our part here is the cell formatting, then mdtable pads
+        # the cells, using the alignment row of the md:
+        def borders(t):
+            t[0] = t[-1] = low(t[0].replace('-', '─'))
+
+        def fmt(cell, parent):
+            """ we just run the whole formatter - just with a fresh new
+            result list so that our 'out' is untouched """
+            _cell = []
+            self.format(cell, _cell, 0, parent)
+            return mdtable.norm_cell('\n'.join(_cell))
+
+        aligns = [c.get('align') for c in el[0][0]]
+        if len(el[0]) + len(el[1]) > table_stream_rows:
+            return out.append(streamed_table(el, fmt, aligns, hir, borders))
+
+        t = []
+        for he_bo in 0, 1:
+            for Row in el[he_bo].getchildren():
+                row = []
+                t.append(row)
+                for cell in Row.getchildren():
+                    row.append(fmt(cell, row))
+        cols = term_columns
+        # one measuring pass, for all cases below:
+        measured = mdtable.measure(t)
+        w = mdtable.table_width(measured[0])
+        widths = None
+        if w > cols and table_layout == 'wrap':
+            widths = table_layout_widths(
+                measured[0], mdtable.min_widths(t, len(aligns)), hir
+            )
+        if w <= cols or widths:
+            t = mdtable.render(t, aligns, measured, '-', widths)
+            borders(t)
+            # center:
+            ind = (cols - w) / 2
+            # too much:
+            ind = hir
+            tt = []
+            for line in t:
+                tt.append('%s%s' % (ind * left_indent, line))
+            out.extend(tt)
+        else:
+            # TABLE CUTTING WHEN NOT WIDTH FIT
+            # oh snap, the table bigger than our screen. hmm.
+            # hey lets split into vertical parts:
+            # but len calcs are hart, since we are crammed with esc.
+            # seqs.
+            # -> get rid of them (same widths, no new measuring):
+            t = mdtable.render(mdtable.plain(t), aligns, measured, fill='-')
+            out.append(
+                split_blocks('\n'.join(t), w, cols, part_fmter=borders)
+            )
 
-        out = []
-        formatter(doc, out)
-        self.markdown.ansi = '\n'.join(out)
+
+def streamed_table(el, fmt, aligns, hir, borders):
+    """lines of a large table, see mdtable.StreamedTable"""
+    rows = lambda: chain(el[0], el[1])
+    fmt_row = lambda Row: [fmt(cell, None) for cell in Row]
+    wrap = table_layout == 'wrap'
+    st = mdtable.StreamedTable(rows, fmt_row, aligns, with_mins=wrap)
+    cols, widths = term_columns, None
+    if st.width > cols and wrap:
+        widths = table_layout_widths(st.widths, st.mins, hir)
+    elif st.width > cols:
+        # as split_blocks, but re-rendering the rows for each part:
+        yield ''
+        for l in iter_split_blocks(
+            lambda: st.lines(fill='-', plain=True),
+            st.width,
+            cols,
+            edge_fmt=lambda l: low(l.replace('-', '─')),
+        ):
+            yield l
+        yield ''
+        return
+    ind = hir * left_indent
+    lines = st.lines(widths=widths)
+    b = ind + low(next(lines))
+    yield b
+    prev = next(lines)
+    for line in lines:
+        yield ind + prev
+        prev = line
+    # prev is the bottom border now:
+    yield b
+
+
+def table_layout_widths(widths, mins, hir):
+    """column widths of a too wide table, wrapping its cells"""
+    avail = term_columns - len(hir * left_indent)
+    avail -= len(mdtable.col_sep) * (len(widths) - 1)
+    return mdtable.layout(widths, mins, avail)
+
+
+def flat_out(out):
+    """our output list may contain line generators (streamed tables)"""
+    for o in out:
+        if isinstance(o, string_type):
+            yield o
+        else:
+            for l in o:
+                yield l
 
 
 def set_hr_widths(result):
@@ -1171,9 +1492,15 @@ def set_hr_widths(result):
         if hr_marker in line:
             hrs.append(line)
             continue
-        if len(line) < mw:
+        if len(line) < mw and displaywidth.is_ascii(line):
+            continue
+        cl = clean_ansi(line)
+        l = len(cl)
+        # no more than 2 cols per char, so only then we need the real width:
+        if 2 * l <= mw:
             continue
-        l = len(clean_ansi(line))
+        if not displaywidth.is_ascii(cl):
+            l = displaywidth.width(cl)
         if l > mw:
             mw = l
 
@@ -1181,7 +1508,7 @@ def set_hr_widths(result):
         # pos of hr marker is indent, derives full width:
         # (more indent = less '-'):
         hcl = clean_ansi(hr)
-        ind = len(hcl) - len(hcl.split(hr_marker, 1)[1]) - 1
+        ind = displaywidth.width(hcl.split(hr_marker, 1)[0])
         w = min(term_columns, mw) - 2 * ind
         hrf = hr.replace(hr_marker, hr_sep * w)
         result = result.replace(hr, hrf)
@@ -1195,61 +1522,307 @@ class AnsiPrintExtension(Extension):
         md.treeprocessors.add('ansi_print_ext', ansi_print_ext, '>inline')
 
 
+code_mode, md_mode = 1, 2
+# md docstrings start with a '_' following the docstring opener, on its own
+# line, i.e. '"""_' and end with the closer, also on its own line:
+doc_start = re.compile(r'^("{3}|\'{3}|/\*)_[^\S\n]*$', re.M)
+doc_ends = {
+    '"""': re.compile(r'^"{3}[^\S\n]*$', re.M),
+    "\'\'\'": re.compile(r"^'{3}[^\S\n]*$", re.M),
+    '/*': re.compile(r'^\*/[^\S\n]*$', re.M),
+}
+doc_openers = ('"""_', "'''_", '/*_')
+
+
+def code_spans(src, what='all'):
+    """
+    Single forward scan over a source file for the -C mode.
+    Yields (mode, start, end) for code and markdown docstring spans, as
+    offsets into src, i.e. w/o copying it.
+    what in  all, code, doc, mod
+    """
+    if what not in ('all', 'code', 'doc', 'mod'):
+        what = 'all'
+    pos, n = 0, len(src)
+    while pos < n:
+        m = doc_start.search(src, pos)
+        end = m.start() if m else n
+        if end > pos and what in ('all', 'code'):
+            yield code_mode, pos, end
+        if not m:
+            return
+        start = m.end() + 1
+        e = doc_ends[m.group(1)].search(src, start)
+        end = e.start() if e else n
+        if what != 'code':
+            yield md_mode, start, end
+        if not e or what == 'doc':
+            # 'doc': only module level docstring:
+            return
+        pos = e.end() + 1
+
+
 def do_code_hilite(md, what='all'):
     """
     "inverse" mode for source code highlighting:
     the file contains mainly code and md is within docstrings
     what in  all, code, doc, mod
+    Returns markdown with the code in fenced blocks (for the html mode).
     """
-    if what not in ('all', 'code', 'doc', 'mod'):
-        what = 'all'
-    code_mode, md_mode = 1, 2
-    blocks, block, mode = [], [], code_mode
-    blocks.append([mode, block])
-    lines = ('\n' + md).splitlines()
-    mdstart = '\x01'
-    while lines:
-        line = lines.pop(0)
-        if mode == code_mode:
-            if line.rstrip() in ('"""_', "'''_", '/*_'):
-                mdstart = line.rstrip()[:-1]
-                mode = md_mode
-                block = []
-                if mdstart == '/*':
-                    mdstart = '*/'
-                blocks.append([md_mode, block])
-                continue
+    out = []
+    for mode, start, end in code_spans(md, what):
+        b = md[start:end].rstrip('\n')
+        if not b:
+            continue
+        out.append('```\n%s\n```' % b if mode == code_mode else b)
+    return '\n'.join(out)
 
-        elif line.rstrip() == mdstart:
-            if what == 'doc':
-                # only module level docstring:
-                break
-            mode = code_mode
-            block = []
-            blocks.append([code_mode, block])
+
+def doc_token_span(src, pos, v):
+    """
+    (start, end) of the markdown within a docstring or comment token v at
+    pos, if marked like the line scan wants it, i.e. opener with '_' and
+    closer on their own lines, at col 0. Else None.
+    """
+    if pos and src[pos - 1] != '\n':
+        return None
+    m = doc_start.match(v)
+    if not m:
+        return None
+    e = doc_ends[m.group(1)].search(v, m.end())
+    if not e or v[e.end():].strip():
+        return None
+    return pos + m.end() + 1, pos + e.start()
+
+
+def token_spans(src, what, lexer):
+    """
+    code_spans from one lexer run over the whole source: the marked
+    docstring or comment tokens are the md spans, code spans come with
+    their tokens, so that we can color them w/o lexing again.
+    Yields (mode, start, end, tokens), tokens being [(pos, type, value)].
+    """
+    with_code = what in ('all', 'code')
+    pos, toks = 0, []
+    for i, t, v in lexer.get_tokens_unprocessed(src):
+        doc = None
+        # the string test first, token type containment is slow:
+        if v.startswith(doc_openers) and (
+            t in token.String or t in token.Comment
+        ):
+            doc = doc_token_span(src, i, v)
+        if not doc:
+            if with_code:
+                toks.append((i, t, v))
             continue
+        if with_code and i > pos:
+            yield code_mode, pos, i, toks
+        if what != 'code':
+            yield md_mode, doc[0], doc[1], None
+        if what == 'doc':
+            # only module level docstring:
+            return
+        pos, toks = i + len(v), []
+    if with_code and len(src) > pos:
+        yield code_mode, pos, len(src), toks
 
-        if mode == code_mode:
-            if what in ('all', 'code'):
-                block.append(line)
 
-        elif what != 'code':
-            block.append(line)
+def clip_tokens(toks, start, end):
+    """(type, value) of the tokens, cut to [start, end)"""
+    for i, t, v in toks:
+        if i + len(v) <= start or i >= end:
+            continue
+        if i < start or i + len(v) > end:
+            v = v[max(start - i, 0) : end - i]
+        yield t, v
 
-    out = []
-    for mode, block in blocks:
-        b = '\n'.join(block)
-        if not b:
+
+def code_hilite_ansi(MD, src, what='all', filename=None):
+    """
+    The -C mode w/o the detour via fenced blocks in one big markdown
+    document: code goes straight to the highlighter, only the docstrings
+    are parsed as markdown.
+
+    Pygments runs once over the whole source. Its docstring and comment
+    tokens tell where the markdown is, the others are colored as they are.
+    If the lexer does not know the comment syntax (say C source but python
+    is the default lexer) we find no docs that way and use the line scan
+    (code_spans), lexing each code span on its own.
+    """
+    spans = ()
+    if have_pygments:
+        lexer = get_lexer(src, filename=filename)
+        spans = list(token_spans(src, what, lexer))
+        if doc_start.search(src) and md_mode not in [s[0] for s in spans]:
+            spans = ()
+    if not spans:
+        spans = [(m, s, e, None) for m, s, e in code_spans(src, what)]
+
+    tags, out = Tags(), []
+    nl = (token.Text, '\n') if have_pygments else None
+    for mode, start, end, toks in spans:
+        part = src[start:end]
+        if mode == md_mode:
+            MD.reset()
+            out.append(convert_ansi(MD, part))
+            continue
+        stripped = part.strip()
+        if not stripped:
             continue
-        if mode == code_mode:
-            out.append('```\n%s\n```' % b)
+        if toks is None:
+            code = tags.code(stripped, from_fenced_block=1, lang='')
         else:
-            out.append('\n'.join(block))
+            start += len(part) - len(part.lstrip())
+            end = start + len(stripped)
+            toks = chain(clip_tokens(toks, start, end), [nl])
+            code = code_block(ansi_tokens(toks))
+        # like a fenced block within a top level paragraph:
+        out.append(col(left_indent, T, no_reset=1) + code + reset_col)
     return '\n'.join(out)
 
 
+def convert_ansi(MD, md):
+    """markdown -> ansi, with the raw html (e.g. fenced code) put back"""
+    backends.convert(MD, md, md_parser)
+    ansi = MD.ansi
+    stash = MD.htmlStash.rawHtmlBlocks
+    if not stash:
+        return ansi
+
+    # The RAW html within source, incl. fenced code blocks:
+    # phs are numbered like this in the md, we replace back, in one pass:
+    tags = Tags()
+    raws = {}
+
+    def raw_html(nr):
+        raw = unescape(stash[nr])
+        if raw[:3].lower() == "<br":
+            return "\n"
+        pre = "<pre><code"
+        if raw.startswith(pre):
+            _, raw = raw.split(pre, 1)
+            if 'class="' in raw:
+                # language:
+                lang = raw.split('class="', 1)[1].split('"')[0]
+            else:
+                lang = ""
+            raw = raw.split(">", 1)[1].rsplit("</code>", 1)[0]
+            raw = tags.code(raw.strip(), from_fenced_block=1, lang=lang)
+        return raw
+
+    def sub(m, after=-1):
+        nr = int(m.group(1))
+        if nr <= after or nr >= len(stash):
+            return m.group(0)
+        raw = raws.get(nr)
+        if raw is None:
+            raw = raws[nr] = raw_html(nr)
+            if ph_start in raw:
+                # those of later blocks are replaced within (one by one,
+                # as they were):
+                raw = raws[nr] = placeholder.sub(lambda m: sub(m, nr), raw)
+        return raw
+
+    return placeholder.sub(sub, ansi)
+
+
+def split_from_txt(from_txt):
+    """-f 'Some Head:10' -> ('Some Head', 10), lines default: a screen"""
+    txt, lines = (from_txt + ":%s" % (term_rows - 6)).split(":")[:2]
+    return txt, int(lines)
+
+
+def from_txt_excerpt(ansi, from_txt):
+    """The -f feature: the lines from the given substring on"""
+    if not from_txt.split(":", 1)[0] in ansi:
+        # display from top then:
+        from_txt = ansi.strip()[1]
+    from_txt, mon_lines = split_from_txt(from_txt)
+    pre, post = ansi.split(from_txt, 1)
+    post = "\n".join(post.split("\n")[:mon_lines])
+    return "\n(...)%s%s%s" % (
+        "\n".join(pre.rsplit("\n", 2)[-2:]),
+        from_txt,
+        post,
+    )
+
+
+# markdown's for the raw html, see convert_ansi:
+placeholder = re.compile(markdown.util.HTML_PLACEHOLDER % r'(\d+)')
+ph_start = markdown.util.HTML_PLACEHOLDER.split('%s', 1)[0]
+md_pipelines = {}
+# our state is in module globals, main() is not reentrant - renders from
+# threads (server, aio) hold this:
+render_lock = threading.RLock()
+
+
+def md_pipeline(tab_length=4):
+    """Our Markdown instance, built once per tab_length, reset for reuse"""
+    MD = md_pipelines.get(tab_length)
+    if MD is not None:
+        MD.reset()
+        return MD
+    # Create an instance of the Markdown class with the new extension
+    MD = md_pipelines[tab_length] = markdown.Markdown(
+        tab_length=tab_length,
+        extensions=[
+            AnsiPrintExtension(),
+            TableExtension(),
+            fenced_code.FencedCodeExtension(),
+        ],
+    )
+    return MD
+
+
+stream_min = 1 << 20  # larger files are rendered piece by piece
+stream_chunk = 1 << 16  # markdown bytes per piece
+out_buffer = 1 << 16
+
+
+def stream_md(fn):
+    """
+    The markdown of a (large) file in pieces of about stream_chunk bytes,
+    cut at top level block borders, each with the link reference
+    definitions of the document appended. Only the piece is decoded.
+    """
+    mm = headings.mapped(fn)
+    if mm is None:
+        return
+    try:
+        starts, _, refs = headings.blocks(mm)
+        refs = '\n\n' + '\n'.join(refs) if refs else ''
+        start, end = 0, len(mm)
+        for s in chain(starts[1:], [end]):
+            if s - start >= stream_chunk or s == end:
+                yield mm[start:s].decode('utf-8', 'replace') + refs
+                headings.release(mm, start, s)
+                start = s
+    finally:
+        mm.close()
+
+
+def write_chunks(chunks):
+    """Write utf-8 encoded to stdout, through a large buffer"""
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        for c in chunks:  # not a real file
+            sys.stdout.write(c)
+        return
+    sys.stdout.flush()
+    out = io.BufferedWriter(io.FileIO(fd, 'wb', closefd=False), out_buffer)
+    for c in chunks:
+        out.write(c if isinstance(c, bytes) else c.encode('utf-8'))
+    out.flush()
+
+
+def main(*args, **kw):
+    """ md is markdown string. alternatively we use filename and read """
+    return "".join(chunks(*args, **kw))
+
+
 # fmt: off
-def main(
+def chunks(
     md               = None,
     filename         = None,
     cols             = None,
@@ -1268,10 +1841,29 @@ def main(
     tab_length       = 4,
     no_change_defenc = False,
     header_nrs       = False,
+    tree_dir         = None,
+    toc              = None,
+    timings          = None,
+    profile          = None,
+    parser           = None,
     **kw
 ):
-    """ md is markdown string. alternatively we use filename and read """
+    """
+    The rendering of main, as iterator of output chunks: large files are
+    rendered piece by piece (stream_md), the rest at once.
+    """
     # fmt: on
+    if timings or profile:
+        try:
+            from mdv.timings import timed_chunks
+        except ImportError:  # started as script from a checkout
+            from timings import timed_chunks
+        args = dict(locals(), timings=None, profile=None)
+        args.update(args.pop('kw'))
+        args.pop('timed_chunks')
+        for c in timed_chunks(chunks, args, timings, profile):
+            yield c
+        return
 
     # if I don't do this here, then I'll get probs when being
     # used as a lib:
@@ -1282,16 +1874,31 @@ def main(
     parse_header_nrs(header_nrs)
 
     tab_length = tab_length or 4
-    global def_lexer
+    global def_lexer, md_parser
+    md_parser = backends.get(parser)
     if c_def_lexer:
         def_lexer = c_def_lexer
-    py_config_file = os.path.expanduser("~/.mdv.py")
-    if os.path.exists(py_config_file):
-        exec_globals = {}
-        exec(io.open(py_config_file, encoding="utf-8").read(), exec_globals)
-        globals().update(exec_globals)
+    # the overrides of ~/.mdv.py, executed once per process:
+    globals().update(py_config.load())
+
+    if tree_dir:
+        try:
+            from mdv import srctree
+        except ImportError:  # started as script from a checkout
+            import srctree
+        md = srctree.tree_md(tree_dir, code_hilite or 'mod')
+        code_hilite = None
+
+    if filename and filename != '-' and not md:
+        if toc:
+            md = headings.toc_md(filename)
+        elif from_txt and not (code_hilite or do_html):
+            # seek to the section, if it is a heading:
+            txt, lines = split_from_txt(from_txt)
+            md = headings.section(filename, txt, max(lines, 50))
 
     args = locals()
+    stream = False
     if not md:
         if not filename:
             print("Using sample markdown:")
@@ -1303,6 +1910,11 @@ def main(
         else:
             if filename == "-":
                 md = sys.stdin.read()
+            elif (
+                not (from_txt or code_hilite or do_html)
+                and os.path.getsize(filename) >= stream_min
+            ):
+                stream = True
             else:
                 with open(filename) as f:
                     md = f.read()
@@ -1330,9 +1942,10 @@ def main(
             else:
                 args["c_theme"] = k
             print(main(**args))
-        return ""
+        return
 
-    global show_links
+    global show_links, link_table
+    link_table = LinkTable()
     if display_links:
         show_links = "i"
     if link_style:  # rules
@@ -1363,76 +1976,50 @@ def main(
         if not have_pygments:
             errout(col("No pygments, can not analyze code for hilite", R))
 
-    # Create an instance of the Markdown class with the new extension
-    MD = markdown.Markdown(
-        tab_length=int(tab_length),
-        extensions=[
-            AnsiPrintExtension(),
-            TableExtension(),
-            fenced_code.FencedCodeExtension(),
-        ],
-    )
+    MD = md_pipeline(int(tab_length))
 
 
-    if code_hilite:
-        md = do_code_hilite(md, code_hilite)
-    the_html = MD.convert(md)
-    reset_cur_header_state()
-    # print the_html
-    # html?
     if do_html:
-        return the_html
+        if code_hilite:
+            md = do_code_hilite(md, code_hilite)
+        the_html = MD.convert(md)
+        reset_cur_header_state()
+        yield the_html
+        return
 
-    # who wants html, here is our result:
-    ansi = MD.ansi
+    if stream:
+        # header numbering continues over the pieces, hr widths don't:
+        try:
+            for s in stream_md(filename):
+                s = set_hr_widths(convert_ansi(MD, s)) + "\n"
+                yield clean_ansi(s) if no_colors else s
+            s = link_notes_text()
+            yield clean_ansi(s) if no_colors else s
+        finally:
+            reset_cur_header_state()
+        if not no_colors:
+            yield "\n"
+        return
 
-    # The RAW html within source, incl. fenced code blocks:
-    # phs are numbered like this in the md, we replace back:
-    PH = markdown.util.HTML_PLACEHOLDER
-    stash = MD.htmlStash
-    nr = -1
-    tags = Tags()
-    for ph in stash.rawHtmlBlocks:
-        nr += 1
-        raw = html_parser.unescape(ph)
-        if raw[:3].lower() == "<br":
-            raw = "\n"
-        pre = "<pre><code"
-        if raw.startswith(pre):
-            _, raw = raw.split(pre, 1)
-            if 'class="' in raw:
-                # language:
-                lang = raw.split('class="', 1)[1].split('"')[0]
-            else:
-                lang = ""
-            raw = raw.split(">", 1)[1].rsplit("</code>", 1)[0]
-            raw = tags.code(raw.strip(), from_fenced_block=1, lang=lang)
-        ansi = ansi.replace(PH % nr, raw)
+    # who wants html, here is our result:
+    if code_hilite:
+        ansi = code_hilite_ansi(MD, md, code_hilite, filename)
+    else:
+        ansi = convert_ansi(MD, md)
+    reset_cur_header_state()
 
     # don't want these: gone through the extension now:
     # ansi = ansi.replace('```', '')
 
     # sub part display (the -f feature)
     if from_txt:
-        if not from_txt.split(":", 1)[0] in ansi:
-            # display from top then:
-            from_txt = ansi.strip()[1]
-        from_txt, mon_lines = (from_txt + ":%s" % (term_rows - 6)).split(":")[
-            :2
-        ]
-        mon_lines = int(mon_lines)
-        pre, post = ansi.split(from_txt, 1)
-        post = "\n".join(post.split("\n")[:mon_lines])
-        ansi = "\n(...)%s%s%s" % (
-            "\n".join(pre.rsplit("\n", 2)[-2:]),
-            from_txt,
-            post,
-        )
+        ansi = from_txt_excerpt(ansi, from_txt)
 
-    ansi = set_hr_widths(ansi) + "\n"
+    ansi = set_hr_widths(ansi) + "\n" + link_notes_text()
     if no_colors:
-        return clean_ansi(ansi)
-    return ansi + "\n"
+        yield clean_ansi(ansi)
+    else:
+        yield ansi + "\n"
 
 
 # Following just file monitors, not really core feature so the prettyfier:
@@ -1588,34 +2175,101 @@ def monitor_dir(args):
         sleep()
 
 
+class PyConfig(object):
+    """
+    The python config file (~/.mdv.py), compiled and executed once per
+    process and again only when its mtime changes - not on every render
+    (monitor modes, lib usage).
+    values: the names it defines, which main() puts into our globals.
+    """
+
+    def __init__(self, fn):
+        self.fn, self.mtime, self.values = fn, None, {}
+
+    def load(self):
+        try:
+            mtime = os.stat(self.fn).st_mtime
+        except OSError:
+            self.mtime, self.values = None, {}
+            return self.values
+        if mtime != self.mtime:
+            with io.open(self.fn, encoding='utf-8') as fd:
+                code = compile(fd.read(), self.fn, 'exec')
+            values = {}
+            exec(code, values)
+            values.pop('__builtins__', None)
+            self.values, self.mtime = values, mtime
+        return self.values
+
+
+py_config = PyConfig(os.path.expanduser('~/.mdv.py'))
+
+
+def parse_config(s):
+    """json if it is (cheap, stdlib), else yaml. Raises if neither parses"""
+    try:
+        return loads(s)
+    except ValueError:
+        pass
+    import yaml
+
+    return yaml.safe_load(s) or {}
+
+
 def load_config(filename, s=None, yaml=None):
+    """
+    The config file (filename or ~/.mdv or ~/.config/mdv) as dict.
+    The parsed config is cached by the file's mtime, so we neither parse
+    nor import yaml on every start.
+    """
     fns = (filename,) if filename else ('.mdv', '.config/mdv')
+    st = None
     for f in fns:
         fn = os.path.expanduser('~/' + f) if f[0] == '.' else f
-        if not os.path.exists(fn):
+        try:
+            st = os.stat(fn)
+        except OSError:
             if filename:
                 die('Not found: %s' % filename)
-            else:
-                continue
+            continue
+        cache = FileCache('config.json')
+        m = cache.get(fn, st)
+        if m is not None:
+            return m
         with open(fn) as fd:
             s = fd.read()
             break
     if not s:
         return {}
     try:
-        import yaml
-        m = yaml.safe_load(s)
-    except:
-        import json
-        try:
-            m = json.loads(s)
-        except:
-            errout('could not parse config at %s. Have yaml: %s' % (fn, yaml))
-            if filename:
-                sys.exit(1)
-            m = {}
+        m = parse_config(s)
+    except Exception as ex:
+        errout('could not parse config at %s: %s' % (fn, ex))
+        if filename:
+            sys.exit(1)
+        return {}
+    if st:
+        cache.put(fn, st, m)
+        cache.save()
     return m
 
+
+class Config(dict):
+    """
+    The configuration of a cli run, built once: the config file (~/.mdv or
+    ~/.config/mdv), overlaid by any -F file, the environ ($MDV_*) and the
+    cli args.
+    """
+
+    def __init__(self, argv=None):
+        dict.__init__(self, load_config(None))
+        cli = parse_env_and_cli(argv)
+        fn = cli.get('config_file')
+        if fn:
+            self.update(load_config(filename=fn))
+        self.update(cli)
+
+
 # backwards compat - this was there before:
 load_yaml_config = load_config
 
@@ -1630,12 +2284,7 @@ def run():
     global is_app
     is_app = 1
     fix_py2_default_encoding() if not PY3 else None
-    kw = load_config(None) or {}
-    kw1 = parse_env_and_cli()
-    fn = kw1.get('config_file')
-    if fn:
-        kw.update(load_config(filename=fn))
-    kw.update(kw1)
+    kw = Config()
     doc = __doc__[1:]
     if kw.get('sh_help'):
         d = dict(
@@ -1653,12 +2302,30 @@ def run():
         res += main(**d)
         print(res if PY3 else str(res))
         sys.exit(0)
-    if kw.get('monitor_file'):
+    if kw.get('serve'):
+        try:
+            from mdv import server
+        except ImportError:  # started as script from a checkout
+            import server
+        server.serve()
+    elif kw.get('client') and run_client():
+        pass
+    elif kw.get('page'):
+        try:
+            from mdv import pager
+        except ImportError:  # started as script from a checkout
+            import pager
+        pager.page(kw)
+    elif kw.get('monitor_file'):
         monitor(kw)
     elif kw.get('monitor_dir'):
         monitor_dir(kw)
     else:
-        print(main(**kw) if PY3 else str(main(**kw)))
+        try:
+            write_chunks(chain(chunks(**kw), ["\n"]))
+        except IOError as ex:  # e.g. piped into head
+            if ex.errno != errno.EPIPE:
+                raise
 
 
 if __name__ == '__main__':  # pragma: no cover
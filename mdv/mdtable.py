@@ -0,0 +1,298 @@
+# coding: utf-8
+"""
+Markdown table rendering.
+
+The generic tabulate guesses a type per cell (int, float, text), reformats
+numbers and recomputes widths in several passes. For markdown tables we
+know better: cells are (already colored) text and the alignment is given by
+the GFM alignment row (`| :-- | --: | :-: |`). So we measure each cell once
+and pad it, the output layout being the one of tabulate's "simple" format
+without headers, which we used before:
+
+    ────  ─────
+    Item  Value
+    Pipe  $1
+    ────  ─────
+
+The visible widths and the uncolored cells (for the vertical split of too
+wide tables) come from the same single measuring pass.
+
+Tables wider than the terminal are laid out by `layout`: every column gets
+at least its longest word (min content width) if possible, the remaining
+room is distributed in proportion to how much more each column would need
+to show its cells unwrapped (max content width). Cells are then wrapped
+within their column, colors carried over to the next line.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+try:
+    from mdv.displaywidth import visible_width, ansi_escape, char_width, width
+    from mdv.displaywidth import break_points, is_ascii
+except ImportError:  # started as script from a checkout
+    from displaywidth import visible_width, ansi_escape, char_width, width
+    from displaywidth import break_points, is_ascii
+
+col_sep = '  '
+reset_col = '\x1b[0m'
+_tokens = re.compile(r'(\x1b[^m]*m|\s+)')
+
+
+def norm_cell(cell):
+    """tabulate compat: no surrounding whitespace, no linebreaks in cells"""
+    return cell.strip().replace('\n', ' ')
+
+
+def measure(rows, ncols=None):
+    """-> (max visible width per column, visible widths of all cells)"""
+    if ncols is None:
+        ncols = max([len(r) for r in rows] or [0])
+    widths, cell_widths = [0] * ncols, []
+    for row in rows:
+        cws = [visible_width(cell) for cell in row]
+        cell_widths.append(cws)
+        for i, w in enumerate(cws):
+            if w > widths[i]:
+                widths[i] = w
+    return widths, cell_widths
+
+
+def pad(cell, w, align=None, vw=None):
+    """Pad a cell to w visible columns. vw: its width, if known"""
+    missing = w - (visible_width(cell) if vw is None else vw)
+    if missing <= 0:
+        return cell
+    if align == 'right':
+        return ' ' * missing + cell
+    if align == 'center':
+        l = missing // 2
+        return ' ' * l + cell + ' ' * (missing - l)
+    return cell + ' ' * missing
+
+
+def fmt_row(row, widths, aligns=(), cws=None):
+    """One table line. Missing cells are empty. cws: the cell widths"""
+    cells, n, na = [], len(row), len(aligns)
+    for i, w in enumerate(widths):
+        if i < n:
+            cell, vw = row[i], cws[i] if cws else None
+        else:
+            cell, vw = '', 0
+        cells.append(pad(cell, w, aligns[i] if i < na else None, vw))
+    return col_sep.join(cells).rstrip()
+
+
+def min_width(cell):
+    """Longest word (visible columns), i.e. the min content width.
+    Wide (CJK) chars may be broken anywhere, so they are words of their own.
+    """
+    cell = ansi_escape.sub('', cell)
+    if is_ascii(cell):
+        return max([len(w) for w in cell.split()] or [0])
+    return max([width(p) for w in cell.split() for p in break_points(w)]
+               or [0])
+
+
+def min_widths(rows, ncols):
+    widths = [0] * ncols
+    for row in rows:
+        for i, cell in enumerate(row):
+            w = min_width(cell)
+            if w > widths[i]:
+                widths[i] = w
+    return widths
+
+
+def layout(widths, mins, avail):
+    """
+    Column widths for a table of max content widths `widths` and min
+    content widths `mins`, to fit into avail columns (w/o separators).
+    """
+    if sum(widths) <= avail:
+        return list(widths)
+    n = len(widths)
+    avail = max(avail, n)
+    mins = [min(m, w) for m, w in zip(mins, widths)]
+    smin = sum(mins)
+    if smin <= avail:
+        # all words fit, share the rest by what the columns lack:
+        extra, lack = avail - smin, sum(widths) - smin
+        target = [m + (w - m) * float(extra) / lack for m, w in zip(mins, widths)]
+    else:
+        # even words must be broken, share by min widths:
+        target = [max(1.0, m * float(avail) / smin) for m in mins]
+    res = [max(1, int(t)) for t in target]
+    # distribute the rounding rest, largest fractions first:
+    rest = avail - sum(res)
+    by_frac = sorted(range(n), key=lambda i: res[i] - target[i])
+    for i in by_frac:
+        if rest <= 0:
+            break
+        if res[i] < widths[i]:
+            res[i] += 1
+            rest -= 1
+    return res
+
+
+def wrap(cell, w):
+    """
+    Wrap a (colored) cell into lines of max w visible columns.
+    Color codes active at a line break are closed and reopened on the next.
+    """
+    if visible_width(cell) <= w:
+        return [cell]
+    # words as lists of parts (text and escapes), with their widths:
+    words, word, word_w = [], [], 0
+    for tok in _tokens.split(cell):
+        if not tok:
+            continue
+        if tok[0] == '\x1b':
+            word.append(tok)
+        elif tok.isspace():
+            if word:
+                words.append((word, word_w))
+            word, word_w = [], 0
+        else:
+            word.append(tok)
+            word_w += width(tok)
+    if word:
+        words.append((word, word_w))
+
+    lines, cur, st = [], [], {'w': 0, 'active': []}
+
+    def add(part, pw=0):
+        cur.append(part)
+        st['w'] += pw
+        if part[:1] == '\x1b':
+            if part == reset_col:
+                st['active'] = []
+            else:
+                st['active'].append(part)
+
+    def flush():
+        active = st['active']
+        lines.append(''.join(cur) + (reset_col if active else ''))
+        cur[:] = [''.join(active)] if active else []
+        st['w'] = 0
+
+    for parts, ww in words:
+        if st['w'] and st['w'] + 1 + ww > w and ww <= w:
+            flush()
+        if st['w']:
+            if st['w'] + 1 >= w:
+                flush()
+            else:
+                add(' ', 1)
+        if st['w'] + ww <= w:
+            for part in parts:
+                add(part, 0 if part[:1] == '\x1b' else width(part))
+            continue
+        # longer than the column - break anywhere:
+        for part in parts:
+            if part[:1] == '\x1b':
+                add(part)
+                continue
+            for c in part:
+                cw = char_width(c)
+                if st['w'] + cw > w and st['w']:
+                    flush()
+                add(c, cw)
+    if st['w'] or not lines:
+        flush()
+    return lines
+
+
+def fmt_rows_wrapped(row, widths, aligns=()):
+    """The lines of one table row, cells wrapped into their widths"""
+    cells = [wrap(c, w) for c, w in zip(row, widths)]
+    height = max([len(c) for c in cells] or [1])
+    if height == 1:
+        return [fmt_row(row, widths, aligns)]
+    return [
+        fmt_row([c[i] if i < len(c) else '' for c in cells], widths, aligns)
+        for i in range(height)
+    ]
+
+
+def border(widths, fill='─'):
+    return col_sep.join([fill * w for w in widths])
+
+
+def table_width(widths):
+    return sum(widths) + len(col_sep) * max(len(widths) - 1, 0)
+
+
+def render(rows, aligns=(), measured=None, fill='─', widths=None):
+    """
+    rows: list of lists of (ansi) cell strings, normed via norm_cell.
+    aligns: per column 'left', 'right', 'center' or None (= left).
+    measured: result of measure(rows), if already at hand.
+    widths: column widths (see layout) to wrap the cells into.
+    Returns the table lines, first and last being the borders.
+    """
+    if widths is not None:
+        lines = [border(widths, fill)]
+        for row in rows:
+            lines.extend(fmt_rows_wrapped(row, widths, aligns))
+        lines.append(lines[0])
+        return lines
+    widths, cell_widths = measured or measure(rows)
+    b = border(widths, fill)
+    lines = [b]
+    for row, cws in zip(rows, cell_widths):
+        lines.append(fmt_row(row, widths, aligns, cws))
+    lines.append(b)
+    return lines
+
+
+def plain(rows):
+    """The rows w/o color codes, e.g. to cut them into vertical blocks"""
+    return [[ansi_escape.sub('', cell) for cell in row] for row in rows]
+
+
+class StreamedTable(object):
+    """
+    Two pass rendering for very large tables: the first pass formats all
+    rows only to measure the column widths, the second one (on iteration of
+    lines()) formats them again and yields the lines one by one.
+    So we hold widths per column, never the formatted table.
+
+    rows: callable delivering the (source) rows, called once per pass.
+    fmt_row: source row -> list of (ansi) cell strings.
+    """
+
+    def __init__(self, rows, fmt_row, aligns=(), with_mins=False):
+        self.rows, self.fmt_row, self.aligns = rows, fmt_row, aligns
+        widths, mins = self.widths, self.mins = [], []
+        for row in rows():
+            for i, cell in enumerate(fmt_row(row)):
+                cell = norm_cell(cell)
+                w = visible_width(cell)
+                m = min_width(cell) if with_mins else 0
+                if i == len(widths):
+                    widths.append(w)
+                    mins.append(m)
+                    continue
+                if w > widths[i]:
+                    widths[i] = w
+                if m > mins[i]:
+                    mins[i] = m
+        self.width = table_width(widths)
+
+    def lines(self, fill='─', plain=False, widths=None):
+        """the table lines, first and last being the borders.
+        widths: column widths to wrap into (layout)"""
+        aligns = self.aligns
+        b = border(widths or self.widths, fill)
+        yield b
+        for row in self.rows():
+            cells = [norm_cell(c) for c in self.fmt_row(row)]
+            if plain:
+                cells = [ansi_escape.sub('', c) for c in cells]
+            if widths:
+                for l in fmt_rows_wrapped(cells, widths, aligns):
+                    yield l
+            else:
+                yield fmt_row(cells, self.widths, aligns)
+        yield b
@@ -0,0 +1,52 @@
+"""
+The parsers of backends.py, rendering bench.py's corpora:
+
+    python mdv/misc/perf_backends.py [scale] [cols]
+
+Per installed parser and corpus: ms of the whole render and of the parsing
+(Python-Markdown: parse + inline stage), best of 3.
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from mdv import backends, bench  # noqa
+from mdv.markdownviewer import main  # noqa
+from mdv.timings import Timings  # noqa
+
+scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+cols = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+names = [n for n in backends.names if backends.installed(n)]
+corpora = ['prose', 'nested_lists', 'fenced', 'tables', 'links']
+
+
+def best(md, parser, repeat=3):
+    r = None
+    for i in range(repeat):
+        t = Timings()
+        main(md=md, cols=cols, theme=bench.theme, c_theme=bench.c_theme,
+             parser=parser, timings=t)
+        parse = sum([t.stages.get(s, [0])[0] for s in ('parse', 'inline')])
+        if r is None or t.total < r[0]:
+            r = (t.total, parse)
+    return r
+
+
+print('%-13s %8s  %s' % ('corpus', 'bytes', ''.join(
+    ['%24s' % ('%s total/parse' % n) for n in names])))
+sums = dict([(n, [0, 0]) for n in names])
+for c in corpora:
+    md = bench.corpora[c](scale)
+    line = '%-13s %8s  ' % (c, len(md))
+    for n in names:
+        total, parse = best(md, n)
+        sums[n][0] += total
+        sums[n][1] += parse
+        line += '%24s' % ('%.1f / %.1f' % (total * 1000, parse * 1000))
+    print(line)
+    sys.stdout.flush()
+print('%-13s %8s  %s' % ('sum', '', ''.join(
+    ['%24s' % ('%.1f / %.1f' % (v[0] * 1000, v[1] * 1000))
+     for v in [sums[n] for n in names]])))
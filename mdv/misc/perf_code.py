@@ -0,0 +1,74 @@
+# coding: utf-8
+"""
+Source code mode (-C) on a large module.
+
+    python mdv/misc/perf_code.py [lines]
+
+Times the docstring split alone (old line popping vs. the regex scan),
+lexing per code span vs. once for the whole file, and the full -C all
+render.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import sys
+from time import time as t
+
+sys.path.insert(0, os.path.abspath(__file__).rsplit('/', 3)[0])
+import mdv
+
+mv = mdv.markdownviewer
+
+lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+chunk = '''
+def func_%s(a, b):
+    """_
+    Does *things* with `a` and `b`.
+    """
+    x = a + b  # comment
+    return [x for x in range(10)]
+
+'''
+
+
+def old_split(md):
+    # the former do_code_hilite loop, for comparison:
+    lines, mds, code, cur = md.splitlines(), [], [], None
+    while lines:
+        l = lines.pop(0)
+        if l.strip() in ('"""_', "'''_", '/*_'):
+            cur = mds
+            continue
+        if l.strip() in ('"""', "'''", '*/'):
+            cur = code
+            continue
+        (cur if cur is not None else code).append(l)
+    return mds, code
+
+
+def main():
+    src = ''.join([chunk % i for i in range(lines // 8)])
+    print('%s lines' % src.count('\n'))
+    t0 = t()
+    old_split(src)
+    print('old split (list.pop(0)): %.3fs' % (t() - t0))
+    t0 = t()
+    list(mv.code_spans(src, 'all'))
+    print('span scan:               %.3fs' % (t() - t0))
+    lexer = mv.get_lexer(src, 'python')
+    t0 = t()
+    for m, s, e in mv.code_spans(src, 'all'):
+        if m == mv.code_mode:
+            list(lexer.get_tokens(src[s:e]))
+    print('lexing per code span:    %.3fs' % (t() - t0))
+    t0 = t()
+    list(mv.token_spans(src, 'all', lexer))
+    print('one lexer run:           %.3fs' % (t() - t0))
+    t0 = t()
+    mdv.main(src, cols=80, code_hilite='all', c_no_guess=True,
+             c_def_lexer='python')
+    print('-C all render:           %.3fs' % (t() - t0))
+
+
+if __name__ == '__main__':
+    main()
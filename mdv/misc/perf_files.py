@@ -0,0 +1,52 @@
+"""
+Renders the test corpus (tests/files/*.md, 20/40/80/200 cols) and bench.py's
+nested_lists and links corpora:
+
+    python mdv/misc/perf_files.py [repeat]
+
+ms per file, best of repeat (default 5), with the AnsiPrinter ('tree') part.
+"""
+from __future__ import print_function
+
+import io
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..', '..'))
+from mdv import bench  # noqa
+from mdv.markdownviewer import main  # noqa
+from mdv.timings import Timings  # noqa
+
+repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+d = os.path.join(here, '..', 'tests', 'files')
+docs = []
+for f in sorted(os.listdir(d)):
+    if f.endswith('.md'):
+        with io.open(os.path.join(d, f), encoding='utf-8') as fd:
+            docs.append((f, fd.read()))
+docs.append(('nested_lists', bench.nested_lists(0.5)))
+docs.append(('links', bench.links(1)))
+
+
+def best(md):
+    r = None
+    for i in range(repeat):
+        t = Timings()
+        for cols in 20, 40, 80, 200:
+            main(md, cols=cols, theme=bench.theme, c_theme=bench.c_theme,
+                 c_no_guess=True, timings=t)
+        tree = t.stages['tree'][0]
+        if r is None or t.total < r[0]:
+            r = (t.total, tree)
+    return r
+
+
+print('%-20s %9s %9s' % ('file', 'total ms', 'tree ms'))
+sums = [0, 0]
+for f, md in docs:
+    total, tree = best(md)
+    sums[0] += total
+    sums[1] += tree
+    print('%-20s %9.1f %9.1f' % (f, total * 1000, tree * 1000))
+print('%-20s %9.1f %9.1f' % ('sum', sums[0] * 1000, sums[1] * 1000))
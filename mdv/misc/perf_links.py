@@ -0,0 +1,51 @@
+"""
+Renders a document with 10k links (an API index: list items with a link
+each, paragraphs with many, the urls repeating), per link style:
+
+    python mdv/misc/perf_links.py [links] [styles] [parser]
+
+e.g. `perf_links.py 10000 it,dt cmark`. ms of the render and of its tree
+stage (AnsiPrinter, where the links are done), best of 3, output lines.
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from mdv.markdownviewer import main  # noqa
+from mdv.timings import Timings  # noqa
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+styles = sys.argv[2].split(',') if len(sys.argv) > 2 else ['it', 'dt']
+parser = sys.argv[3] if len(sys.argv) > 3 else None
+
+
+def doc(n):
+    r, i = [], 0
+    while i < n:
+        r.append('## Module %s\n' % (i // 100))
+        for j in range(50):
+            r.append('- [func_%s](http://api.example.com/m%s#f%s) - does %s'
+                     % (i, i // 100, i, j))
+            i += 1
+        r.append('')
+        links = ['[see %s](http://api.example.com/m%s)' % (k, k % 20)
+                 for k in range(i, i + 50)]
+        r.append('Related: %s.\n' % ', '.join(links))
+        i += 50
+    return '\n'.join(r)
+
+
+md = doc(n)
+print('%s links, %s bytes' % (md.count(']('), len(md)))
+for style in styles:
+    best = None
+    for k in range(3):
+        t = Timings()
+        s = main(md, cols=100, theme='671.1616', c_theme='526.9416',
+                 link_style=style, parser=parser, timings=t)
+        if best is None or t.total < best[0]:
+            best = (t.total, t.stages['tree'][0])
+    print('%-4s %9.1f ms, tree %7.1f ms %7s lines'
+          % (style, best[0] * 1000, best[1] * 1000, s.count('\n')))
@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+Peak RSS and time for paging a large file: read and split into lines
+(Pager) vs. memory mapped (MappedPager), and `-f` (heading index, rendering
+one section). Each in a fresh process: open, jump near the end, one screen.
+
+    python mdv/misc/perf_mmap.py [MB]    (default 500)
+"""
+from __future__ import print_function, unicode_literals
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+root = os.path.abspath(__file__).rsplit('/', 3)[0]
+mb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+par = ' '.join(['Some *text* with `code` and a [link][1].'] * 20)
+
+job = '''
+import io, resource, sys, time
+sys.path.insert(0, %(root)r)
+from mdv import pager, markdownviewer as mv
+t0 = time.time()
+how, fn, ft = sys.argv[1:]
+if how == 'read':
+    with io.open(fn, encoding='utf-8') as fd:
+        p = pager.Pager(fd.read(), rows=40, cols=80)
+elif how == 'mmap':
+    p = pager.MappedPager(fn, rows=40, cols=80)
+if how == '-f':
+    assert 'Section' in mv.main(filename=fn, from_txt=ft, cols=80)
+else:
+    assert p.jump(ft) and p.screen()
+print('%%-6s %%8.1fs %%8.0fMB' %% (how, time.time() - t0,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.))
+'''
+
+
+def write_doc(fn):
+    n, size = 0, mb * 1024 * 1024
+    with io.open(fn, 'w', encoding='utf-8') as fd:
+        while fd.tell() < size:
+            fd.write(''.join(['## Section %s\n\n%s\n\n- a\n- b\n\n' % (
+                i, par) for i in range(n, n + 1000)]))
+            n += 1000
+        fd.write('[1]: http://example.com\n')
+    return n
+
+
+def main():
+    d = tempfile.mkdtemp()
+    env = dict(os.environ, MDV_CACHE_DIR=d)
+    try:
+        fn = os.path.join(d, 'big.md')
+        n = write_doc(fn)
+        ft = 'Section %s' % (n * 9 // 10)
+        print('%sMB, %s sections, jump to %s' % (mb, n, ft))
+        print('%-6s %9s %10s' % ('', 'time', 'peak RSS'))
+        for how in 'read', 'mmap', '-f':
+            cmd = [sys.executable, '-W', 'ignore', '-c', job % {'root': root}]
+            sys.stdout.write(subprocess.check_output(
+                cmd + [how, fn, ft], env=env).decode('utf-8'))
+    finally:
+        shutil.rmtree(d)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Renders nested blockquotes, 500 levels by default:
+
+    python mdv/misc/perf_quotes.py [levels] [parser]
+
+'nested': one text at the deepest level. 'thread': a mail thread, every
+reply quoting the one before. Python-Markdown's own parser recurses per
+level, beyond ~150 levels take cmark or commonmark. ms of the render and of
+its tree stage (AnsiPrinter), best of 3, output lines.
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from mdv.markdownviewer import main  # noqa
+from mdv.timings import Timings  # noqa
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+parser = sys.argv[2] if len(sys.argv) > 2 else 'cmark'
+
+
+def thread(n):
+    r = []
+    for i in range(n):
+        q = '> ' * i
+        r.append('%sreply %s, quoting the one before, *em* and `code`.\n%s'
+                 % (q, i, q))
+    return '\n'.join(r)
+
+
+docs = [('nested', '> ' * n + 'the first mail'), ('thread', thread(n))]
+print('%s levels, parser %s' % (n, parser))
+for name, md in docs:
+    best = None
+    for k in range(3):
+        t = Timings()
+        s = main(md, cols=80, theme='671.1616', c_theme='526.9416',
+                 parser=parser, timings=t)
+        if best is None or t.total < best[0]:
+            best = (t.total, t.stages['tree'][0])
+    print('%-7s %9.1f ms, tree %9.1f ms %8s lines'
+          % (name, best[0] * 1000, best[1] * 1000, s.count('\n')))
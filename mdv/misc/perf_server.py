@@ -0,0 +1,59 @@
+# coding: utf-8
+"""
+Render server latency: cold cli vs. `mdv --client` with a running server.
+
+    python mdv/misc/perf_server.py [count] [mdfile]
+
+Also the bare round trip (request from a warm process), i.e. w/o the
+interpreter start of the client.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from time import time as t
+
+root = os.path.abspath(__file__).rsplit('/', 3)[0]
+sys.path.insert(0, root)
+from mdv import client
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+md = sys.argv[2] if len(sys.argv) > 2 else os.path.join(root, 'README.md')
+cli = 'import sys; sys.path.insert(0, %r); import mdv; mdv.run()' % root
+
+
+def timed(name, argv, env):
+    t0 = t()
+    for i in range(count):
+        subprocess.check_output([sys.executable, '-c', cli] + argv, env=env)
+    print('%-22s %.1fms' % (name, (t() - t0) * 1000 / count))
+
+
+def main():
+    d = tempfile.mkdtemp()
+    path = os.path.join(d, 's.sock')
+    env = dict(os.environ, MDV_SOCKET=path)
+    srv = subprocess.Popen([sys.executable, '-c', cli, '--serve'], env=env,
+                           stderr=subprocess.PIPE)
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.05)
+        argv = ['-c', '80', md]
+        timed('cold cli:', argv, env)
+        timed('client (server up):', ['--client'] + argv, env)
+        req = dict(argv=argv, cwd=os.getcwd(), env=env, cols=80, rows=50)
+        t0 = t()
+        for i in range(count):
+            client.request(req, path)
+        print('%-22s %.1fms' % ('round trip only:', (t() - t0) * 1000 / count))
+    finally:
+        srv.terminate()
+        srv.wait()
+        shutil.rmtree(d)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# coding: utf-8
+"""
+Startup and per render config overhead.
+
+    python mdv/misc/perf_startup.py [count]
+
+- cold start: a new interpreter importing mdv and rendering a tiny document
+- cli cold start: the same via run(), i.e. with config file (~/.mdv, yaml)
+  and option parsing
+- config: building the Config alone, first run (parsed config not yet
+  cached) and later ones
+- per render: count renders in one process, with ~/.mdv.py executed on
+  every render (as main() did before) vs. once per process.
+
+Runs with a temporary $HOME, containing a typical ~/.mdv.py and ~/.mdv.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from time import time as t
+
+root = os.path.abspath(__file__).rsplit('/', 3)[0]
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+py_config = '''
+import os
+hr_sep = '-'
+left_indent = '  '
+code_pref = '| '
+def_lexer = os.environ.get('MDV_LEXER', 'python')
+'''
+
+config = '''
+theme: 729.8953
+c_theme: 729.8953
+c_no_guess: true
+link_style: it
+'''
+
+cli = '''
+import sys; sys.path.insert(0, %r)
+sys.argv = ['mdv', '-c', '80', sys.argv[1]]
+from mdv import markdownviewer
+markdownviewer.run()
+''' % root
+
+conf = '''
+import sys; sys.path.insert(0, %r)
+from time import time as t
+from mdv import markdownviewer
+t0 = t()
+markdownviewer.Config(['-c', '80'])
+print('%%.1f' %% ((t() - t0) * 1000))
+''' % root
+
+cold = '''
+import sys; sys.path.insert(0, %r)
+import mdv
+mdv.main('# hi', cols=80)
+''' % root
+
+renders = '''
+import sys; sys.path.insert(0, %r)
+from time import time as t
+import mdv
+mv = mdv.markdownviewer
+mdv.main('# hi', cols=80)
+for old in True, False:
+    t0 = t()
+    for i in range(%s):
+        if old:
+            mv.py_config.mtime = None  # forces the exec, like before
+        mdv.main('# hi\\n\\ntext', cols=80)
+    print('%%s: %%.2fms per render' %% (
+        'exec per render  ' if old else 'exec once (cached)',
+        (t() - t0) * 1000 / %s))
+'''
+
+
+def main():
+    home = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(home, '.mdv.py'), 'w') as fd:
+            fd.write(py_config)
+        with open(os.path.join(home, '.mdv'), 'w') as fd:
+            fd.write(config)
+        md = os.path.join(home, 'x.md')
+        with open(md, 'w') as fd:
+            fd.write('# hi\n\ntext\n')
+        env = dict(os.environ, HOME=home)
+        r = [subprocess.check_output([sys.executable, '-c', conf], env=env)
+             for i in range(5)]
+        r = [float(x.decode('utf-8').strip()) for x in r]
+        print('config: %.1fms first, %.1fms cached' % (r[0], min(r[1:])))
+        for name, cmd in ('cold start', [cold]), ('cli cold start', [cli, md]):
+            n, t0 = 10, t()
+            for i in range(n):
+                subprocess.check_output([sys.executable, '-c'] + cmd, env=env,
+                                        stderr=subprocess.STDOUT)
+            print('%s: %.1fms' % (name, (t() - t0) * 1000 / n))
+        print(subprocess.check_output(
+            [sys.executable, '-c', renders % (root, count, count)],
+            env=env).decode('utf-8').strip())
+    finally:
+        shutil.rmtree(home)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""
+End-to-end `mdv FILE > /dev/null`: throughput and peak RSS of the streamed
+render (files >= stream_min) vs. rendering the document as one string, as
+before. Each in a fresh process.
+
+    python mdv/misc/perf_stream.py [MB] [MB whole]    (default 100 5)
+
+The whole render is measured on the smaller size only - at 100MB it does not
+fit into memory here.
+"""
+from __future__ import print_function, unicode_literals
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+root = os.path.abspath(__file__).rsplit('/', 3)[0]
+mb = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+mb_whole = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+par = ' '.join(['Some *text* with `code` and a [link][1].'] * 5)
+
+job = '''
+import io, os, resource, sys, time
+sys.path.insert(0, %(root)r)
+from mdv import markdownviewer as mv
+t0 = time.time()
+how, fn = sys.argv[1:]
+out = io.open('/dev/null', 'w', encoding='utf-8')
+if how == 'stream':
+    sys.stdout = out
+    mv.write_chunks(mv.chunks(filename=fn, cols=80))
+else:
+    with io.open(fn, encoding='utf-8') as fd:
+        out.write(mv.main(md=fd.read(), cols=80))
+dt = time.time() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+mb = os.path.getsize(fn) / 1048576.
+sys.__stdout__.write('%%-7s %%6.1fMB %%8.1fs %%7.2fMB/s %%8.0fMB\\n' %% (
+    how, mb, dt, mb / dt, rss))
+'''
+
+
+def write_doc(fn, mb):
+    n, size = 0, mb * 1024 * 1024
+    with io.open(fn, 'w', encoding='utf-8') as fd:
+        while fd.tell() < size:
+            fd.write(''.join(['## Section %s\n\n%s\n\n- a\n- b\n\n' % (
+                i, par) for i in range(n, n + 100)]))
+            n += 100
+        fd.write('[1]: http://example.com\n')
+
+
+def main():
+    d = tempfile.mkdtemp()
+    cmd = [sys.executable, '-W', 'ignore', '-c', job % {'root': root}]
+    print('%-7s %8s %9s %10s %10s' % ('', 'size', 'time', 'rate', 'peak RSS'))
+    try:
+        for size, hows in (mb_whole, ('whole', 'stream')), (mb, ('stream',)):
+            fn = os.path.join(d, '%s.md' % size)
+            write_doc(fn, size)
+            for how in hows:
+                sys.stdout.write(subprocess.check_output(
+                    cmd + [how, fn]).decode('utf-8'))
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(d)
+
+
+if __name__ == '__main__':
+    main()
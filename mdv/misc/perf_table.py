@@ -0,0 +1,72 @@
+# coding: utf-8
+"""
+Table rendering benchmark on a 10,000 row markdown table.
+
+    python mdv/misc/perf_table.py [rows]
+
+Compares the generic tabulate with mdtable on the same (colored) cells and
+times the full render, fitting and overflowing the terminal width, then
+wide tables at 20/40/80/200 columns, wrapped vs. cut into strips.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import sys
+from time import time as t
+
+sys.path.insert(0, os.path.abspath(__file__).rsplit('/', 3)[0])
+import mdv
+from mdv import mdtable
+from mdv.tabulate import tabulate
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+md = ['| Item | Price | Qty | Description |', '| :-- | --: | --: | :-- |']
+for i in range(rows):
+    md.append('| item %s | %s.%02d | %s | some **strong** text %s |'
+              % (i, i * 3, i % 100, i % 17, i))
+md = '\n'.join(md)
+
+colored = [
+    ['\x1b[38;5;188m%s\x1b[0m' % c for c in l.strip('| ').split(' | ')]
+    for l in md.splitlines()[2:]
+]
+
+
+def w(func, *a, **kw):
+    fn = kw.pop('fn')
+    t1 = t()
+    func(*a, **kw)
+    print('%.3f' % (t() - t1), fn)
+
+
+w(tabulate, colored, fn='tabulate')
+w(mdtable.render, colored, ['left', 'right', 'right', 'left'], fn='mdtable')
+w(mdv.main, md, cols=200, fn='render fit (200 cols)')
+w(mdv.main, md, cols=40, fn='render overflow (40 cols)')
+
+# wide tables, too wide for the terminal: cell wrapping vs. vertical strips
+wide = ['| %s |' % ' | '.join(['col %s' % i for i in range(12)])]
+wide.append('|%s' % (' --- |' * 12))
+for i in range(rows // 10):
+    wide.append('| %s |' % ' | '.join(
+        ['some cell text %s' % (i * j) for j in range(12)]))
+wide = '\n'.join(wide)
+mv = mdv.markdownviewer
+for layout in 'wrap', 'cut':
+    mv.table_layout = layout
+    for cols in 20, 40, 80, 200:
+        w(mdv.main, wide, cols=cols, fn='wide %s %s' % (layout, cols))
+mv.table_layout = 'wrap'
+
+try:
+    import tracemalloc
+except ImportError:  # py2
+    sys.exit(0)
+
+# peak memory of the table rendering, full vs. two pass streamed:
+for name, stream_rows in ('full', rows + 1), ('streamed', 0):
+    mv.table_stream_rows = stream_rows
+    tracemalloc.start()
+    w(mdv.main, md, cols=200, fn='render %s' % name)
+    print('  peak %.1f MB' % (tracemalloc.get_traced_memory()[1] / 1e6))
+    tracemalloc.stop()
@@ -0,0 +1,55 @@
+# coding: utf-8
+"""
+tabulate column processing, per cell vs. batched, on 1M numeric cells.
+
+    python mdv/misc/perf_tabulate.py [cells]
+
+per cell: _column_type over all cells, _format per cell, _align_column
+(re-measuring in every pad call). batched: _column_type stopping at the
+first text cell, _format_column, _align_column_batched (widths measured
+once into an array('I')).
+"""
+from __future__ import print_function, unicode_literals
+import os
+import sys
+from functools import reduce
+from time import time as t
+
+sys.path.insert(0, os.path.abspath(__file__).rsplit('/', 3)[0])
+from mdv import tabulate as tb
+
+cells = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+ncols = 10
+nrows = cells // ncols
+rows = [['%s.%s' % (r, c) if c % 2 else str(r * c) for c in range(ncols)]
+        for r in range(nrows)]
+cols = list(zip(*rows))
+
+
+def per_cell(cols):
+    res = []
+    for c in cols:
+        ct = reduce(tb._more_generic, [tb._type(s, False) for s in c], int)
+        c = [tb._format(v, ct, 'g', '', False) for v in c]
+        res.append(tb._align_column(c, 'decimal', 0, False))
+    return res
+
+
+def batched(cols):
+    res = []
+    for c in cols:
+        ct = tb._column_type(c, False)
+        c = tb._format_column(c, ct, 'g', '', False)
+        res.append(tb._align_column_batched(c, 'decimal', 0, False)[0])
+    return res
+
+
+def w(func, *a):
+    t1 = t()
+    r = func(*a)
+    print('%.3f' % (t() - t1), func.__name__)
+    return r
+
+
+assert w(per_cell, cols) == w(batched, cols)
+w(tb.tabulate, rows)
@@ -0,0 +1,59 @@
+# coding: utf-8
+"""
+`-f` on a large document: full render plus search vs. seeking to the heading
+via the (cached) heading index.
+
+    python mdv/misc/perf_toc.py [sections]
+"""
+from __future__ import print_function, unicode_literals
+import io
+import os
+import shutil
+import sys
+import tempfile
+from time import time as t
+
+root = os.path.abspath(__file__).rsplit('/', 3)[0]
+sys.path.insert(0, root)
+from mdv import headings, markdownviewer as mv
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def doc(n):
+    return '\n\n'.join(
+        ['## Section %s\n\nSome *text* of section %s, `code`.\n\n- a\n- b'
+         % (i, i) for i in range(n)]
+    )
+
+
+def timed(name, f):
+    t0 = t()
+    r = f()
+    print('%-28s %8.1fms' % (name, (t() - t0) * 1000))
+    return r
+
+
+def main():
+    d = tempfile.mkdtemp()
+    os.environ['MDV_CACHE_DIR'] = d
+    fn = os.path.join(d, 'spec.md')
+    md = doc(n)
+    with io.open(fn, 'w', encoding='utf-8') as fd:
+        fd.write(md)
+    ft = 'Section %s:20' % (n * 3 // 4)
+    print('%s sections, %.1fMB, -f %s' % (n, len(md) / 1e6, ft))
+    try:
+        mv.main(md='# warm up', cols=80)
+        timed('index (scan, cold)', lambda: headings.index(fn))
+        timed('index (cached)', lambda: headings.index(fn))
+        kw = dict(from_txt=ft, cols=80)
+        a = timed('-f, full render', lambda: mv.main(md=md, **kw))
+        b = timed('-f, seek', lambda: mv.main(filename=fn, **kw))
+        assert mv.clean_ansi(a) == mv.clean_ansi(b)
+    finally:
+        shutil.rmtree(d)
+
+
+if __name__ == '__main__':
+    main()
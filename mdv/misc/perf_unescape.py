@@ -0,0 +1,56 @@
+"""
+Microbenchmarks of markdownviewer.unescape, vs. the unescape of before
+(HTMLParser().unescape) and html.unescape:
+
+    python mdv/misc/perf_unescape.py
+
+us per call, best of 5. Then the placeholder substitution (the 'post'
+stage) of the fenced code corpus of bench.py.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from mdv import bench  # noqa
+from mdv import markdownviewer as mv  # noqa
+from mdv.timings import Timings  # noqa
+
+warnings.simplefilter('ignore')  # HTMLParser.unescape is deprecated
+funcs = [('mdv unescape', mv.unescape)]
+try:
+    from html import unescape
+
+    funcs.append(('html.unescape', unescape))
+except ImportError:
+    pass
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+if hasattr(HTMLParser, 'unescape'):
+    funcs.append(('HTMLParser().unescape', HTMLParser().unescape))
+
+cases = [
+    ('text, no &', 'the quick brown fox jumps over lazy dogs ' * 3),
+    ('link text &amp;', 'Tom &amp; Jerry'),
+    ('cell &lt;x&gt;', '&lt;x&gt; &amp; &copy;'),
+    ('code 4k, &lt;', 'if a &lt; b and c &gt; d: x = &quot;y&quot;\n' * 100),
+]
+
+print('%-16s %s' % ('us/call', ''.join(['%24s' % n for n, f in funcs])))
+for name, s in cases:
+    r = []
+    for n, f in funcs:
+        t = timeit.Timer(lambda: f(s))
+        r.append(min(t.repeat(5, 2000)) / 2000 * 1e6)
+    print('%-16s %s' % (name, ''.join(['%24.2f' % x for x in r])))
+
+md = bench.fenced(2)
+t = Timings()
+mv.main(md, cols=80, theme=bench.theme, c_theme=bench.c_theme, timings=t)
+print('\nfenced corpus, %s bytes: post %.1f ms, total %.1f ms' % (
+    len(md), t.stages['post'][0] * 1000, t.total * 1000))
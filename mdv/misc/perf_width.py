@@ -0,0 +1,59 @@
+# coding: utf-8
+"""
+Display width benchmarks: ASCII-only vs. CJK-heavy documents.
+
+    python mdv/misc/perf_width.py [count]
+
+Times the full render and the bare width computation, the latter against a
+naive per character unicodedata.east_asian_width lookup.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import sys
+import unicodedata
+from time import time as t
+
+sys.path.insert(0, os.path.abspath(__file__).rsplit('/', 3)[0])
+import mdv
+from mdv import displaywidth
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+ascii_par = 'The quick brown fox jumps over the lazy dog, again. ' * 6
+cjk_par = '这是一个很长的中文段落，没有空格，换行按照显示宽度。日本語。' * 4
+table = '| a | b | c |\n| - | - | - |\n' + '| %s | %s | %s |\n' * 30
+
+
+def doc(par, cell):
+    md = []
+    for i in range(40):
+        md.append('## Section %s\n\n%s\n\n----\n' % (i, par))
+        if i % 10 == 0:
+            md.append(table % ((cell,) * 90))
+    return '\n'.join(md)
+
+
+def naive_width(s):
+    return sum(
+        2 if unicodedata.east_asian_width(c) in ('W', 'F') else 1 for c in s
+    )
+
+
+def w(func, *a, **kw):
+    fn = kw.pop('fn')
+    t1 = t()
+    for i in range(count):
+        func(*a, **kw)
+    print('%.3f' % (t() - t1), fn)
+
+
+docs = (('ascii', doc(ascii_par, 'cell')), ('cjk', doc(cjk_par, '单元格')))
+for name, md in docs:
+    for cols in 20, 40, 80, 200:
+        fn = 'render %s %s' % (name, cols)
+        w(mdv.main, md, cols=cols, c_no_guess=True, fn=fn)
+
+for name, md in docs:
+    lines = md.splitlines() * 20
+    w(lambda: [displaywidth.width(l) for l in lines], fn='width %s' % name)
+    w(lambda: [naive_width(l) for l in lines], fn='naive %s' % name)
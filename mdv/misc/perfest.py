@@ -1,18 +1,25 @@
 import sys
 from time import time as t
-from paka import cmark
-import mistletoe
-from mistletoe.latex_renderer import LaTeXRenderer
 
-import commonmark
 import markdown
-
-from ansi_renderer import AnsiRenderer
-
 from markdown.extensions import fenced_code
-
 from markdown.extensions.tables import TableExtension
 
+# the other parsers are optional, we time what is installed
+# (mdv's own rendering: python -m mdv.bench):
+try:
+    from paka import cmark
+except ImportError:
+    cmark = None
+try:
+    import mistletoe
+except ImportError:
+    mistletoe = None
+try:
+    import commonmark
+except ImportError:
+    commonmark = None
+
 md = sys.argv[1] if len(sys.argv) > 1 else "test_md.md"
 s = open(md).read()
 
@@ -30,19 +37,17 @@ def w(func, *a, **kw):
     # print(m)
 
 
-# w(mistletoe.markdown, s, LaTeXRenderer, fn="mistletoe_ansi", count=1)
-# w(mistletoe.markdown, s, AnsiRenderer, fn="mistletoe_ansi", count=1)
-# import sys
-# sys.exit(0)
-
 MD = markdown.Markdown(
     extensions=[TableExtension(), fenced_code.FencedCodeExtension()]
 )
 
 # fmt: off
-w(cmark.to_html         , s , fn="paka")
-w(cmark.to_html         , s , fn="paka_breaks" , breaks="hard")
-w(cmark.to_xml          , s , fn="paka_xml")
-w(mistletoe.markdown    , s , fn="mistletoe")
-w(commonmark.commonmark , s , fn="commonmark")
+if cmark:
+    w(cmark.to_html     , s , fn="paka")
+    w(cmark.to_html     , s , fn="paka_breaks" , breaks="hard")
+    w(cmark.to_xml      , s , fn="paka_xml")
+if mistletoe:
+    w(mistletoe.markdown, s , fn="mistletoe")
+if commonmark:
+    w(commonmark.commonmark , s , fn="commonmark")
 w(MD.convert            , s , fn="markdown")
@@ -0,0 +1,354 @@
+# coding: utf-8
+"""
+Built-in pager (`mdv --page`), rendering lazily.
+
+The source is cut into top level blocks - at headings, and at paragraph
+borders for long stretches w/o any - by one cheap scan over its lines.
+Blocks are rendered only when they come into view. We keep a sparse index:
+the rendered lines of the recently viewed blocks and the line count of any
+block ever rendered. The position is (block, line within block), so we
+never need the absolute line number, i.e. all blocks above rendered.
+
+Jumps to a substring (`/`, or `-f` at start - same 'text:lines' syntax,
+the lines part ignored) find the block in the *source*, then the line in its
+rendering, w/o rendering anything in between.
+
+Keys: space/f/PgDn page down, b/PgUp page up, j/Down/Enter line down,
+k/Up line up, n/p next/previous heading, g top, G end, / search, q quit.
+
+Blocks are rendered on their own, with the link reference definitions of
+the document appended, so reference links work. Header numbering restarts
+per block.
+
+Files are not read but memory mapped (MappedPager): the blocks are found by
+a scan over the bytes (headings.blocks) and only the slices rendered are
+decoded - paging a 500MB file costs about the size of its block index.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import re
+import sys
+
+try:
+    from mdv import markdownviewer as mv
+    from mdv import headings
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+    import headings
+
+PY3 = sys.version_info.major > 2
+
+max_block_lines = 200  # w/o headings we cut at paragraphs after that
+max_rendered = 64  # blocks whose lines we keep
+
+_heading = re.compile(r' {0,3}#{1,6}(\s|$)')
+_setext = re.compile(r' {0,3}(=+|-+)\s*$')
+_fence = re.compile(r' {0,3}(```|~~~)')
+_ref_def = re.compile(r' {0,3}\[[^\]]+\]:\s*\S')
+_cont = re.compile(r'[\s>|*+-]|\d+[.)]')  # line continuing a list, quote..
+
+
+def index_blocks(lines):
+    """[(first line, heading or None)] of the top level blocks"""
+    blocks, fenced = [(0, None)], False
+    for i, l in enumerate(lines):
+        if _fence.match(l):
+            fenced = not fenced
+            continue
+        if fenced:
+            continue
+        start = head = None
+        if _heading.match(l):
+            start, head = i, l.strip().strip('#').strip()
+        elif (
+            _setext.match(l)
+            and i > 0
+            and lines[i - 1].strip()
+            and (i < 2 or not lines[i - 2].strip())
+        ):
+            start, head = i - 1, lines[i - 1].strip()
+        elif (
+            i - blocks[-1][0] >= max_block_lines
+            and not l.strip()
+            and i + 1 < len(lines)
+            and lines[i + 1].strip()
+            and not _cont.match(lines[i + 1])
+        ):
+            start = i + 1
+        if start is None:
+            continue
+        if start > blocks[-1][0]:
+            blocks.append((start, head))
+        elif head is not None:
+            blocks[-1] = (start, head)
+    return blocks
+
+
+class Pager(object):
+    """The paging state, w/o any terminal I/O"""
+
+    def __init__(self, md, rows=None, cols=None, **kw):
+        self.lines = md.splitlines()
+        blocks = index_blocks(self.lines)
+        # first line and heading flag per block:
+        self.starts = [s for s, _ in blocks]
+        self.heads = [h is not None for _, h in blocks]
+        self.refs = '\n'.join([l for l in self.lines if _ref_def.match(l)])
+        self.view(rows, cols, kw)
+
+    def view(self, rows, cols, kw):
+        self.rows = (rows or mv.term_rows) - 1  # status line
+        self.kw = dict(kw, cols=cols or mv.term_columns)
+        self.rendered, self.heights = {}, {}
+        self.block, self.line = 0, 0
+
+    # ---------------------------------------------------------- rendering
+    def src(self, b):
+        start = self.starts[b]
+        end = self.starts[b + 1] if b + 1 < len(self.starts) else None
+        return '\n'.join(self.lines[start:end])
+
+    def render(self, b):
+        r = self.rendered.get(b)
+        if r is not None:
+            return r
+        md = self.src(b)
+        if not md.strip():
+            r = ['']
+        else:
+            if self.refs:
+                md += '\n\n' + self.refs
+            r = mv.main(md=md, **self.kw).rstrip('\n').split('\n')
+        if len(self.rendered) >= max_rendered:
+            # forget the farthest one:
+            far = max(self.rendered, key=lambda k: abs(k - b))
+            del self.rendered[far]
+        self.rendered[b] = r
+        self.heights[b] = len(r)
+        return r
+
+    # ----------------------------------------------------------- movement
+    def screen(self):
+        """the lines to show, from the current position"""
+        res, b, l = [], self.block, self.line
+        while len(res) < self.rows and b < len(self.starts):
+            res.extend(self.render(b)[l : l + self.rows - len(res)])
+            b, l = b + 1, 0
+        return res
+
+    def down(self, n=1):
+        b, l = self.block, self.line + n
+        while b < len(self.starts) and l >= len(self.render(b)):
+            if b + 1 == len(self.starts):
+                l = len(self.render(b)) - 1
+                break
+            l -= len(self.render(b))
+            b += 1
+        self.block, self.line = b, max(l, 0)
+
+    def up(self, n=1):
+        b, l = self.block, self.line - n
+        while l < 0 and b > 0:
+            b -= 1
+            l += len(self.render(b))
+        self.block, self.line = b, max(l, 0)
+
+    def top(self):
+        self.block, self.line = 0, 0
+
+    def end(self):
+        self.block, self.line = len(self.starts) - 1, 0
+        self.down(len(self.render(self.block)))
+        self.up(self.rows - 1)
+
+    def heading(self, step=1):
+        """jump to the next (step 1) or previous (-1) heading"""
+        b = self.block + step
+        while 0 <= b < len(self.starts):
+            if self.heads[b]:
+                self.block, self.line = b, 0
+                return True
+            b += step
+        return False
+
+    def jump(self, from_txt):
+        """
+        To the first occurrence of the substring (-f syntax) at or after the
+        current block (wrapping), found in the source, w/o rendering the
+        blocks in between.
+        """
+        txt = mv.split_from_txt(from_txt)[0]
+        b = self.find(txt) if txt else None
+        if b is None:
+            return False
+        self.block, self.line = b, 0
+        for j, l in enumerate(self.render(b)):
+            if txt in mv.clean_ansi(l):
+                self.line = j
+                break
+        return True
+
+    def find(self, txt):
+        """block with txt in the source, from the current one on, wrapping"""
+        n = len(self.lines)
+        start = self.starts[self.block]
+        for i in list(range(start, n)) + list(range(0, start)):
+            if txt in self.lines[i]:
+                return self.block_of(i)
+
+    def block_of(self, pos):
+        """the block containing source position pos (line or offset)"""
+        lo, hi = 0, len(self.starts)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.starts[mid] <= pos:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def status(self):
+        b = len(self.heights)
+        return '%s/%s blocks rendered - block %s, line %s' % (
+            b,
+            len(self.starts),
+            self.block + 1,
+            self.line + 1,
+        )
+
+
+class MappedPager(Pager):
+    """Pager over a memory mapped file, positions are byte offsets"""
+
+    def __init__(self, fn, rows=None, cols=None, **kw):
+        self.mm = headings.mapped(fn) or b''
+        self.starts, self.heads, refs = headings.blocks(self.mm)
+        self.refs = '\n'.join(refs)
+        self.view(rows, cols, kw)
+
+    def src(self, b):
+        start = self.starts[b]
+        end = self.starts[b + 1] if b + 1 < len(self.starts) else None
+        return self.mm[start:end].decode('utf-8', 'replace')
+
+    def find(self, txt):
+        sub, start = txt.encode('utf-8'), self.starts[self.block]
+        i = headings.find(self.mm, sub, start)
+        if i < 0:
+            i = headings.find(self.mm, sub, 0, start + len(sub))
+        if i > -1:
+            return self.block_of(i)
+
+
+# ------------------------------------------------------------ terminal loop
+keys = {
+    ' ': 'page_down',
+    'f': 'page_down',
+    '\x1b[6~': 'page_down',
+    'b': 'page_up',
+    '\x1b[5~': 'page_up',
+    'j': 'line_down',
+    '\r': 'line_down',
+    '\n': 'line_down',
+    '\x1b[B': 'line_down',
+    'k': 'line_up',
+    '\x1b[A': 'line_up',
+    'n': 'next_heading',
+    'p': 'prev_heading',
+    'g': 'top',
+    'G': 'end',
+    '/': 'search',
+    'q': 'quit',
+}
+
+
+def act(pager, action, ask=None):
+    """Apply a key action. ask: prompt func for search. False on quit"""
+    if action == 'quit':
+        return False
+    if action == 'page_down':
+        pager.down(pager.rows)
+    elif action == 'page_up':
+        pager.up(pager.rows)
+    elif action == 'line_down':
+        pager.down()
+    elif action == 'line_up':
+        pager.up()
+    elif action == 'next_heading':
+        pager.heading(1)
+    elif action == 'prev_heading':
+        pager.heading(-1)
+    elif action == 'top':
+        pager.top()
+    elif action == 'end':
+        pager.end()
+    elif action == 'search' and ask:
+        txt = ask('/')
+        if txt:
+            pager.jump(txt)
+    return True
+
+
+def write(s):
+    if not PY3:
+        s = s.encode('utf-8')
+    sys.stdout.write(s)
+    sys.stdout.flush()
+
+
+def page(kw):
+    """--page: the interactive pager. Not a terminal: all, block by block"""
+    md = kw.pop('md', None)
+    fn = kw.pop('filename', None)
+    from_txt = kw.pop('from_txt', None)
+    for k in 'page', 'client', 'serve', 'monitor_file', 'config_file':
+        kw.pop(k, None)
+    if md is None and fn and fn != '-':
+        pager = MappedPager(fn, **kw)
+    else:
+        pager = Pager(sys.stdin.read() if md is None else md, **kw)
+    if from_txt:
+        pager.jump(from_txt)
+    if not sys.stdout.isatty():
+        for b in range(pager.block, len(pager.starts)):
+            write('\n'.join(pager.render(b)) + '\n')
+        return
+    interact(pager)
+
+
+def interact(pager):
+    import termios
+    import tty
+
+    tty_fd = os.open('/dev/tty', os.O_RDONLY)
+    old = termios.tcgetattr(tty_fd)
+
+    def ask(prompt):
+        termios.tcsetattr(tty_fd, termios.TCSADRAIN, old)
+        try:
+            write('\x1b[%sH\x1b[2K%s' % (pager.rows + 1, prompt))
+            s = os.read(tty_fd, 1024).decode('utf-8', 'replace').strip()
+        finally:
+            tty.setraw(tty_fd)
+        return s
+
+    write('\x1b[?1049h')  # alternate screen
+    try:
+        tty.setraw(tty_fd)
+        while True:
+            lines = pager.screen()
+            lines += [''] * (pager.rows - len(lines))
+            write(
+                '\x1b[H\x1b[2J'
+                + '\r\n'.join(lines)
+                + '\r\n'
+                + mv.col(pager.status(), mv.L)
+            )
+            k = os.read(tty_fd, 8).decode('utf-8', 'replace')
+            if not act(pager, keys.get(k), ask):
+                break
+    finally:
+        termios.tcsetattr(tty_fd, termios.TCSADRAIN, old)
+        os.close(tty_fd)
+        write('\x1b[?1049l')
@@ -0,0 +1,106 @@
+# coding: utf-8
+"""
+Render server (`mdv --serve`) for `mdv --client` (see client.py).
+
+Startup of a cli run is dominated by imports (markdown pulls in
+pkg_resources), then come markdown pipeline construction, lexer lookups,
+config parsing. Here all that is done once and stays warm.
+
+A request carries the client's cli args, cwd, environ and terminal size.
+We render as if started like the client: within its cwd and environ, from
+its args (Config). mdv keeps its state in module globals, so renders are
+serialized. Monitor modes, help and theme rollers (print loops) are not
+served - the client runs them in-process.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import signal
+import sys
+
+try:
+    import socketserver
+except ImportError:  # py2
+    import SocketServer as socketserver
+
+try:
+    from mdv import markdownviewer as mv
+    from mdv.client import socket_path, send_msg, recv_msg, request
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+    from client import socket_path, send_msg, recv_msg, request
+
+not_served = (
+    'sh_help', 'monitor_file', 'monitor_dir', 'serve', 'timings', 'profile'
+)
+
+
+def render(req):
+    """request -> response dict"""
+    if req.get('ping'):
+        return {'pong': os.getpid()}
+    with mv.render_lock:
+        environ, cwd = dict(os.environ), os.getcwd()
+        try:
+            os.environ.clear()
+            os.environ.update(req.get('env') or environ)
+            os.chdir(req.get('cwd') or cwd)
+            kw = mv.Config(req.get('argv') or [])
+            kw.pop('client', None)
+            if [k for k in not_served if kw.get(k)] or 'all' in (
+                kw.get('theme'),
+                kw.get('c_theme'),
+            ):
+                return {'fallback': True}
+            if 'md' in req:
+                kw['md'] = req['md']
+            kw.setdefault('cols', req.get('cols'))
+            mv.term_rows = int(req.get('rows') or mv.term_rows)
+            return {'ansi': mv.main(**kw)}
+        except SystemExit as ex:
+            # die() - the message went to our stderr
+            return {'error': 'mdv server: failed (exit %s)' % ex}
+        except Exception as ex:
+            return {'error': 'mdv server: %s: %s' % (type(ex).__name__, ex)}
+        finally:
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            req = recv_msg(self.request)
+        except (EOFError, ValueError, OSError):
+            return
+        send_msg(self.request, render(req))
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=None):
+    path = path or socket_path()
+    if os.path.exists(path):
+        try:
+            request({'ping': 1}, path)
+            mv.die('mdv server already running on %s' % path)
+        except (OSError, IOError, EOFError, ValueError):
+            os.unlink(path)  # stale
+    umask = os.umask(0o077)  # only we may connect
+    try:
+        srv = Server(path, Handler)
+    finally:
+        os.umask(umask)
+    mv.errout('mdv render server on %s' % path)
+    signal.signal(signal.SIGTERM, lambda *a: sys.exit(0))
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1,120 @@
+# coding: utf-8
+"""
+Source documentation of a whole package (`mdv -C mod --tree PKGDIR`).
+
+We walk the package, extract the markdown docstrings (opener plus `_`) of
+every python file and build one markdown document from them: a table of
+contents, then one section per module, with the module's headings shifted
+below the section heading.
+
+Reading and extracting happen in a thread pool. Extracted docs are cached
+by (path, mtime, size) (see filecache), so a re-run over an unchanged tree
+only stats the files.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import re
+from multiprocessing.pool import ThreadPool
+
+try:
+    from mdv import markdownviewer as mv
+    from mdv.filecache import FileCache
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+    from filecache import FileCache
+
+threads = 8
+skip_dirs = ('__pycache__', 'node_modules')
+_heading = re.compile(r'^(#{1,6})(?=\s)')
+_fence = re.compile(r'^\s*(```|~~~)')
+
+
+def py_files(pkgdir):
+    """(path, dotted module name) for the python files below pkgdir"""
+    pkgdir = os.path.abspath(pkgdir)
+    base = os.path.dirname(pkgdir)
+    for d, dirs, files in os.walk(pkgdir):
+        dirs[:] = sorted(
+            [n for n in dirs if not n.startswith('.') and n not in skip_dirs]
+        )
+        for f in sorted(files):
+            if not f.endswith('.py'):
+                continue
+            fn = os.path.join(d, f)
+            mod = os.path.relpath(fn, base)[:-3].replace(os.sep, '.')
+            if mod.endswith('.__init__'):
+                mod = mod[: -len('.__init__')]
+            yield fn, mod
+
+
+def extract(src):
+    """the markdown docstrings of a source file, module level one first"""
+    return [src[s:e] for m, s, e in mv.code_spans(src, 'mod')]
+
+
+class DocCache(FileCache):
+    """path -> docs of the file"""
+
+    def __init__(self, fn='srctree.json'):
+        FileCache.__init__(self, fn)
+
+    def docs(self, fn):
+        """docs of file fn, extracted only if changed"""
+        st = os.stat(fn)
+        docs = self.get(fn, st)
+        if docs is None:
+            with io.open(fn, encoding='utf-8', errors='replace') as fd:
+                docs = extract(fd.read())
+            self.put(fn, st, docs)
+        return docs
+
+
+def shift_headings(md, by=2):
+    """Demote the headings of a module doc below its section heading.
+    Not within fenced code blocks (indented ones don't start with '#')."""
+    lines, fenced = md.splitlines(), False
+    for i, l in enumerate(lines):
+        if _fence.match(l):
+            fenced = not fenced
+        elif not fenced and l[:1] == '#':
+            lines[i] = _heading.sub(
+                lambda m: '#' * min(len(m.group(1)) + by, 6), l
+            )
+    return '\n'.join(lines)
+
+
+def collect(pkgdir, what='mod', cache=None):
+    """[(module, path, docs)] for the modules with markdown docs.
+    what: 'mod' only the module level docstring, else all of them."""
+    cache = cache or DocCache()
+    files = list(py_files(pkgdir))
+    pool = ThreadPool(min(threads, len(files) or 1))
+    try:
+        docs = pool.map(cache.docs, [fn for fn, _ in files])
+    finally:
+        pool.close()
+    cache.save()
+    res = []
+    for (fn, mod), d in zip(files, docs):
+        d = [s for s in d if s.strip()]
+        if d:
+            res.append((mod, fn, d[:1] if what == 'mod' else d))
+    return res
+
+
+def tree_md(pkgdir, what='mod', cache=None):
+    """The combined markdown document for the package at pkgdir"""
+    mods = collect(pkgdir, what, cache)
+    name = os.path.basename(os.path.abspath(pkgdir))
+    r = ['# %s\n' % name]
+    if not mods:
+        r.append('No markdown docstrings (`"""_`) found.')
+        return '\n'.join(r)
+    r.extend(['- %s' % mod for mod, _, _ in mods])
+    for mod, fn, docs in mods:
+        r.append('\n## %s\n' % mod)
+        r.append('*%s*\n' % os.path.relpath(fn))
+        r.extend([shift_headings(d) for d in docs])
+    return '\n'.join(r)
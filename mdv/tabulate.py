@@ -5,10 +5,18 @@
 
 from __future__ import print_function
 from __future__ import unicode_literals
+from array import array
 from collections import namedtuple
 from platform import python_version_tuple
 import re
 
+try:
+    from mdv.displaywidth import width as _text_width, visible_width
+    from mdv.displaywidth import ansi_escape
+except ImportError:  # started as script from a checkout
+    from displaywidth import width as _text_width, visible_width
+    from displaywidth import ansi_escape
+
 
 if python_version_tuple()[0] < "3":
     from itertools import izip_longest
@@ -298,8 +306,9 @@ _table_formats = {"simple":
 tabulate_formats = list(sorted(_table_formats.keys()))
 
 
-_invisible_codes = re.compile(r"\x1b\[\d*m|\x1b\[\d*\;\d*\;\d*m")  # ANSI color codes
-_invisible_codes_bytes = re.compile(b"\x1b\[\d*m|\x1b\[\d*\;\d*\;\d*m")  # ANSI color codes
+# ANSI color codes - same pattern as used for the width calculation:
+_invisible_codes = ansi_escape
+_invisible_codes_bytes = re.compile(ansi_escape.pattern.encode('ascii'))
 
 
 def simple_separated_format(separator):
@@ -385,6 +394,33 @@ def _type(string, has_invisible=True):
         return _text_type
 
 
+def _type_text(string, has_invisible=True):
+    """_type, w/o the conversion attempts which can't succeed for text"""
+    if type(string) is not _text_type:
+        return _type(string, has_invisible)
+    if has_invisible:
+        string = _strip_invisible(string)
+    if '.' not in string:
+        try:
+            int(string)
+            return int
+        except ValueError:
+            pass
+    return float if _isnumber(string) else _text_type
+
+
+def _afterpoint_text(string):
+    """_afterpoint, deciding by the point first, for text"""
+    if '.' in string:
+        if _isnumber(string):
+            return len(string) - string.rfind(".") - 1
+        return -1
+    if 'e' in string or 'E' in string:
+        return _afterpoint(string)
+    # an int or no number at all:
+    return -1
+
+
 def _afterpoint(string):
     """Symbols after a decimal point, -1 if the string lacks the decimal point.
 
@@ -419,7 +455,8 @@ def _padleft(width, s, has_invisible=True):
     True
 
     """
-    iwidth = width + len(s) - len(_strip_invisible(s)) if has_invisible else width
+    vwidth = visible_width(s) if has_invisible else _text_width(s)
+    iwidth = width + len(s) - vwidth
     fmt = "{0:>%ds}" % iwidth
     return fmt.format(s)
 
@@ -431,7 +468,8 @@ def _padright(width, s, has_invisible=True):
     True
 
     """
-    iwidth = width + len(s) - len(_strip_invisible(s)) if has_invisible else width
+    vwidth = visible_width(s) if has_invisible else _text_width(s)
+    iwidth = width + len(s) - vwidth
     fmt = "{0:<%ds}" % iwidth
     return fmt.format(s)
 
@@ -443,7 +481,8 @@ def _padboth(width, s, has_invisible=True):
     True
 
     """
-    iwidth = width + len(s) - len(_strip_invisible(s)) if has_invisible else width
+    vwidth = visible_width(s) if has_invisible else _text_width(s)
+    iwidth = width + len(s) - vwidth
     fmt = "{0:^%ds}" % iwidth
     return fmt.format(s)
 
@@ -458,12 +497,17 @@ def _strip_invisible(s):
 
 def _visible_width(s):
     """Visible width of a printed string. ANSI color codes are removed.
+    Wide (CJK) characters count two columns.
 
     >>> _visible_width('\x1b[31mhello\x1b[0m'), _visible_width("world")
     (5, 5)
+    >>> _visible_width('\u4e2d\u6587')
+    4
 
     """
-    if isinstance(s, _text_type) or isinstance(s, _binary_type):
+    if isinstance(s, _text_type):
+        return visible_width(s)
+    if isinstance(s, _binary_type):
         return len(_strip_invisible(s))
     else:
         return len(_text_type(s))
@@ -503,13 +547,55 @@ def _align_column(strings, alignment, minwidth=0, has_invisible=True):
     if has_invisible:
         width_fn = _visible_width
     else:
-        width_fn = len
+        width_fn = _text_width
 
     maxwidth = max(max(map(width_fn, strings)), minwidth)
     padded_strings = [padfn(maxwidth, s, has_invisible) for s in strings]
     return padded_strings
 
 
+def _align_column_batched(strings, alignment, minwidth=0, has_invisible=True):
+    """[string] -> ([padded_string], width)
+
+    As _align_column, but every cell is measured exactly once, into an
+    array('I'). Padding is arithmetics on these widths, no re-measuring per
+    pad function and no format strings. Also returns the column width.
+
+    >>> _align_column_batched(["12.345", "-1234.5", "1.23"], "decimal")[0] == \
+        _align_column(["12.345", "-1234.5", "1.23"], "decimal")
+    True
+    >>> _align_column_batched([" a ", "bcd"], "center")
+    ([' a ', 'bcd'], 3)
+
+    """
+    width_fn = _visible_width if has_invisible else _text_width
+    if not alignment:
+        return strings, (width_fn(strings[0]) if strings else 0)
+    if alignment == "decimal":
+        if has_invisible:
+            decimals = [_afterpoint_text(_strip_invisible(s)) for s in strings]
+        else:
+            decimals = [_afterpoint_text(s) for s in strings]
+        maxdecimals = max(decimals)
+        strings = [s + (maxdecimals - decs) * " "
+                   for s, decs in zip(strings, decimals)]
+    else:
+        strings = [s.strip() for s in strings]
+
+    widths = array("I", map(width_fn, strings))
+    maxwidth = max(max(widths) if widths else 0, minwidth)
+    if alignment in ("right", "decimal"):
+        padded = [" " * (maxwidth - w) + s for s, w in zip(strings, widths)]
+    elif alignment == "center":
+        padded = []
+        for s, w in zip(strings, widths):
+            l = (maxwidth - w) // 2
+            padded.append(" " * l + s + " " * (maxwidth - w - l))
+    else:
+        padded = [s + " " * (maxwidth - w) for s, w in zip(strings, widths)]
+    return padded, maxwidth
+
+
 def _more_generic(type1, type2):
     types = { _none_type: 0, int: 1, float: 2, _binary_type: 3, _text_type: 4 }
     invtypes = { 4: _text_type, 3: _binary_type, 2: float, 1: int, 0: _none_type }
@@ -537,8 +623,13 @@ def _column_type(strings, has_invisible=True):
     True
 
     """
-    types = [_type(s, has_invisible) for s in strings ]
-    return reduce(_more_generic, types, int)
+    coltype = int
+    for s in strings:
+        coltype = _more_generic(coltype, _type_text(s, has_invisible))
+        if coltype is _text_type:
+            # can't get more generic, no need to look at the rest:
+            break
+    return coltype
 
 
 def _format(val, valtype, floatfmt, missingval="", has_invisible=True):
@@ -575,6 +666,16 @@ def _format(val, valtype, floatfmt, missingval="", has_invisible=True):
         return "{0}".format(val)
 
 
+def _format_column(vals, valtype, floatfmt, missingval="", has_invisible=True):
+    """_format for a whole column. Text passes through untouched."""
+    if valtype is _text_type:
+        return [v if type(v) is _text_type else
+                _format(v, valtype, floatfmt, missingval, has_invisible)
+                for v in vals]
+    return [_format(v, valtype, floatfmt, missingval, has_invisible)
+            for v in vals]
+
+
 def _align_header(header, alignment, width):
     if alignment == "left":
         return _padright(width, header)
@@ -944,30 +1045,33 @@ def tabulate(tabular_data, headers=(), tablefmt="simple",
     if has_invisible:
         width_fn = _visible_width
     else:
-        width_fn = len
+        width_fn = _text_width
 
     # format rows and columns, convert numeric values to strings
     cols = list(zip(*list_of_lists))
     coltypes = list(map(_column_type, cols))
-    cols = [[_format(v, ct, floatfmt, missingval, has_invisible) for v in c]
-             for c,ct in zip(cols, coltypes)]
+    cols = [_format_column(c, ct, floatfmt, missingval, has_invisible)
+            for c, ct in zip(cols, coltypes)]
 
-    # align columns
+    # align columns, measuring every cell once:
     aligns = [numalign if ct in [int,float] else stralign for ct in coltypes]
     minwidths = [width_fn(h) + MIN_PADDING for h in headers] if headers else [0]*len(cols)
-    cols = [_align_column(c, a, minw, has_invisible)
-            for c, a, minw in zip(cols, aligns, minwidths)]
+    aligned = [_align_column_batched(c, a, minw, has_invisible)
+               for c, a, minw in zip(cols, aligns, minwidths)]
+    cols = [c for c, w in aligned]
+    colwidths = [w for c, w in aligned]
 
     if headers:
         # align headers and add headers
-        t_cols = cols or [['']] * len(headers)
         t_aligns = aligns or [stralign] * len(headers)
-        minwidths = [max(minw, width_fn(c[0])) for minw, c in zip(minwidths, t_cols)]
+        if not cols:
+            colwidths = [0] * len(headers)
+        minwidths = [max(minw, w) for minw, w in zip(minwidths, colwidths)]
         headers = [_align_header(h, a, minw)
                    for h, a, minw in zip(headers, t_aligns, minwidths)]
         rows = list(zip(*cols))
     else:
-        minwidths = [width_fn(c[0]) for c in cols]
+        minwidths = colwidths
         rows = list(zip(*cols))
 
     if not isinstance(tablefmt, TableFormat):
@@ -0,0 +1,96 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import mdv
+from mdv import aio
+
+
+class TestAio(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_render_async(self):
+        md = '# Head\n\nSome *text* and `code`.\n'
+        res = self.run_(mdv.render_async(md, cols=40, theme='729.8953'))
+        assert res == mdv.main(md, cols=40, theme='729.8953')
+
+    def test_stale_renders_cancelled(self):
+        hog, calls = threading.Event(), []
+
+        def func(kw):
+            calls.append(kw['md'])
+            if kw['md'] == 'hog':
+                hog.wait(5)
+            return kw['md']
+
+        r = aio.Renderer(ThreadPoolExecutor(4), limit=1)
+        r.func = func
+
+        async def go():
+            h = asyncio.ensure_future(r.render('hog'))
+            await asyncio.sleep(0.05)  # hog has the only slot
+            old = asyncio.ensure_future(r.render('v1', key='doc'))
+            await asyncio.sleep(0.01)
+            new = asyncio.ensure_future(r.render('v2', key='doc'))
+            await asyncio.sleep(0.01)
+            hog.set()
+            return await asyncio.gather(h, old, new, return_exceptions=True)
+
+        h, old, new = self.run_(go())
+        assert (h, new) == ('hog', 'v2')
+        assert isinstance(old, asyncio.CancelledError)
+        assert calls == ['hog', 'v2'] and r.latest == {}
+
+    def test_limit(self):
+        st = {'cur': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def func(kw):
+            with lock:
+                st['cur'] += 1
+                st['max'] = max(st['max'], st['cur'])
+            time.sleep(0.02)
+            with lock:
+                st['cur'] -= 1
+            return kw['md']
+
+        r = aio.Renderer(ThreadPoolExecutor(8), limit=2)
+        r.func = func
+        res = self.run_(asyncio.gather(*[r.render(str(i)) for i in range(6)]))
+        assert res == [str(i) for i in range(6)]
+        assert st['max'] == 2, st
+
+    def test_loop_not_blocked(self):
+        # a render in the executor, the loop ticks meanwhile:
+        md = '\n\n'.join(['# H%s\n\n    code = %s' % (i, i) for i in range(300)])
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.001)
+
+        async def go():
+            t = asyncio.ensure_future(ticker())
+            res = await mdv.render_async(md, cols=60)
+            t.cancel()
+            return res
+
+        assert 'H299' in self.run_(go())
+        assert len(ticks) > 1
+
+
+if __name__ == '__main__':
+    main()
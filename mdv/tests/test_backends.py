@@ -0,0 +1,110 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main, skipUnless
+import io
+import os
+import mdv
+from mdv import backends
+from mdv.timings import Timings
+from markdown.util import etree
+
+mv = mdv.markdownviewer
+files = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files')
+
+# the fixtures rendering as by Python-Markdown, the others differ by dialect
+# (continuation line indents, admonitions, tables):
+same = ['blockquotes.md', 'issue_52.md', 'links.md', 'nested_lists.md',
+        'test1.md', 'test_fenced.md']
+parity = {
+    'cmark': same,
+    'commonmark': same,
+    'mistletoe': same + ['cjk.md', 'wide_table.md'],
+}
+
+md = '''# Head *em*
+
+Text *em* **strong** `a<b&c` [link](http://x "T") and
+more, br
+end.
+
+- a
+- b
+    - c
+
+> quoted
+> text
+
+---
+
+    indented <code>
+```python
+x = "<1>"
+```
+
+<div>
+raw
+</div>
+
+## Sub <b>inline</b>
+'''
+
+
+def tree(parser):
+    """the tree AnsiPrinter gets, and the stash"""
+    MD = mv.md_pipeline(4)
+    if parser != 'markdown':
+        t = etree.tostring(backends.parse(MD, md, parser))
+    else:
+        # before prettify changes it:
+        got, p = [], MD.treeprocessors['ansi_print_ext']
+        p.run = lambda doc: got.append(etree.tostring(doc))
+        try:
+            MD.convert(md)
+        finally:
+            del p.run
+        t = got[0]
+    return t, list(MD.htmlStash.rawHtmlBlocks)
+
+
+class TestBackends(TestCase):
+    def test_get(self):
+        assert backends.get(None) == backends.get('markdown') == 'markdown'
+        assert backends.get('nope') == 'markdown'
+        assert backends.get('auto') in backends.names
+        for n in backends.fastest:
+            if backends.installed(n):
+                assert backends.get(n.upper()) == n
+
+    def check(self, parser):
+        assert tree(parser) == tree('markdown')
+        for f in parity[parser]:
+            with io.open(os.path.join(files, f), encoding='utf-8') as fd:
+                src = fd.read()
+            for col in 20, 40, 80, 200:
+                fn = os.path.join(files, 'result.%s' % col, f + '.expected')
+                with io.open(fn, encoding='utf-8') as fd:
+                    exp = fd.read()
+                res = mv.main(src, cols=col, theme=729.8953, c_theme=729.8953,
+                              c_no_guess=True, c_def_lexer='python',
+                              parser=parser)
+                assert res.strip() == exp.strip(), (parser, f, col)
+        t = Timings()
+        mv.main(md, cols=80, theme=729.8953, parser=parser, timings=t)
+        assert t.stages['parse'][0] > 0 and t.stages['tree'][1] == 1
+        assert 'inline' not in t.stages
+
+    @skipUnless(backends.installed('cmark'), 'paka.cmark not installed')
+    def test_cmark(self):
+        self.check('cmark')
+
+    @skipUnless(backends.installed('mistletoe'), 'mistletoe not installed')
+    def test_mistletoe(self):
+        self.check('mistletoe')
+
+    @skipUnless(backends.installed('commonmark'), 'commonmark not installed')
+    def test_commonmark(self):
+        self.check('commonmark')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import io
+import os
+import shutil
+import tempfile
+import mdv
+from mdv import bench
+
+mv = mdv.markdownviewer
+
+
+class TestBench(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+
+    def test_corpora(self):
+        for name, f in bench.corpora.items():
+            if name != 'huge':
+                assert len(f(0.1)) > 100, name
+
+    def test_stages(self):
+        orig = mv.style_ansi, mv.md_pipeline(4).parser.parseDocument
+        res = bench.run(['fenced', 'tables'], (20, 80), 0.1, 1, out=None)
+        assert (mv.style_ansi, mv.md_pipeline(4).parser.parseDocument) == orig
+        r = res['fenced']['cols']['80']
+        assert r['stages']['highlight'] > 0 and r['calls']['highlight'] >= 4
+        assert abs(sum(r['stages'].values()) - r['total']) < 0.01
+        r = res['tables']['cols']['20']
+        assert r['stages']['tables'] > 0 and r['stages']['parse'] > 0
+
+    def test_baseline(self):
+        fn = os.path.join(self.d, 'base.json')
+        assert bench.main(['--corpus', 'prose', '--cols', '80', '--scale',
+                           '0.05', '--repeat', '1', '--baseline', fn,
+                           '--save']) == 0
+        base = bench.load(fn)
+        assert base['results']['prose']['cols']['80']['total'] > 0
+        res = {'prose': {'cols': {'80': dict(
+            base['results']['prose']['cols']['80'])}}}
+        out = io.StringIO()
+        assert bench.compare(res, base, out=out) == []
+        res['prose']['cols']['80']['total'] *= 2
+        assert bench.compare(res, base, out=out)[0][:2] == ('prose', '80')
+        assert '2.00x !' in out.getvalue()
+
+
+if __name__ == '__main__':
+    main()
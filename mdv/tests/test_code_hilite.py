@@ -0,0 +1,99 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import mdv
+
+mv = mdv.markdownviewer
+
+src = '''import os
+"""_
+# Mod Doc
+"""
+
+def f():
+    """_
+    not at col 0, code
+    """
+    return 1
+
+\'\'\'_
+second *doc*
+\'\'\'
+x = 2
+'''
+
+
+def spans(what):
+    return [(m, src[s:e]) for m, s, e in mv.code_spans(src, what)]
+
+
+class TestCodeSpans(TestCase):
+    def test_all(self):
+        r = spans('all')
+        assert [m for m, _ in r] == [1, 2, 1, 2, 1], r
+        assert r[1][1] == '# Mod Doc\n'
+        assert 'not at col 0' in r[2][1]
+        assert r[3][1] == 'second *doc*\n'
+        assert r[4][1] == 'x = 2\n'
+
+    def test_modes(self):
+        assert [m for m, _ in spans('code')] == [1, 1, 1]
+        assert [m for m, _ in spans('mod')] == [2, 2]
+        assert spans('doc') == [(2, '# Mod Doc\n')]
+
+    def test_unclosed(self):
+        r = list(mv.code_spans('a\n/*_\nopen', 'all'))
+        assert r == [(1, 0, 2), (2, 6, 10)], r
+
+    def test_fenced_and_direct_same(self):
+        # html mode still goes via fenced blocks, with the same split:
+        md = mv.do_code_hilite(src, 'all')
+        assert md.startswith('```\nimport os\n```\n# Mod Doc')
+        s = mdv.main(src, cols=60, code_hilite='all', c_no_guess=True,
+                     c_def_lexer='python')
+        c = mv.clean_ansi(s)
+        assert 'Mod Doc' in c and 'x = 2' in c and 'second doc' in c, c
+
+
+class TestTokenSpans(TestCase):
+    def lexer(self, name):
+        from pygments.lexers import get_lexer_by_name
+
+        return get_lexer_by_name(name)
+
+    def test_same_spans_as_line_scan(self):
+        for what in 'all', 'code', 'doc', 'mod':
+            md = [(s, e) for m, s, e in mv.code_spans(src, what) if m == 2]
+            tk = mv.token_spans(src, what, self.lexer('python'))
+            assert [(s, e) for m, s, e, t in tk if m == 2] == md, what
+
+    def test_tokens_cover_code(self):
+        for m, s, e, toks in mv.token_spans(src, 'all', self.lexer('python')):
+            if m == 1:
+                c = ''.join([v for t, v in mv.clip_tokens(toks, s, e)])
+                assert c == src[s:e]
+
+    def test_marker_in_string_literal(self):
+        # the line scan would take this for a doc, the lexer knows better:
+        code = "x = \'\'\'\n\"\"\"_\n\'\'\'\n\n"
+        c = code + '"""_\n# Doc\n"""\n'
+        r = [(m, c[s:e]) for m, s, e, t in
+             mv.token_spans(c, 'all', self.lexer('python'))]
+        assert r[:2] == [(1, code), (2, '# Doc\n')], r
+
+    def test_c_comments(self):
+        c = 'int i;\n/*_\n# Doc\n*/\nint j;\n'
+        r = [(m, c[s:e]) for m, s, e, t in
+             mv.token_spans(c, 'all', self.lexer('c'))]
+        assert r[1] == (2, '# Doc\n'), r
+
+    def test_unknown_comment_syntax_falls_back(self):
+        # python lexer on C: no comment tokens, we use the line scan:
+        c = 'int i;\n/*_\n# Doc\n*/\nint j;\n'
+        s = mv.clean_ansi(mdv.main(c, cols=60, code_hilite='all',
+                                   c_no_guess=True, c_def_lexer='python'))
+        assert 'Doc' in s and '/*' not in s, s
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import os
+import shutil
+import tempfile
+import time
+import mdv
+
+mv = mdv.markdownviewer
+
+
+class TestPyConfig(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.fn = os.path.join(self.d, '.mdv.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+
+    def write(self, s, dt=0):
+        with open(self.fn, 'w') as fd:
+            fd.write(s)
+        t = time.time() + dt
+        os.utime(self.fn, (t, t))
+
+    def test_load_once(self):
+        c = mv.PyConfig(self.fn)
+        assert c.load() == {}
+        self.write('x = [1]\n')
+        v = c.load()
+        assert v['x'] == [1] and '__builtins__' not in v
+        # not executed again:
+        assert c.load()['x'] is v['x']
+        self.write('x = [2]\n', dt=10)
+        assert c.load()['x'] == [2]
+        os.unlink(self.fn)
+        assert c.load() == {}
+
+    def test_main_applies(self):
+        self.write('mdv_test_value = 42\n')
+        orig = mv.py_config
+        mv.py_config = mv.PyConfig(self.fn)
+        try:
+            mdv.main('# x', cols=40)
+            assert mv.mdv_test_value == 42
+        finally:
+            mv.py_config = orig
+            del mv.mdv_test_value
+
+
+class TestConfig(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.env = dict(os.environ)
+        os.environ['HOME'] = self.d
+        os.environ['MDV_CACHE_DIR'] = os.path.join(self.d, 'cache')
+        os.environ.pop('MDV_THEME', None)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.env)
+        shutil.rmtree(self.d)
+
+    def write(self, fn, s):
+        fn = os.path.join(self.d, fn)
+        with open(fn, 'w') as fd:
+            fd.write(s)
+        return fn
+
+    def test_parse(self):
+        assert mv.parse_config('{"a": 1}') == {'a': 1}
+        assert mv.parse_config('a: 1\nb: x\n') == {'a': 1, 'b': 'x'}
+        assert mv.parse_config('# only comments') == {}
+
+    def test_cached(self):
+        fn = self.write('c.yaml', 'theme: 1.2\n')
+        assert mv.load_config(fn) == {'theme': 1.2}
+        orig = mv.parse_config
+        mv.parse_config = None  # would fail if called
+        try:
+            assert mv.load_config(fn) == {'theme': 1.2}
+        finally:
+            mv.parse_config = orig
+        t = time.time() + 10
+        self.write('c.yaml', 'theme: 2.3\n')
+        os.utime(fn, (t, t))
+        assert mv.load_config(fn) == {'theme': 2.3}
+
+    def test_precedence(self):
+        self.write('.mdv', 'theme: a\ncols: 10\nlink_style: h\n')
+        fn = self.write('f.json', '{"cols": 20, "header_nrs": "1-"}')
+        os.environ['AXC_THEME'] = 'b'
+        c = mv.Config(['-F', fn, '-c', '30', 'x.md'])
+        assert c['theme'] == 'b'  # environ over config file
+        assert c['cols'] == '30'  # cli over -F over config file
+        assert c['header_nrs'] == '1-' and c['link_style'] == 'h'
+        assert c['filename'] == 'x.md'
+
+    def test_option_table(self):
+        t = mv.option_table()
+        assert t['-c'][:2] == (['COLS'], 'cols')
+        assert t['--tree'][:2] == (['DIR'], 'tree_dir')
+        assert mv.option_table() is t
+
+
+if __name__ == '__main__':
+    main()
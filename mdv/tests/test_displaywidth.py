@@ -0,0 +1,49 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import mdv  # noqa, path setup like the other tests
+from mdv import displaywidth as dw
+from mdv.tabulate import tabulate
+
+
+class TestWidth(TestCase):
+    def test_width(self):
+        assert dw.width('abc') == 3
+        assert dw.width('中文') == 4
+        assert dw.width('🎉x') == 3
+        # combining acute accent takes no column:
+        assert dw.width('é') == 1
+        assert dw.visible_width('\x1b[38;5;1m中\x1b[0m') == 2
+
+    def test_ljust(self):
+        assert dw.ljust('中', 4) == '中  '
+        assert dw.ljust('ab', 4) == 'ab  '
+
+    def test_cut(self):
+        assert dw.cut('abcd', 1, 3) == 'bc'
+        assert dw.cut('ab中文cd', 0, 4) == 'ab中'
+        # wide char split at the border -> space:
+        assert dw.cut('ab中文cd', 0, 3) == 'ab '
+        assert dw.cut('ab中文cd', 3, 6) == ' 文'
+        # combining mark stays left of the border only:
+        s = 'aéb'
+        assert dw.cut(s, 0, 2) == 'aé'
+        assert dw.cut(s, 2) == 'b'
+
+    def test_fill(self):
+        assert dw.fill('foo bar baz', 7) == 'foo bar\nbaz'
+        r = dw.fill('这是一个很长的句子 and english', 8)
+        for l in r.splitlines():
+            assert dw.width(l) <= 8, r
+        # narrow words are not broken for wide neighbours:
+        assert 'english' in r.splitlines()
+
+    def test_table(self):
+        t = tabulate([['名前', 'x'], ['ab', 'y']]).splitlines()
+        assert len(set(dw.width(l.rstrip()) for l in t[:1] + t[-1:])) == 1
+        # two wide chars take the room of four narrow ones:
+        assert t[1].index('x') + 2 == t[2].index('y')
+
+
+if __name__ == '__main__':
+    main()
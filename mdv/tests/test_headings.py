@@ -0,0 +1,131 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import io
+import os
+import shutil
+import tempfile
+import mdv
+from mdv import headings
+
+mv = mdv.markdownviewer
+
+src = '''intro
+
+# A
+x
+```
+# no heading
+```
+
+Setext
+======
+
+- item
+---
+
+## B #
+'''
+
+
+def doc(n):
+    return '\n\n'.join(
+        ['# Section %s\n\nText of *section* %s.\n\n- a\n- b' % (i, i)
+         for i in range(n)]
+    )
+
+
+class TestHeadings(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.env = os.environ.get('MDV_CACHE_DIR')
+        os.environ['MDV_CACHE_DIR'] = os.path.join(self.d, 'cache')
+        self.fn = os.path.join(self.d, 'doc.md')
+        self.write(src)
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+        if self.env is None:
+            del os.environ['MDV_CACHE_DIR']
+        else:
+            os.environ['MDV_CACHE_DIR'] = self.env
+
+    def write(self, s):
+        with io.open(self.fn, 'w', encoding='utf-8') as fd:
+            fd.write(s)
+
+    def test_scan(self):
+        idx = headings.scan(src.encode('utf-8'))
+        assert [(l, t) for _, l, t in idx] == [
+            (1, 'A'), (1, 'Setext'), (2, 'B')], idx
+        b = src.encode('utf-8')
+        assert [b[o:o + 4] for o, _, _ in idx] == [b'# A\n', b'Sete', b'## B']
+
+    def test_cache(self):
+        idx = headings.index(self.fn)
+        orig, calls = headings.scan, []
+        headings.scan = lambda buf: calls.append(1) or orig(buf)
+        try:
+            assert [list(i) for i in headings.index(self.fn)] == [
+                list(i) for i in idx]
+            assert calls == []
+            self.write(src + '\n# C\n')
+            assert headings.index(self.fn)[-1][2] == 'C'
+            assert calls == [1]
+        finally:
+            headings.scan = orig
+
+    def test_toc(self):
+        md = headings.toc_md(self.fn)
+        assert md == '- A\n- Setext\n    - B', md
+        s = mv.main(filename=self.fn, toc=True, cols=60, no_colors=True)
+        assert 'Setext' in s and 'intro' not in s
+
+    def test_section(self):
+        self.write(doc(500))
+        s = headings.section(self.fn, 'Section 300', min_lines=22)
+        assert s.startswith('# Section 300\n')
+        assert '# Section 303\n' in s and '# Section 304' not in s
+        assert headings.section(self.fn, 'nowhere') is None
+
+    def test_blocks(self):
+        b = src.encode('utf-8') + b'\n[1]: http://x\n```\n[2]: y\n```\n'
+        starts, heads, refs = headings.blocks(b)
+        assert list(starts) == [0] + [o for o, _, _ in headings.scan(b)]
+        assert list(heads) == [0, 1, 1, 1]
+        assert refs == ['[1]: http://x']
+        # long stretches cut at paragraphs, not before list items:
+        b = (b'par\n' * 6 + b'\n- list\n\n- item\n\n') * 20
+        starts, heads, refs = headings.blocks(b, 100)
+        assert len(starts) > 5 and not any(heads)
+        assert not [s for s in starts[1:] if b[s:s + 1] != b'p']
+
+    def test_windows(self):
+        orig = headings.window
+        headings.window = 16
+        try:
+            b = doc(50).encode('utf-8')
+            assert headings.scan(b) == [
+                (b.find(('# Section %s\n' % i).encode('utf-8')), 1,
+                 'Section %s' % i) for i in range(50)]
+            for sub in b'Section 4', b'section* 49', b'nowhere':
+                assert headings.find(b, sub, 30) == b.find(sub, 30), sub
+            self.write(doc(50))
+            mm = headings.mapped(self.fn)
+            assert headings.blocks(mm)[0] == headings.blocks(b)[0]
+            mm.close()
+        finally:
+            headings.window = orig
+
+    def test_from_equals_full_render(self):
+        md = doc(500)
+        self.write(md)
+        for f in 'Section 300:10', 'of section 20:5':
+            kw = dict(from_txt=f, cols=60, no_colors=True)
+            a = mv.main(filename=self.fn, **kw)
+            b = mv.main(md=md, **kw)
+            assert mv.clean_ansi(a) == mv.clean_ansi(b), (a, b)
+
+
+if __name__ == '__main__':
+    main()
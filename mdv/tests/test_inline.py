@@ -1,35 +1,85 @@
 # coding: utf-8
+from __future__ import unicode_literals
 from unittest import TestCase, main
-try:
-    import sys; reload(sys); sys.setdefaultencoding('utf-8')
-except:
-    pass # py3
-import os
 import mdv
+from markdown.util import etree
+
+mv = mdv.markdownviewer
+
+
+def el(html):
+    return etree.fromstring(html)
+
+
+class TestInline(TestCase):
+    def setUp(self):
+        self.show_links = mv.show_links
+
+    def tearDown(self):
+        mv.show_links = self.show_links
+
+    def test_marks(self):
+        links, t = mv.inline_text(el(
+            '<p>a <em>b <strong>c</strong></em> <code>x&amp;lt;y</code>'
+            '<br />&amp;d</p>'))
+        assert links == []
+        assert t == 'a \x11b \x16c\x10\x12 \x07x&lt;y\x08\n&d', repr(t)
+        assert mv.is_text_node(el('<li><em>x</em></li>'))
+        assert not mv.is_text_node(el('<li><p>x</p></li>'))
+
+    def test_links(self):
+        p = el('<p>x <a href="http://a">a <em>e</em></a>, '
+               '<a href="http://b">b</a> y</p>')
+        mv.show_links = 'it'
+        links, t = mv.inline_text(p)
+        assert links == [(1, 'http://a'), (2, 'http://b')]
+        assert t == 'x \x17a \x11e\x12\x18① , \x17b\x18②  y', repr(t)
+        mv.show_links = 'h'
+        assert mv.inline_text(p) == ([], 'x \x17a \x11e\x12\x18, \x17b\x18 y')
+        mv.show_links = 'i'
+        assert mv.low('(http://b)') in mv.inline_text(p)[1]
+        # links not all direct children stay html, as images:
+        links, t = mv.inline_text(el(
+            '<p><em><a href="http://a">a</a></em> <img src="i.png" /></p>'))
+        assert links == []
+        assert t == '\x11<a href="http://a">a</a>\x12 <img src="i.png" />'
+
+    def test_nested_list(self):
+        li = el('<li>a <a href="http://a">l</a><ul><li>b</li></ul></li>')
+        mv.show_links = 'it'
+        assert mv.inline_text(li) == ([(1, 'http://a')], 'a \x17l\x18① ')
+        s = mv.main('- a [l](http://a) [](http://e)\n    - b\n',
+                    cols=20, no_colors=True)
+        assert '<' not in s and 'href' not in s, s
+        assert s.split('\n')[1:3] == ['    [1] http://a', '    [2] http://e']
+        # links in both, li and nested list, are links, no html:
+        s = mv.main('- a [l](http://a)\n    - b [m](http://b)\n', cols=40,
+                    no_colors=True)
+        assert '<a' not in s and '[1] http://b' in s, s
+
+    def test_doc_table(self):
+        md = '[a](http://a) [b](http://b)\n\n[b](http://b) [c](http://c)\n'
+        s = mv.main(md, cols=80, no_colors=True, link_style='dt')
+        assert s.split('\n')[:6] == [
+            '  a①  b②', '  [1] http://a', '  [2] http://b',
+            '  b②  c③', '  [3] http://c', ''], s.split('\n')
+        # numbers restart per document:
+        assert mv.main(md, cols=80, no_colors=True, link_style='dt') == s
+        many = ' '.join(['[%s](http://%s)' % (i, i) for i in range(1, 53)])
+        s = mv.main(many, cols=80, no_colors=True)
+        assert '20⑳ ' in s and '21㉑ ' in s and '50㊿ ' in s
+        assert '51[51] 52[52]' in s and '[52] http://52' in s
+
+    def test_footnotes(self):
+        md = ('# A\n\n[a](http://a) [b](http://b)\n\n[b](http://b) '
+              '[c](http://c)\n\n## B\n\n[a](http://a) [d](http://d)\n')
+        notes = ['  [%s] http://%s' % (i + 1, c) for i, c in enumerate('abcd')]
+        s = mv.main(md, cols=80, no_colors=True, link_style='f').split('\n')
+        assert s[2:4] == ['  a①  b②', '  b②  c③'], s
+        assert s[7:] == notes + [''], s
+        s = mv.main(md, cols=80, no_colors=True, link_style='fs').split('\n')
+        assert s[4:7] == notes[:3] and s[10:] == notes[3:] + [''], s
 
-here = os.path.abspath(__file__).rsplit('/', 1)[0]
-
-def clean(s):
-    return mdv.markdownviewer.clean_ansi(s).strip()
-
-class TestInlines(TestCase):
-    def test_table(self):
-        st = '''
-| Item     | Value | Qty   |
-|  --- | --- | --- |
-| Computer | $1600 |  5    |
-| Phone    | $12   |  12   |
-| Pipe     | $1    |  234  |
-'''
-        s = mdv.main(st)
-        assert clean(s) == clean('''
-  ────────  ─────  ───
-  Item      Value  Qty
-  Computer  $1600  5
-  Phone     $12    12
-  Pipe      $1     234
-  ────────  ─────  ───
-''')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,89 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import os
+import mdv
+from mdv import mdtable
+from mdv import displaywidth as dw
+
+here = os.path.abspath(__file__).rsplit('/', 1)[0]
+
+
+def clean(s):
+    return mdv.markdownviewer.clean_ansi(s)
+
+
+class TestMdTable(TestCase):
+    def test_render(self):
+        rows = [['a', 'bb'], ['\x1b[1mccc\x1b[0m', 'd']]
+        lines = mdtable.render(rows, ['right', 'center'])
+        assert lines[0] == lines[-1] == '───  ──'
+        assert [clean(l) for l in lines[1:-1]] == ['  a  bb', 'ccc  d']
+
+    def test_gfm_alignment_no_number_parsing(self):
+        st = '''
+| Item | Price | Mid |
+| :--- | ----: | :-: |
+| Pipe | 1.50 | x |
+| Computer | 1600.0 | yyy |
+'''
+        s = clean(mdv.main(st, cols=80)).strip().splitlines()
+        # numbers kept as written (tabulate made 1.5 and 1600 of them):
+        assert s[2] == '  Pipe        1.50   x', s
+        assert s[3] == '  Computer  1600.0  yyy', s
+
+    def test_overflow_cut(self):
+        mv = mdv.markdownviewer
+        st = '| %s |\n| - |\n| x |\n' % ('a' * 30)
+        mv.table_layout = 'cut'
+        try:
+            s = clean(mdv.main(st, cols=20))
+        finally:
+            mv.table_layout = 'wrap'
+        assert '✂' in s
+        assert 'a' * 20 in s
+
+    def test_layout(self):
+        # all words fit -> min widths plus shares of the rest:
+        assert mdtable.layout([30, 10, 50], [8, 3, 12], 40) == [13, 5, 22]
+        # fits anyway:
+        assert mdtable.layout([3, 4], [1, 1], 40) == [3, 4]
+        # words need breaking:
+        w = mdtable.layout([30, 30], [20, 10], 12)
+        assert sum(w) == 12 and w[0] > w[1]
+
+    def test_wrap(self):
+        cell = '\x1b[38;5;1mhello \x1b[4mworld\x1b[24m this is long\x1b[0m'
+        lines = mdtable.wrap(cell, 8)
+        assert [clean(l) for l in lines] == ['hello', 'world', 'this is', 'long']
+        # color reopened on every line:
+        assert all(l.startswith('\x1b[38;5;1m') for l in lines)
+        assert mdtable.wrap('abcdefgh', 3) == ['abc', 'def', 'gh']
+
+    def test_wrap_layout_fits(self):
+        with open(here + '/files/wide_table.md') as fd:
+            st = fd.read()
+        for cols in 20, 40, 80, 200:
+            s = clean(mdv.main(st, cols=cols))
+            assert '✂' not in s
+            for l in s.splitlines():
+                assert dw.width(l) <= cols, (cols, l)
+
+
+    def test_streamed_same_output(self):
+        mv = mdv.markdownviewer
+        st = '| Item | Price |\n| :-- | --: |\n'
+        st += ''.join(['| item *%s* | %s |\n' % (i, i * 7) for i in range(50)])
+        for cols in 20, 80:
+            mv.table_stream_rows = 2000
+            full = mdv.main(st, cols=cols, theme=729.8953)
+            mv.table_stream_rows = 10
+            try:
+                streamed = mdv.main(st, cols=cols, theme=729.8953)
+            finally:
+                mv.table_stream_rows = 2000
+            assert streamed == full, cols
+
+
+if __name__ == '__main__':
+    main()
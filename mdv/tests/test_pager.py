@@ -0,0 +1,126 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import io
+import os
+import shutil
+import tempfile
+import mdv
+from mdv import pager
+
+mv = mdv.markdownviewer
+
+
+def doc(n):
+    return '\n\n'.join(
+        ['# Section %s\n\nText of *section* %s.\n\n- a\n- b' % (i, i)
+         for i in range(n)]
+    )
+
+
+class TestPager(TestCase):
+    def test_index(self):
+        lines = [
+            'intro', '', '# A', 'x', '```', '# no heading', '```', '',
+            'Setext', '======', 'y', '', '## B',
+        ]
+        b = pager.index_blocks(lines)
+        assert b == [(0, None), (2, 'A'), (8, 'Setext'), (12, 'B')], b
+        assert pager.index_blocks(['# A', 'x']) == [(0, 'A')]
+
+    def test_long_stretches_cut_at_paragraphs(self):
+        orig = pager.max_block_lines
+        pager.max_block_lines = 10
+        try:
+            lines = ('par\n' * 6 + '\n- list\n\n- item\n\n').splitlines() * 5
+            b = pager.index_blocks(lines)
+            assert len(b) > 1
+            # never before a list item:
+            assert not [s for s, _ in b if lines[s].startswith('-')], b
+        finally:
+            pager.max_block_lines = orig
+
+    def test_lazy(self):
+        p = pager.Pager(doc(1000), rows=21, cols=60)
+        assert len(p.starts) == 1000
+        p.screen()
+        assert len(p.heights) < 10
+        assert p.jump('Section 700')
+        assert len(p.heights) < 10 and p.block == 700
+        assert 'Section 700' in mv.clean_ansi(p.screen()[0])
+
+    def test_paging_equals_full(self):
+        md = doc(30)
+        p = pager.Pager(md, rows=11, cols=60)
+        full = []
+        for b in range(len(p.starts)):
+            full.extend(p.render(b))
+        shown = []
+        for i in range(len(full) // 10 + 1):
+            shown.extend(p.screen())
+            p.down(10)
+        assert shown[: len(full)] == full
+        p.up(25)
+        p.up(3)
+        p.down(3)
+        b, l = p.block, p.line
+        p.top()
+        p.down(sum(len(p.render(x)) for x in range(b)) + l)
+        assert (p.block, p.line) == (b, l)
+
+    def test_headings_and_jump(self):
+        p = pager.Pager(doc(5), rows=10, cols=60)
+        assert p.heading(1) and p.block == 1
+        assert p.heading(-1) and p.block == 0
+        assert not p.heading(-1)
+        assert not p.jump('nowhere')
+        assert p.jump('Section 3:10')  # -f syntax
+        assert p.block == 3
+
+    def test_ref_links(self):
+        md = '# A\n\nSee [x][1].\n\n# B\n\ntext\n\n[1]: http://foo.bar\n'
+        p = pager.Pager(md, rows=10, cols=60, link_style='i')
+        assert 'foo.bar' in mv.clean_ansi('\n'.join(p.render(0)))
+
+
+class TestMappedPager(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.fn = os.path.join(self.d, 'doc.md')
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+
+    def pagers(self, md, **kw):
+        with io.open(self.fn, 'w', encoding='utf-8') as fd:
+            fd.write(md)
+        return pager.Pager(md, **kw), pager.MappedPager(self.fn, **kw)
+
+    def test_equals_lines_pager(self):
+        md = doc(30) + '\n\nSee [x][1].\n\n[1]: http://foo.bar\n'
+        p, m = self.pagers(md, rows=11, cols=60, link_style='i',
+                           no_colors=True)
+        assert len(m.starts) == len(p.starts) == 30
+        assert [m.src(b) for b in range(30)] == [
+            p.src(b) + '\n' for b in range(30)]
+        assert m.render(29) == p.render(29) and 'foo.bar' in m.render(29)[-1]
+        for x in p, m:
+            x.down(100)
+        assert m.screen() == p.screen()
+        assert m.jump('Section 3:10') and m.block == 3
+        assert m.jump('section* 25') and m.block == 25
+        assert m.jump('Section 3') and m.block == 3  # wraps
+        assert not m.jump('nowhere')
+
+    def test_lazy(self):
+        p, m = self.pagers(doc(1000), rows=21, cols=60)
+        assert m.jump('Section 700')
+        assert len(m.heights) < 10 and m.block == 700
+
+    def test_empty(self):
+        p, m = self.pagers('', rows=5, cols=60)
+        assert m.screen() == ['']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main, skipUnless
+import sys
+import mdv
+from mdv import backends
+from markdown.util import etree
+
+mv = mdv.markdownviewer
+
+
+class TestQuotes(TestCase):
+    def setUp(self):
+        self.parse = backends.parse
+        self.stream_rows = mv.table_stream_rows
+
+    def tearDown(self):
+        backends.parse = self.parse
+        mv.table_stream_rows = self.stream_rows
+
+    def test_nested(self):
+        # indents unquoted, not the spaces in the text:
+        s = mv.main('> a\n> > b   c\n> > > d   e\n>\n> f\n', cols=40,
+                    no_colors=True)
+        assert s == '|   a\n||  b   c\n|||  d   e\n|   f\n', repr(s)
+        md = '> | a | b |\n> |---|---|\n' + '> | 1 | x |\n' * 3
+        s = mv.main(md, cols=40, no_colors=True)
+        mv.table_stream_rows = 2
+        assert mv.main(md, cols=40, no_colors=True) == s
+
+    @skipUnless(backends.installed('commonmark'), 'no commonmark')
+    def test_deep(self):
+        # nested deeper than the recursion limit, as the formatter gets it:
+        n = 3 * sys.getrecursionlimit()
+
+        def parse(MD, md, name):
+            doc = el = etree.Element('div')
+            for i in range(n):
+                el = etree.SubElement(el, 'blockquote')
+            etree.SubElement(el, 'p').text = 'deep'
+            return doc
+
+        backends.parse = parse
+        s = mv.main('x', cols=40, no_colors=True, parser='commonmark')
+        assert s.strip('\n') == '|' * n + '  deep', s[-40:]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import os
+import shutil
+import tempfile
+import threading
+import mdv
+from mdv import client, server
+
+here = os.path.abspath(__file__).rsplit('/', 1)[0]
+
+
+class TestServer(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.path = os.path.join(self.d, 's.sock')
+        self.srv = server.Server(self.path, server.Handler)
+        t = threading.Thread(target=self.srv.serve_forever, args=(0.05,))
+        t.daemon = True
+        t.start()
+
+    def tearDown(self):
+        self.srv.shutdown()
+        self.srv.server_close()
+        shutil.rmtree(self.d)
+
+    def req(self, argv, **kw):
+        r = dict(argv=argv, cwd=here, env=dict(os.environ), cols=50, rows=20)
+        r.update(kw)
+        return client.request(r, self.path)
+
+    def test_render_like_in_process(self):
+        fn, cwd = 'files/cjk.md', os.getcwd()
+        res = self.req(['-t', '729.8953', fn])
+        assert os.getcwd() == cwd
+        exp = mdv.main(filename=os.path.join(here, fn), cols=50,
+                       theme='729.8953')
+        assert res['ansi'] == exp
+
+    def test_stdin_source_and_env(self):
+        env = dict(os.environ, MDV_NO_COLORS='1')
+        res = self.req(['-'], md='# *hi*', env=env)
+        assert res['ansi'].strip() == 'hi', res
+        assert 'MDV_NO_COLORS' not in os.environ
+
+    def test_errors_and_fallbacks(self):
+        assert 'nofile.md' in self.req(['nofile.md'])['error']
+        assert self.req(['-m', 'x.md']) == {'fallback': True}
+        assert self.req(['-t', 'all']) == {'fallback': True}
+        assert 'pong' in client.request({'ping': 1}, self.path)
+
+    def test_no_server(self):
+        p = os.path.join(self.d, 'none.sock')
+        assert client.run_client(['x.md'], p) is False
+
+
+if __name__ == '__main__':
+    main()
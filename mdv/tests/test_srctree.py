@@ -0,0 +1,94 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import os
+import shutil
+import tempfile
+import time
+import mdv
+from mdv import srctree
+
+mod_a = '''"""_
+# Mod A
+Text *a*.
+
+```
+# not a heading
+```
+"""
+def f():
+    pass
+"""_
+inner
+"""
+'''
+
+
+class TestSrcTree(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        pkg = self.pkg = os.path.join(self.d, 'pkg')
+        os.makedirs(os.path.join(pkg, 'sub'))
+        os.makedirs(os.path.join(pkg, '__pycache__'))
+        for fn, src in (
+            ('__init__.py', '"""_\nThe package\n"""\n'),
+            ('a.py', mod_a),
+            ('nodoc.py', 'x = 1\n'),
+            ('sub/__init__.py', ''),
+            ('sub/b.py', "'''_\n## B\n'''\n"),
+            ('__pycache__/c.py', '"""_\nno\n"""\n'),
+        ):
+            with open(os.path.join(pkg, fn), 'w') as fd:
+                fd.write(src)
+        self.cache_fn = os.path.join(self.d, 'cache', 'c.json')
+        self.env = os.environ.get('MDV_CACHE_DIR')
+        os.environ['MDV_CACHE_DIR'] = os.path.join(self.d, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+        if self.env is None:
+            del os.environ['MDV_CACHE_DIR']
+        else:
+            os.environ['MDV_CACHE_DIR'] = self.env
+
+    def cache(self):
+        return srctree.DocCache(self.cache_fn)
+
+    def test_collect(self):
+        mods = srctree.collect(self.pkg, 'mod', self.cache())
+        assert [m for m, _, _ in mods] == ['pkg', 'pkg.a', 'pkg.sub.b']
+        assert mods[1][2] == [mod_a.split('"""')[1][2:]]
+        mods = srctree.collect(self.pkg, 'all', self.cache())
+        assert mods[1][2][1].strip() == 'inner'
+
+    def test_tree_md(self):
+        md = srctree.tree_md(self.pkg, cache=self.cache())
+        assert '- pkg.a' in md and '\n## pkg.a\n' in md
+        # headings shifted below the module section, not in code:
+        assert '\n### Mod A' in md and '\n# not a heading' in md
+        assert '\n#### B' in md
+        s = mdv.main(tree_dir=self.pkg, cols=60, no_colors=True)
+        assert 'Mod A' in s and 'pkg.sub.b' in s
+
+    def test_cache(self):
+        srctree.collect(self.pkg, cache=self.cache())
+        assert os.path.exists(self.cache_fn)
+        orig, calls = srctree.extract, []
+        srctree.extract = lambda src: calls.append(src) or orig(src)
+        try:
+            srctree.collect(self.pkg, cache=self.cache())
+            assert calls == []
+            fn = os.path.join(self.pkg, 'sub', 'b.py')
+            with open(fn, 'w') as fd:
+                fd.write("'''_\n## B2\n'''\n")
+            t = time.time() + 10
+            os.utime(fn, (t, t))
+            mods = srctree.collect(self.pkg, cache=self.cache())
+            assert len(calls) == 1
+            assert mods[-1][2] == ['## B2\n']
+        finally:
+            srctree.extract = orig
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import io
+import os
+import shutil
+import sys
+import tempfile
+import mdv
+
+mv = mdv.markdownviewer
+
+
+def doc(n):
+    return '\n\n'.join(
+        ['## Section %s\n\nText of *section* %s, [link][1].\n\n- a\n- b'
+         % (i, i) for i in range(n)]
+    ) + '\n\n```\n# code\n```\n\n[1]: http://foo.bar\n'
+
+
+class TestStream(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+        self.fn = os.path.join(self.d, 'doc.md')
+        with io.open(self.fn, 'w', encoding='utf-8') as fd:
+            fd.write(doc(200))
+        self.orig = mv.stream_min, mv.stream_chunk
+        mv.stream_min, mv.stream_chunk = 1000, 500
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+        mv.stream_min, mv.stream_chunk = self.orig
+
+    def test_pieces(self):
+        pieces = list(mv.stream_md(self.fn))
+        assert len(pieces) > 10
+        assert all([p.endswith('[1]: http://foo.bar') for p in pieces])
+        assert pieces[1].startswith('## Section')
+
+    def test_stream_equals_full(self):
+        kw = dict(cols=60, no_colors=True, header_nrs='1-')
+        chunks = list(mv.chunks(filename=self.fn, **kw))
+        assert len(chunks) > 10
+        full = mv.main(md=doc(200), **kw)
+        assert ''.join(chunks) == full
+        assert '1.200 Section 199' in full
+
+    def test_footnotes(self):
+        kw = dict(cols=60, no_colors=True, link_style='f')
+        s = ''.join(mv.chunks(filename=self.fn, **kw))
+        assert s == mv.main(md=doc(200), **kw)
+        assert s.count('[1] http://foo.bar') == 1
+        assert s.endswith('link① .\n    - a\n    - b\n  \n  |  # code\n\n'
+                          '  [1] http://foo.bar\n'), s[-200:]
+
+    def test_write_chunks(self):
+        out, fn = sys.stdout, os.path.join(self.d, 'out')
+        try:
+            with open(fn, 'wb') as sys.stdout:
+                mv.write_chunks(iter(['a', 'ä\n', b'b']))
+        finally:
+            sys.stdout = out
+        with open(fn, 'rb') as fd:
+            assert fd.read() == 'aä\nb'.encode('utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import mdv  # noqa
+from mdv import tabulate as tb
+
+
+class TestBatched(TestCase):
+    def test_same_as_per_cell(self):
+        cols = (
+            ['12.345', '-1234.5', '1.23', '1e+234'],
+            ['a', ' bb ', '\x1b[31mccc\x1b[0m', '中文'],
+            ['1', '22', '333', ''],
+        )
+        for c in cols:
+            for a in 'left', 'right', 'center', 'decimal', None:
+                padded, w = tb._align_column_batched(list(c), a, 2)
+                assert padded == tb._align_column(list(c), a, 2), (c, a)
+                assert w == tb._visible_width(padded[0]), (c, a)
+
+    def test_text_shortcuts(self):
+        for v in '1', ' 12 ', '1.5', '1e5', '1.5e3', 'inf', 'nan', 'x', '', '-3':
+            assert tb._type_text(v) is tb._type(v), v
+            assert tb._afterpoint_text(v) == tb._afterpoint(v), v
+
+    def test_numeric_table(self):
+        t = tb.tabulate([[1, 2.5, 'x'], [100, 3.25, 'yy']], headers=['a', 'b', 'c'])
+        assert t.splitlines() == [
+            '  a     b  c',
+            '---  ----  ---',
+            '  1  2.5   x',
+            '100  3.25  yy',
+        ], t
+
+
+if __name__ == '__main__':
+    main()
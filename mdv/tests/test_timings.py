@@ -0,0 +1,79 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import mdv
+from mdv.timings import Timings
+
+mv = mdv.markdownviewer
+
+md = '''# Head
+
+Text *with* `code`.
+
+- a
+- b
+
+```python
+x = 1
+```
+
+a|b
+-|-
+1|2
+'''
+kw = dict(cols=60, theme='671.1616', c_theme='526.9416')
+
+
+class TestTimings(TestCase):
+    def setUp(self):
+        self.d = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.d)
+
+    def test_stages_and_blocks(self):
+        calls = []
+        t = Timings(callback=lambda *a: calls.append(a))
+        orig = mv.style_ansi
+        s = mv.main(md, timings=t, **kw)
+        assert s == mv.main(md, **kw)
+        # nothing left wrapped:
+        assert mv.style_ansi is orig
+        assert not hasattr(mv.md_pipeline(4), 'timings')
+        for k in 'parse', 'inline', 'tree', 'highlight', 'tables', 'post':
+            assert t.stages[k][1] > 0, k
+        assert sorted(t.blocks) == ['h1', 'p', 'table', 'ul'], t.blocks
+        assert abs(sum([v[0] for v in t.stages.values()]) - t.total) < 1e-3
+        assert ('block', 'table') in [c[:2] for c in calls]
+        mv.main(md, timings=t, **kw)
+        assert t.renders == 2 and t.blocks['h1'][1] == 2
+        assert 'highlight' in t.report()
+
+    def test_profile(self):
+        fn = os.path.join(self.d, 'prof')
+        assert mv.main(md, profile=fn, **kw) == mv.main(md, **kw)
+        st = pstats.Stats(fn)
+        assert [k for k in st.stats if k[2] == 'convert_ansi']
+
+    def test_cli(self):
+        fn = os.path.join(self.d, 'x.md')
+        with open(fn, 'w') as fd:
+            fd.write(md)
+        root = os.path.dirname(os.path.dirname(mdv.__file__))
+        cli = 'import sys; sys.path.insert(0, %r); import mdv; mdv.run()' % root
+        p = subprocess.Popen(
+            [sys.executable, '-W', 'ignore', '-c', cli, '--timings', '-c',
+             '60', fn], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = p.communicate()
+        assert b'Head' in out and b'Head' not in err
+        assert b'highlight' in err and b'table' in err
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from unittest import TestCase, main
+import mdv
+
+mv = mdv.markdownviewer
+
+
+class TestUnescape(TestCase):
+    def setUp(self):
+        self.orig = mv.unescape_memo_max
+        mv.unescape_memo.clear()
+
+    def tearDown(self):
+        mv.unescape_memo_max = self.orig
+
+    def test_unescape(self):
+        s = 'no entities ' * 30
+        assert mv.unescape(s) is s and not mv.unescape_memo
+        for s in ('a &amp; b', '&lt;x&gt; &copy; &#60; &amp;lt;', '&ampx &lt',
+                  'x = &quot;&lt;&quot; &amp;&amp; y\n' * 20,
+                  'x &lt; y &copy;\n' * 20):
+            assert mv.unescape(s) == mv.html_unescape(s), s
+        # the short ones memoized, bounded:
+        assert 'a &amp; b' in mv.unescape_memo
+        assert len(mv.unescape_memo) == 3
+        mv.unescape_memo_max = 3
+        assert mv.unescape('&gt;') == '>' and len(mv.unescape_memo) == 1
+
+    def test_placeholders(self):
+        # raw html, within and around fenced code, all put back:
+        md = ('```\n<div>\nin fence &amp;\n</div>\n```\n\n'
+              '<div>\nblock &copy;\n</div>\n\na <b>x</b> &amp; y\n')
+        s = mv.main(md, cols=60, no_colors=True)
+        assert '\x02' not in s and '\x03' not in s
+        for t in ('<div>', 'in fence &', 'block ©', 'a <b>x</b> & y'):
+            assert t in s, (t, s)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# coding: utf-8
+"""
+Opt-in instrumentation of renders: `mdv --timings` (report on stderr),
+`mdv --profile FILE` (cProfile dump, see pstats), in the API:
+
+    t = Timings()  # or Timings(callback=lambda kind, name, secs: ..)
+    ansi = mdv.main(md, timings=t)
+    print(t.report())
+
+Recorded are wall time and calls per stage (`stages`, exclusive - nested
+stages subtracted) and per top level block type (p, h2, ul, table, ..
+inclusive). Stages:
+
+- parse: markdown's preprocessors and block parser (other parsers: all of
+  their parsing, inline too, see backends.py)
+- inline: inline patterns (markdown's inline treeprocessor)
+- tree: AnsiPrinter, w/o the highlighting and tables within
+- highlight: lexing and coloring code (style_ansi, code_block)
+- tables: mdtable measuring, layout, rendering (not the cell formatting)
+- serialize: markdown's html serializer and postprocessors (unused by us)
+- post: placeholder substitution and hr widths
+- other: the rest of the render (setup, themes, -f, color stripping)
+
+The timers are wrapped around the functions and markdown processors for
+the instrumented render only - w/o timings nothing is wrapped and the cost
+is one check per render.
+"""
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+
+import sys
+import time
+
+from markdown.treeprocessors import InlineProcessor
+
+try:
+    from mdv import markdownviewer as mv
+except ImportError:  # started as script from a checkout
+    import markdownviewer as mv
+
+clock = getattr(time, 'perf_counter', time.time)
+stages = (
+    'parse', 'inline', 'tree', 'highlight', 'tables', 'serialize', 'post',
+    'other',
+)
+
+
+class Timings(object):
+    """name -> [secs, calls], in stages and blocks. Over all renders."""
+
+    def __init__(self, callback=None):
+        self.callback = callback  # called with (kind, name, secs)
+        self.stages, self.blocks = {}, {}
+        self.total, self.renders = 0.0, 0
+        self.stack = []
+
+    def record(self, kind, name, secs):
+        d = self.stages if kind == 'stage' else self.blocks
+        e = d.get(name)
+        if e is None:
+            e = d[name] = [0.0, 0]
+        e[0] += secs
+        e[1] += 1
+        if self.callback:
+            self.callback(kind, name, secs)
+
+    def wrap(self, stage, f):
+        """f, timed as stage - w/o the time of stages within"""
+
+        def timed(*a, **kw):
+            self.stack.append(0.0)
+            t0 = clock()
+            try:
+                return f(*a, **kw)
+            finally:
+                dt = clock() - t0
+                inner = self.stack.pop()
+                if self.stack:
+                    self.stack[-1] += dt
+                self.record('stage', stage, dt - inner)
+
+        return timed
+
+    def block(self, tag, f, *a, **kw):
+        t0 = clock()
+        try:
+            return f(*a, **kw)
+        finally:
+            self.record('block', tag, clock() - t0)
+
+    def report(self):
+        r = ['%-10s %10s %8s' % ('stage', 'ms', 'calls')]
+        for s in stages:
+            if s in self.stages:
+                r.append('%-10s %10.1f %8s' % (
+                    s, self.stages[s][0] * 1000, self.stages[s][1]))
+        r.append('%-10s %10.1f %8s' % ('total', self.total * 1000,
+                                       self.renders))
+        r.append('\n%-10s %10s %8s' % ('block', 'ms', 'count'))
+        for k, v in sorted(self.blocks.items(), key=lambda i: -i[1][0]):
+            r.append('%-10s %10.1f %8s' % (k, v[0] * 1000, v[1]))
+        return '\n'.join(r) + '\n'
+
+
+def processors(reg):
+    # markdown 2: OrderedDict, 3: Registry
+    return list(reg.values()) if hasattr(reg, 'values') else list(reg)
+
+
+class Instrumented(object):
+    """
+    Context: the timers of t patched into the markdownviewer module mod
+    (the one rendering: with `python markdownviewer.py` it is __main__) and
+    its markdown pipeline
+    """
+
+    funcs = (
+        ('', 'style_ansi', 'highlight'),
+        ('', 'code_block', 'highlight'),
+        ('', 'table_layout_widths', 'tables'),
+        ('', 'split_blocks', 'tables'),
+        ('mdtable', 'measure', 'tables'),
+        ('mdtable', 'min_widths', 'tables'),
+        ('mdtable', 'render', 'tables'),
+        ('mdtable', 'plain', 'tables'),
+        ('backends', 'parse', 'parse'),
+        ('', 'convert_ansi', 'post'),
+        ('', 'set_hr_widths', 'post'),
+    )
+
+    def __init__(self, t, mod=mv, tab_length=4):
+        self.t, self.mod = t, mod
+        self.MD = mod.md_pipeline(tab_length)
+
+    def __enter__(self):
+        w, MD, self.orig = self.t.wrap, self.MD, []
+        for sub, name, stage in self.funcs:
+            mod = getattr(self.mod, sub) if sub else self.mod
+            f = getattr(mod, name)
+            self.orig.append((mod, name, f))
+            setattr(mod, name, w(stage, f))
+        procs = [(p, 'parse') for p in processors(MD.preprocessors)]
+        procs += [(MD.parser, 'parse')]
+        for p in processors(MD.treeprocessors):
+            if isinstance(p, self.mod.AnsiPrinter):
+                procs.append((p, 'tree'))
+            elif isinstance(p, InlineProcessor):
+                procs.append((p, 'inline'))
+            else:
+                procs.append((p, 'serialize'))
+        procs += [(p, 'serialize') for p in processors(MD.postprocessors)]
+        for p, stage in procs:
+            name = 'parseDocument' if p is MD.parser else 'run'
+            self.orig.append((p, name, None))  # instance attr, to delete
+            setattr(p, name, w(stage, getattr(p, name)))
+        self.orig.append((MD, 'serializer', MD.serializer))
+        MD.serializer = w('serialize', MD.serializer)
+        MD.timings = self.t  # per block, see AnsiPrinter.run
+        self.orig.append((MD, 'timings', None))
+        return self
+
+    def __exit__(self, *exc):
+        for obj, name, f in reversed(self.orig):
+            if f is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, f)
+
+
+def timed_chunks(chunks, kw, timings=None, profile=None):
+    """
+    chunks(**kw), instrumented. timings True: a new Timings, reported on
+    stderr. profile: filename for the cProfile dump.
+    """
+    report = timings is True
+    t = Timings() if report else timings
+    mod = sys.modules[chunks.__module__]
+    prof = None
+    if profile:
+        import cProfile
+
+        prof = cProfile.Profile()
+    res = []
+    # we collect all first: the timers must not run while the consumer
+    # of the chunks (e.g. the terminal) takes its time:
+    with mod.render_lock:
+        t0 = clock()
+        if t is None:
+            prof.runcall(lambda: res.extend(chunks(**kw)))
+        else:
+            with Instrumented(t, mod, int(kw.get('tab_length') or 4)):
+                before = sum([v[0] for v in t.stages.values()])
+                if prof:
+                    prof.runcall(lambda: res.extend(chunks(**kw)))
+                else:
+                    res.extend(chunks(**kw))
+            dt = clock() - t0
+            t.record('stage', 'other', max(
+                dt - (sum([v[0] for v in t.stages.values()]) - before), 0))
+            t.total += dt
+            t.renders += 1
+    if prof:
+        prof.dump_stats(profile)
+    if report:
+        sys.stderr.write(t.report())
+    return res
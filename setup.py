@@ -30,7 +30,7 @@ setup(
     author="Axiros GmbH",
     author_email="gk@axiros.com",
     description="Terminal Markdown Viewer",
-    install_requires=["tabulate", "pygments", "markdown"],
+    install_requires=["pygments", "markdown"],
     extras_require={"yaml": "pyyaml"},
     long_description=md,
     long_description_content_type="text/markdown",